@@ -0,0 +1,228 @@
+import math
+import numpy as np
+from datetime import datetime, timedelta
+
+"""
+Synthetischer Haushalt fuer die Benchmarks (kein ioBroker noetig).
+
+Erzeugt reproduzierbar (seed) alle Payloads, die der Adapter an service.py schickt:
+Topologie, Daily Digests, Raum-Sequenzen, Tracker-Events, Comfort-Events,
+Thermostat-Punkte und Intimacy-Sessions. Die Werte sind plausibel, aber nicht
+realistisch im Detail — es geht um Groesse und Struktur der Daten.
+"""
+
+ROOM_NAMES = ['flur', 'wohnzimmer', 'kueche', 'bad', 'schlafzimmer', 'buero', 'gaestezimmer', 'wc',
+              'kinderzimmer', 'esszimmer', 'keller', 'dachboden', 'hauswirtschaft', 'ankleide', 'terrasse']
+
+ACTOR_TYPES = ['light', 'dimmer', 'blind', 'switch', 'plug']
+SENSOR_TYPES = ['motion', 'door']
+
+DISEASE_PROFILES = ['fallRisk', 'dementia', 'frailty', 'sleepDisorder', 'diabetes2', 'depression', 'socialIsolation']
+
+# Groessenstufen: Raeume, Bewohner, Sensoren pro Raum (relativ), Tage Historie
+SCALES = {
+    'small':  {'rooms': 5,  'residents': 1, 'sensor_density': 1.0, 'days': 14},
+    'medium': {'rooms': 10, 'residents': 2, 'sensor_density': 1.5, 'days': 90},
+    'large':  {'rooms': 25, 'residents': 4, 'sensor_density': 2.0, 'days': 365},
+}
+
+
+class SyntheticHousehold:
+    def __init__(self, rooms=8, residents=1, sensor_density=1.0, days=30, thermostat_days=21,
+                 seed=42, start=None):
+        self.n_rooms = rooms
+        self.residents = residents
+        self.sensor_density = sensor_density
+        self.days = days
+        self.thermostat_days = min(days, thermostat_days)
+        self.rng = np.random.default_rng(seed)
+        self.start = start or datetime(2025, 1, 1)
+        self.rooms = [ROOM_NAMES[i] if i < len(ROOM_NAMES) else f"raum_{i}" for i in range(rooms)]
+        self.adjacency = self._build_adjacency()
+        self.devices = self._build_devices()
+
+    @classmethod
+    def from_scale(cls, scale, **overrides):
+        params = dict(SCALES[scale])
+        params.update(overrides)
+        return cls(**params)
+
+    # ------------------------------------------------------------------
+    # Struktur
+    # ------------------------------------------------------------------
+    def _build_adjacency(self):
+        """Flur (Raum 0) als Knoten, dazu ein paar zufaellige Querverbindungen."""
+        n = self.n_rooms
+        adj = np.eye(n, dtype=int)
+        for i in range(1, n):
+            adj[0, i] = adj[i, 0] = 1
+        for _ in range(n // 3):
+            a, b = self.rng.integers(1, n, size=2) if n > 2 else (0, 0)
+            adj[a, b] = adj[b, a] = 1
+        return adj
+
+    def _build_devices(self):
+        """[(id, name, type, room)] — Anzahl pro Raum skaliert mit sensor_density."""
+        devices = []
+        per_room = max(1, int(round(2 * self.sensor_density)))
+        for r in self.rooms:
+            for t in SENSOR_TYPES:
+                devices.append((f"hm.{r}.{t}", f"{t.capitalize()} {r}", t, r))
+            for k in range(per_room):
+                t = ACTOR_TYPES[k % len(ACTOR_TYPES)]
+                devices.append((f"hm.{r}.{t}{k}", f"{t.capitalize()} {r} {k}", t, r))
+        return devices
+
+    def device_map(self):
+        return {d[0]: d[2] for d in self.devices}
+
+    def topology(self):
+        """Payload fuer SET_TOPOLOGY."""
+        return {'rooms': list(self.rooms), 'matrix': self.adjacency.tolist(),
+                'monitored': [r for i, r in enumerate(self.rooms) if i % 4 != 3]}
+
+    def _walk(self, length, start=None):
+        """Zufallsweg durch die Topologie (Raum-Indizes)."""
+        pos = start if start is not None else int(self.rng.integers(self.n_rooms))
+        path = [pos]
+        for _ in range(length - 1):
+            neigh = np.flatnonzero(self.adjacency[pos])
+            pos = int(self.rng.choice(neigh))
+            path.append(pos)
+        return path
+
+    def _day(self, d):
+        return self.start + timedelta(days=d)
+
+    # ------------------------------------------------------------------
+    # Health / Security
+    # ------------------------------------------------------------------
+    def digests(self):
+        """Daily Digests (auch als dailyData fuer die Langzeit-Trends nutzbar)."""
+        out = []
+        drift = np.linspace(0, -15, self.days)   # leichte Abnahme der Aktivitaet
+        for d in range(self.days):
+            base = 60 + 25 * self.residents
+            vec = np.clip(self.rng.normal(1.0, 0.8, 96) * self._daily_profile() * base / 10, 0, None)
+            out.append({
+                'date': self._day(d).strftime('%Y-%m-%d'),
+                'eventCount': int(vec.sum() * 10),
+                'activityVector': np.round(vec, 1).tolist(),
+                'todayVector': np.round(vec[::2], 1).tolist(),
+                'activityPercent': float(round(100 + drift[d] + self.rng.normal(0, 8), 1)),
+                'gaitSpeed': float(round(self.rng.normal(4.5, 0.6), 2)),
+                'nightEvents': int(self.rng.poisson(3 * self.residents)),
+                'uniqueRooms': int(min(self.n_rooms, self.rng.poisson(self.n_rooms * 0.7) + 1)),
+                'bathroomVisits': int(self.rng.poisson(5 * self.residents)),
+                'kitchenVisits': int(self.rng.poisson(7 * self.residents)),
+                'bedPresenceMinutes': int(self.rng.normal(440, 40)),
+                'windowOpenings': int(self.rng.poisson(2)),
+                'nocturiaCount': int(self.rng.poisson(0.7)),
+                'nightVibrationCount': int(self.rng.poisson(2)),
+                'maxPersonsDetected': int(self.residents),
+            })
+        return out
+
+    @staticmethod
+    def _daily_profile():
+        """Tagesgang (96 Slots): Nacht ruhig, Morgen/Abend Spitzen."""
+        h = np.arange(96) / 4.0
+        return 0.1 + np.exp(-((h - 7.5) ** 2) / 2) + 0.7 * np.exp(-((h - 13) ** 2) / 6) + np.exp(-((h - 19.5) ** 2) / 4)
+
+    def room_sequences(self, n=None, length=8):
+        """Raum-Sequenzen als Listen (TRAIN_TOPOLOGY, wie von der Bridge entpackt)."""
+        n = n or self.days * 20 * self.residents
+        return [[self.rooms[i] for i in self._walk(length)] for _ in range(n)]
+
+    def sequence_package(self, length=8, hour=None):
+        """Sequenz-Paket fuer ANALYZE_SEQUENCE: {timestamp, steps:[{loc, t_delta}], duration, daytime}."""
+        hour = int(self.rng.integers(24)) if hour is None else hour
+        deltas = np.round(self.rng.exponential(40, length), 1)
+        deltas[0] = 0
+        ts = self._day(self.days - 1).replace(hour=hour)
+        return {
+            'timestamp': int(ts.timestamp() * 1000),
+            'steps': [{'loc': self.rooms[i], 't_delta': float(t)} for i, t in zip(self._walk(length), deltas)],
+            'duration': float(deltas.sum()),
+            'daytime': hour,
+        }
+
+    def track_events(self, n):
+        """TRACK_EVENT-Payloads (Raum + Sekunden seit dem letzten Event)."""
+        path = self._walk(n)
+        dts = np.round(self.rng.exponential(60, n), 1)
+        return [{'room': self.rooms[i], 'dt': float(dt)} for i, dt in zip(path, dts)]
+
+    # ------------------------------------------------------------------
+    # Comfort
+    # ------------------------------------------------------------------
+    def comfort_events(self, per_day=None):
+        """Rohe Geraete-Events {id, name, timestamp} mit eingebauten Folge-Mustern (Sensor -> Licht)."""
+        per_day = per_day or int(120 * self.residents * self.sensor_density)
+        by_room = {}
+        for dev in self.devices:
+            by_room.setdefault(dev[3], []).append(dev)
+        t0 = self.start.timestamp() * 1000
+        events = []
+        for d in range(self.days):
+            ts = t0 + d * 86400000 + self.rng.uniform(0, 86400000, per_day)
+            rooms = self.rng.integers(self.n_rooms, size=per_day)
+            for t, r in zip(np.sort(ts).tolist(), rooms.tolist()):
+                devs = by_room[self.rooms[r]]
+                trigger = devs[0] if self.rng.random() < 0.6 else devs[int(self.rng.integers(len(devs)))]
+                events.append({'id': trigger[0], 'name': trigger[1], 'timestamp': int(t)})
+                if trigger[2] == 'motion' and self.rng.random() < 0.7:
+                    actor = devs[len(SENSOR_TYPES)]
+                    events.append({'id': actor[0], 'name': actor[1], 'timestamp': int(t + self.rng.uniform(1500, 6000))})
+        events.sort(key=lambda e: e['timestamp'])
+        return events
+
+    # ------------------------------------------------------------------
+    # Energy
+    # ------------------------------------------------------------------
+    def thermostat_points(self, step_min=15):
+        """Thermostat-Verlauf pro Raum: {ts, room, t_in, t_out, valve} im step_min-Raster."""
+        steps = self.thermostat_days * 24 * 60 // step_min
+        t0 = self.start.timestamp() * 1000
+        dt_h = step_min / 60.0
+        points = []
+        for r in self.rooms:
+            k = self.rng.uniform(0.05, 0.2)       # Waermeverlust 1/h
+            p = self.rng.uniform(1.0, 3.0)        # Heizleistung K/h
+            t = 20.0
+            for s in range(steps):
+                hour = (s * dt_h) % 24
+                t_out = 5 + 5 * math.sin((hour - 9) / 24 * 2 * math.pi)
+                valve = 100.0 if t < (21.0 if 6 <= hour < 22 else 17.0) else 0.0
+                t += (-k * (t - t_out) + (p if valve else 0.0)) * dt_h + self.rng.normal(0, 0.05)
+                points.append({'ts': int(t0 + s * step_min * 60000), 'room': r, 't_in': round(t, 2),
+                               't_out': round(t_out, 1), 'valve': valve})
+        return points
+
+    def current_temps(self):
+        return {r: float(round(self.rng.normal(20, 1), 1)) for r in self.rooms}
+
+    # ------------------------------------------------------------------
+    # Intimacy-Sessions (SexBrain)
+    # ------------------------------------------------------------------
+    def sex_sessions(self, n, labelled=True):
+        out = []
+        for i in range(n):
+            is_sex = self.rng.random() < 0.6
+            hour = float(self.rng.normal(22.5 if is_sex else 14, 2)) % 24
+            s = {
+                'date': self._day(i % max(1, self.days)).strftime('%Y-%m-%d'),
+                'peak': float(self.rng.normal(70 if is_sex else 45, 12)),
+                'durSlots': int(self.rng.integers(3, 12) if is_sex else self.rng.integers(1, 5)),
+                'avgPeak': float(self.rng.normal(55 if is_sex else 35, 10)),
+                'variance': float(self.rng.normal(900 if is_sex else 500, 150)),
+                'tierB': bool(self.rng.random() < 0.3),
+                'hourSin': math.sin(2 * math.pi * hour / 24), 'hourCos': math.cos(2 * math.pi * hour / 24),
+                'lightOn': int(self.rng.random() < 0.3), 'presenceOn': 1,
+                'roomTemp': float(round(self.rng.normal(20.5, 1), 1)),
+                'bathBefore': int(self.rng.random() < 0.5), 'bathAfter': int(self.rng.random() < (0.7 if is_sex else 0.3)),
+                'nearbyRoomMotion': int(self.rng.random() < 0.2),
+            }
+            if labelled: s['label'] = 'sex' if is_sex else 'nullnummer'
+            out.append(s)
+        return out
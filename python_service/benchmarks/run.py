@@ -0,0 +1,249 @@
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+import numpy as np
+
+"""
+Benchmark-Runner fuer python_service (offline, ohne ioBroker).
+
+Misst Latenz und Peak-Speicher (tracemalloc) pro Kommando (ueber service.handle_message) auf
+synthetischen Haushalten (small / medium / large) und schreibt alles als JSON,
+damit Versionen verglichen werden koennen.
+
+    cd python_service
+    python -m benchmarks.run                                # alle Stufen
+    python -m benchmarks.run --scales small --repeat 3
+    python -m benchmarks.run --baseline alt.json            # Vergleich mit frueherem Lauf
+
+Modelle werden in ein temporaeres Daten-Verzeichnis geschrieben (COGNI_DATA_DIR),
+echte Modelle unter iobroker-data bleiben unberuehrt.
+Hinweis: tracemalloc sieht Python- und NumPy-Allokationen, aber nicht torch-interne.
+"""
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVICE_DIR not in sys.path: sys.path.insert(0, SERVICE_DIR)
+
+from benchmarks.household import SyntheticHousehold, SCALES, DISEASE_PROFILES
+
+COMMANDS = ['TRACK_EVENT', 'ANALYZE_SEQUENCE', 'ANALYZE_LONGTERM_TRENDS', 'ANALYZE_DISEASE_SCORES',
+            'TRAIN_COMFORT', 'TRAIN_ENERGY', 'CLASSIFY_SEX_SESSIONS']
+
+TRACK_EVENTS = {'small': 200, 'medium': 1000, 'large': 5000}
+
+
+def _msg(command, **payload):
+    payload['command'] = command
+    return json.dumps(payload)
+
+
+def build_cases(house, scale):
+    """
+    Pro Kommando: (setup-Nachrichten, Mess-Nachrichten, Groesse).
+    Setup wird nicht gemessen (z.B. Topologie setzen, IsolationForest trainieren).
+    """
+    digests = house.digests()
+    topo = _msg('SET_TOPOLOGY', **house.topology())
+    n_labels = max(12, house.days // 3 * house.residents)
+    cases = {
+        'TRACK_EVENT': (
+            [topo],
+            [_msg('TRACK_EVENT', **e) for e in house.track_events(TRACK_EVENTS[scale])],
+            TRACK_EVENTS[scale]),
+        'ANALYZE_SEQUENCE': (
+            [topo, _msg('TRAIN_SECURITY', digests=digests)],
+            [_msg('ANALYZE_SEQUENCE', sequence=house.sequence_package()) for _ in range(20)],
+            20),
+        'ANALYZE_LONGTERM_TRENDS': (
+            [],
+            [_msg('ANALYZE_LONGTERM_TRENDS', dailyData=digests, weeks=max(1, house.days // 7))],
+            len(digests)),
+        'ANALYZE_DISEASE_SCORES': (
+            [],
+            [_msg('ANALYZE_DISEASE_SCORES', digests=digests, enabledProfiles=DISEASE_PROFILES)],
+            len(digests)),
+    }
+    events = house.comfort_events()
+    cases['TRAIN_COMFORT'] = ([], [_msg('TRAIN_COMFORT', events=events, deviceMap=house.device_map())], len(events))
+    points = house.thermostat_points()
+    cases['TRAIN_ENERGY'] = ([], [_msg('TRAIN_ENERGY', points=points)], len(points))
+    predict = house.sex_sessions(house.days * house.residents, labelled=False)
+    cases['CLASSIFY_SEX_SESSIONS'] = (
+        [],
+        [_msg('CLASSIFY_SEX_SESSIONS', train=house.sex_sessions(n_labels), predict=predict, groupId=f'bench_{scale}')],
+        n_labels + len(predict))
+    return cases
+
+
+class _Sink:
+    """Antwort-Senke fuer service.handle_message: serialisiert wie das Original, gibt aber nichts aus."""
+    def __init__(self):
+        self.count = 0
+        self.types = {}
+        self.bytes = 0
+
+    def __call__(self, type, payload, req_id=None):
+        self.bytes += len(json.dumps({"type": type, "payload": payload}))
+        self.count += 1
+        self.types[type] = self.types.get(type, 0) + 1
+
+
+def _reset_caches(service):
+    """Ergebnis-Cache und SexBrain-Fingerprints verwerfen, damit Wiederholungen wieder rechnen."""
+    service.result_cache.invalidate()
+    registry = getattr(service, 'sex_registry', None)
+    if registry is not None:
+        for brain in registry.brains.values():
+            brain.train_fingerprint = None
+            brain.cv_fingerprint = None
+
+
+def _run_messages(service, messages, sink):
+    """
+    Alle Nachrichten verarbeiten; Ausgaben (LOG/print) abfangen. Return: Latenzen (ms), Fehler.
+    Laeuft ueber handle_message wie im Betrieb (inkl. Ergebnis-Cache, siehe _reset_caches).
+    """
+    latencies = []
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        for m in messages:
+            t0 = time.perf_counter()
+            service.handle_message(m, sink)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+    errors = out.getvalue().count('Err processing')
+    return latencies, errors
+
+
+def run_case(service, command, setup, messages, size, repeat, memory):
+    sink = _Sink()
+    _run_messages(service, setup, sink)
+
+    # Erster Durchlauf getrennt (kalt: Lazy-Imports, Modell-Training). Vor jedem Durchlauf
+    # Caches leeren: latency_ms misst die Analyse selbst, nicht den Cache-Lookup.
+    _reset_caches(service)
+    cold, errors = _run_messages(service, messages, sink)
+    warm = []
+    for _ in range(max(0, repeat - 1)):
+        _reset_caches(service)
+        lat, err = _run_messages(service, messages, sink)
+        warm.extend(lat); errors += err
+
+    # Eigener Fall: dieselben Nachrichten ohne Leeren (Ergebnis-Cache / Fingerprint-Skip)
+    hits_before = service.result_cache.hits
+    cached, err = _run_messages(service, messages, sink)
+    errors += err
+    cache_hits = service.result_cache.hits - hits_before
+
+    peak_kb = None
+    if memory:
+        _reset_caches(service)
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        _run_messages(service, messages[:max(1, min(len(messages), 200))], sink)
+        peak_kb = round(tracemalloc.get_traced_memory()[1] / 1024.0, 1)
+        tracemalloc.stop()
+
+    all_lat = np.array(cold + warm)
+    return {
+        'command': command,
+        'size': size,
+        'calls': len(all_lat),
+        'cold_ms': round(float(np.sum(cold)), 3) if len(messages) > 1 else round(cold[0], 3),
+        'latency_ms': {
+            'min': round(float(all_lat.min()), 3),
+            'median': round(float(np.median(all_lat)), 3),
+            'p95': round(float(np.percentile(all_lat, 95)), 3),
+            'max': round(float(all_lat.max()), 3),
+        },
+        'cached_ms': round(float(np.median(cached)), 3),
+        'cache_hits': cache_hits,
+        'peak_kb': peak_kb,
+        'results': sink.types,
+        'result_bytes': sink.bytes,
+        'errors': errors,
+    }
+
+
+def compare(results, baseline_path):
+    """Median-Latenz gegen einen frueheren Lauf; Faktor > 1 = langsamer."""
+    with open(baseline_path, 'r') as f:
+        base = json.load(f)
+    old = {(r['scale'], r['command']): r for r in base.get('results', [])}
+    rows = []
+    for r in results:
+        b = old.get((r['scale'], r['command']))
+        if not b: continue
+        ratio = r['latency_ms']['median'] / max(b['latency_ms']['median'], 1e-6)
+        rows.append({'scale': r['scale'], 'command': r['command'], 'median_ms': r['latency_ms']['median'],
+                     'baseline_ms': b['latency_ms']['median'], 'ratio': round(ratio, 2)})
+    return {'baseline': baseline_path, 'baseline_version': base.get('version'), 'rows': rows}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="python_service Benchmarks (synthetischer Haushalt)")
+    ap.add_argument('--scales', default='small,medium,large', help="Komma-Liste aus: " + ", ".join(SCALES))
+    ap.add_argument('--commands', default=','.join(COMMANDS), help="Komma-Liste der Kommandos")
+    ap.add_argument('--repeat', type=int, default=3, help="Durchlaeufe pro Kommando (1. = kalt)")
+    ap.add_argument('--no-memory', action='store_true', help="tracemalloc-Lauf ueberspringen")
+    ap.add_argument('--seed', type=int, default=42)
+    ap.add_argument('--out', default=None, help="JSON-Ausgabe (Default: benchmark_<version>_<zeit>.json)")
+    ap.add_argument('--baseline', default=None, help="frueherer JSON-Lauf zum Vergleich")
+    ap.add_argument('--data-dir', default=None, help="Daten-Verzeichnis fuer Modelle (Default: temporaer)")
+    args = ap.parse_args(argv)
+
+    # Muss vor dem Import von service/brains gesetzt sein (model_store liest es beim Import)
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='cogni-bench-')
+    os.environ['COGNI_DATA_DIR'] = data_dir
+    with contextlib.redirect_stdout(io.StringIO()):
+        import service
+
+    scales = [s for s in args.scales.split(',') if s]
+    commands = [c for c in args.commands.split(',') if c]
+    results = []
+    for scale in scales:
+        house = SyntheticHousehold.from_scale(scale, seed=args.seed)
+        cases = build_cases(house, scale)
+        for command in commands:
+            if command not in cases:
+                print(f"Unbekanntes Kommando: {command}", file=sys.stderr)
+                continue
+            setup, messages, size = cases[command]
+            r = run_case(service, command, setup, messages, size, args.repeat, not args.no_memory)
+            r['scale'] = scale
+            results.append(r)
+            print(f"{scale:7s} {command:26s} n={size:<8d} median={r['latency_ms']['median']:10.2f} ms "
+                  f"cold={r['cold_ms']:10.2f} ms cached={r['cached_ms']:10.2f} ms peak={r['peak_kb']} KB errors={r['errors']}", file=sys.stderr)
+
+    report = {
+        'version': service.VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'scales': {s: SCALES[s] for s in scales},
+        'results': results,
+    }
+    if args.baseline:
+        report['comparison'] = compare(results, args.baseline)
+        for row in report['comparison']['rows']:
+            print(f"{row['scale']:7s} {row['command']:26s} {row['baseline_ms']:10.2f} -> {row['median_ms']:10.2f} ms "
+                  f"(x{row['ratio']})", file=sys.stderr)
+
+    out = args.out or f"benchmark_{service.VERSION.split()[0]}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Ergebnis: {out}", file=sys.stderr)
+    return report
+
+
+if __name__ == '__main__':
+    main()
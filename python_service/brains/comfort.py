@@ -1,14 +1,122 @@
 import pandas as pd
 import numpy as np
 import sys
+import os
+import time
+from collections import deque
+from scipy import sparse
+from brains import model_store
+from brains.model_store import DATA_DIR
+
+# Persistenz der Streaming-Zaehler: ModelStore ('comfort'), Pickle nur noch Migration
+COMFORT_MODEL_PATH = os.path.join(DATA_DIR, "comfort_model.pkl")
 
 # Helper for logging to ioBroker
 def log(msg):
     print(f"[LOG] [Comfort] {msg}")
     sys.stdout.flush()
 
+# WHITELIST (Nur diese Typen dürfen automatisch geschaltet werden)
+ALLOWED_ACTORS = [
+    'light',    # Licht / Schalter
+    'dimmer',   # Dimmer
+    'blind',    # Rollladen / Jalousie
+    'lock',     # Schloss
+    'thermostat', # Thermostat (Setpoint)
+    'switch',   # Allgemeiner Schalter
+    'plug'      # Steckdose
+]
+
+LOOKAHEAD = 10        # Fenster: 10 Events (A + 9 Nachfolger)
+WINDOW_MS = 45000     # Zeitfenster 45s
+DEBOUNCE_MS = 1000    # Entprellen: < 1s ignorieren
+MIN_COUNT = 3         # Mindestens 3x aufgetreten
+MIN_CONFIDENCE = 0.4  # Konfidenz > 40%
+
+# Sequenz-Mining (Ketten mit 3-4 Schritten, z.B. Tuer -> Licht Flur -> Licht Kueche)
+SEQ_MAX_LEN = 4
+SEQ_MAX_SPAN_MS = 120000   # gesamte Kette max. 2 min
+SEQ_MAX_RESULTS = 20
+
+# Streaming (COMFORT_EVENT)
+SAVE_INTERVAL_S = 60
+RENORM_EXPONENT = 50.0     # Gewichte neu normieren bevor 2^x ueberlaeuft
+
+# Trigger-Auswertung (Live-Vorhersage)
+INDEX_REFRESH_S = 60       # Regel-Index hoechstens 1x pro Minute aus den Zaehlern neu bauen
+PREDICT_MAX_ACTIONS = 5
+
 class ComfortBrain:
-    def __init__(self): pass
+    def __init__(self):
+        self.sequences = []   # Ergebnis des letzten Sequenz-Minings (siehe mine_sequences)
+
+        # --- Streaming-Zustand (inkrementelles Lernen) ---
+        self.device_map = {}
+        self.recent = deque(maxlen=LOOKAHEAD - 1)   # (ts_ms, name) der letzten Events
+        self.event_counts = {}                      # name -> Gewicht
+        self.pair_stats = {}                        # (name_a, name_b) -> [Gewicht, Gewicht * Delay_ms]
+        self.half_life_ms = None                    # None = kein Zeit-Verfall
+        self.decay_ref = 0                          # Bezugszeit der Gewichte (ms)
+        self.last_save = 0
+
+        # --- Trigger-Index fuer die Live-Auswertung ---
+        self.rule_index = {}      # trigger -> [(aktion, delay_ms, konfidenz, anzahl)] nach Konfidenz sortiert
+        self.chain_index = {}     # (A, B) / (A, B, C) -> [(aktion, delay_ms, konfidenz, support)]
+        self.index_dirty = True
+        self.index_built = 0
+
+    # ------------------------------------------------------------------
+    # Persistenz
+    # ------------------------------------------------------------------
+    def load_brain(self):
+        try:
+            stored = model_store.load('comfort')
+            if stored is not None:
+                data = stored['values']
+                names = data.get('names', [])
+                arrays = stored['arrays']
+                # Zaehler als Arrays (Namens-Index) -> dicts fuer das O(1)-Update
+                self.event_counts = dict(zip(names, arrays['event_counts'].tolist()))
+                self.pair_stats = {
+                    (names[a], names[b]): [w, d]
+                    for (a, b), (w, d) in zip(arrays['pair_idx'].tolist(), arrays['pair_stats'].tolist())
+                }
+                data['recent'] = [tuple(r) for r in data.get('recent', [])]
+            else:
+                data = model_store.load_legacy_pickle(COMFORT_MODEL_PATH)
+                if data is None: return True
+                self.event_counts = data.get('event_counts', {})
+                self.pair_stats = data.get('pair_stats', {})
+            self.device_map = data.get('device_map', {})
+            self.half_life_ms = data.get('half_life_ms')
+            self.decay_ref = data.get('decay_ref', 0)
+            self.recent = deque(data.get('recent', []), maxlen=LOOKAHEAD - 1)
+            self.sequences = data.get('sequences', [])
+            self.rebuild_index()
+            if stored is None: self.save_brain()  # Migration ins neue Format
+            return True
+        except:
+            return False
+
+    def save_brain(self):
+        try:
+            names = sorted(set(self.event_counts) | {n for pair in self.pair_stats for n in pair})
+            lookup = {n: i for i, n in enumerate(names)}
+            pairs = list(self.pair_stats.items())
+            model_store.save('comfort', arrays={
+                'event_counts': np.array([self.event_counts.get(n, 0.0) for n in names], dtype=np.float64),
+                'pair_idx': np.array([[lookup[a], lookup[b]] for (a, b), _ in pairs], dtype=np.int32).reshape(-1, 2),
+                'pair_stats': np.array([v for _, v in pairs], dtype=np.float64).reshape(-1, 2),
+            }, values={
+                'names': names,
+                'device_map': self.device_map,
+                'half_life_ms': self.half_life_ms,
+                'decay_ref': self.decay_ref,
+                'recent': list(self.recent),
+                'sequences': self.sequences
+            })
+            self.last_save = time.time()
+        except Exception as e: log(f"Save Error: {e}")
 
     def _is_valid_action(self, tech_id, device_map):
         """
@@ -20,99 +128,359 @@ class ComfortBrain:
 
         dtype = device_map[tech_id]
 
-        # WHITELIST (Nur diese Typen dürfen automatisch geschaltet werden)
-        allowed_actors = [
-            'light',    # Licht / Schalter
-            'dimmer',   # Dimmer
-            'blind',    # Rollladen / Jalousie
-            'lock',     # Schloss
-            'thermostat', # Thermostat (Setpoint)
-            'switch',   # Allgemeiner Schalter
-            'plug'      # Steckdose
-        ]
+        return dtype in ALLOWED_ACTORS
 
-        return dtype in allowed_actors
+    def _encode_events(self, events, device_map):
+        """
+        Events -> kompakte Arrays (zeitlich sortiert):
+          codes (int): Geraete-Code je Event (ueber den Anzeigenamen), names: Code -> Name,
+          ts (int64): Zeitstempel in ms, valid (bool): Event ist ein erlaubter Aktor (Ziel einer Regel)
+        """
+        df = pd.DataFrame(events)
+        ts = pd.to_datetime(df['timestamp'], unit='ms').to_numpy().astype('datetime64[ms]').astype(np.int64)
 
-    def train(self, events, device_map=None):
-        try:
-            if not events:
-                log("Keine Events zum Trainieren erhalten.")
-                return False, []
+        ids = df['id'] if 'id' in df.columns else pd.Series([None] * len(df), index=df.index)
+        names = df['name'].where(df['name'].notna(), ids) if 'name' in df.columns else ids
+        names = names.fillna('unknown')
 
-            if device_map is None: device_map = {}
+        # Semantischer Filter: technische ID -> Geraetetyp -> Whitelist
+        types = ids.map(device_map)
+        valid = types.isin(ALLOWED_ACTORS).to_numpy()
 
-            log(f"Starte Training mit {len(events)} Events und {len(device_map)} bekannten Geräten.")
+        order = np.argsort(ts, kind='stable')
+        codes, uniques = pd.factorize(names.to_numpy()[order])
+        return codes, [str(u) for u in uniques], ts[order], valid[order], ids.to_numpy()[order]
 
-            df = pd.DataFrame(events)
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    def _mine_pairs(self, codes, ts, valid, n_devices):
+        """
+        Zaehlt alle Paare A -> B mit B innerhalb der naechsten LOOKAHEAD-1 Events und
+        DEBOUNCE_MS <= dt <= WINDOW_MS. Statt einer Doppelschleife wird je Abstand k das
+        Array gegen sich selbst verschoben verglichen (O(n * LOOKAHEAD), vektorisiert).
+        Return: (counts, delay_sums) als Sparse-Matrizen [source, target], Delays in ms.
+        """
+        src_parts, dst_parts, delay_parts = [], [], []
+        n = len(codes)
+        for k in range(1, min(LOOKAHEAD, n)):
+            a, b = codes[:-k], codes[k:]
+            delta = ts[k:] - ts[:-k]
+            mask = (delta <= WINDOW_MS) & (delta >= DEBOUNCE_MS) & (a != b) & valid[k:]
+            src_parts.append(a[mask])
+            dst_parts.append(b[mask])
+            delay_parts.append(delta[mask])
+
+        if not src_parts:
+            empty = sparse.csr_matrix((n_devices, n_devices))
+            return empty, empty
+        src = np.concatenate(src_parts)
+        dst = np.concatenate(dst_parts)
+        delays = np.concatenate(delay_parts).astype(np.float64)
 
-            df = df.sort_values('timestamp')
+        shape = (n_devices, n_devices)
+        counts = sparse.coo_matrix((np.ones(len(src)), (src, dst)), shape=shape).tocsr()
+        delay_sums = sparse.coo_matrix((delays, (src, dst)), shape=shape).tocsr()
+        return counts, delay_sums
 
-            patterns_2 = {}
-            event_counts = {}
-            records = df.to_dict('records')
-            n = len(records)
+    def _rules_from_counts(self, counts, delay_sums, event_counts, names):
+        """Sparse-Zaehler -> Regel-Liste (Filter: MIN_COUNT, MIN_CONFIDENCE)."""
+        coo = counts.tocoo()
+        keep = coo.data >= MIN_COUNT
+        src, dst, cnt = coo.row[keep], coo.col[keep], coo.data[keep]
+        if len(cnt) == 0: return []
 
-            ignored_count = 0
+        conf = cnt / np.maximum(event_counts[src], 1)
+        sel = conf > MIN_CONFIDENCE
+        src, dst, cnt, conf = src[sel], dst[sel], cnt[sel], conf[sel]
+        avg_s = np.asarray(delay_sums[src, dst]).ravel() / cnt / 1000.0
 
-            for i in range(n):
-                evt_a = records[i]
-                # A (Trigger) darf alles sein. Wir nutzen den Namen für die Anzeige.
-                name_a = evt_a.get('name', evt_a.get('id', 'unknown'))
+        results = []
+        for a, b, c, cf, avg in zip(src.tolist(), dst.tolist(), cnt.tolist(), conf.tolist(), avg_s.tolist()):
+            results.append({
+                'rule': f"{names[a]} -> {names[b]}",
+                'confidence': cf,
+                'count': int(c),
+                'timeInfo': f"Ø +{avg:.1f}s"
+            })
+        results.sort(key=lambda x: x['confidence'], reverse=True)
+        return results
 
-                # Zähle Vorkommen für Konfidenz
-                event_counts[name_a] = event_counts.get(name_a, 0) + 1
+    def _extend(self, codes, ts, valid, positions, n_devices, max_span_ms):
+        """
+        Projizierte Datenbank eines Praefix: positions (occ x len) = Event-Indizes je Vorkommen.
+        Liefert pro Folge-Geraet die Vorkommen (occ, pos) der verlaengerten Kette.
+        Pro Vorkommen und Geraet zaehlt nur der frueheste Treffer (Support <= Support des Praefix).
+        """
+        n = len(codes)
+        last = positions[:, -1]
+        first_ts = ts[positions[:, 0]]
+        occ_parts, pos_parts = [], []
+        for k in range(1, LOOKAHEAD):
+            cand = last + k
+            inside = cand < n
+            occ = np.flatnonzero(inside)
+            cand = cand[inside]
+            gap = ts[cand] - ts[last[occ]]
+            ok = ((gap >= DEBOUNCE_MS) & (gap <= WINDOW_MS) & valid[cand]
+                  & (codes[cand] != codes[last[occ]]) & (ts[cand] - first_ts[occ] <= max_span_ms))
+            occ_parts.append(occ[ok])
+            pos_parts.append(cand[ok])
+        if not occ_parts: return {}
+        occ = np.concatenate(occ_parts)
+        pos = np.concatenate(pos_parts)
+        if len(occ) == 0: return {}
 
-                # Look ahead (Fenster: 10 Events)
-                for j in range(i + 1, min(i + 10, n)):
-                    evt_b = records[j]
+        # Frueheste Fortsetzung je (Vorkommen, Geraet): Reihenfolge ist nach k sortiert
+        key = occ.astype(np.int64) * n_devices + codes[pos]
+        _, first = np.unique(key, return_index=True)
+        occ, pos = occ[first], pos[first]
+        nxt = codes[pos]
 
-                    # WICHTIG: Wir holen ID für den Check, Name für die Anzeige
-                    id_b_tech = evt_b.get('id') # z.B. hm-rpc.0.LEQ12345
-                    name_b = evt_b.get('name', id_b_tech) # z.B. "Licht Flur"
+        order = np.argsort(nxt, kind='stable')
+        occ, pos, nxt = occ[order], pos[order], nxt[order]
+        bounds = np.flatnonzero(np.diff(nxt)) + 1
+        out = {}
+        for o, p, c in zip(np.split(occ, bounds), np.split(pos, bounds), np.split(nxt, bounds)):
+            out[int(c[0])] = np.column_stack([positions[o], p])
+        return out
 
-                    delta_ab = (evt_b['timestamp'] - evt_a['timestamp']).total_seconds()
+    def mine_sequences(self, codes, names, ts, valid, max_len=SEQ_MAX_LEN, min_support=MIN_COUNT,
+                       min_confidence=MIN_CONFIDENCE, max_span_ms=SEQ_MAX_SPAN_MS):
+        """
+        PrefixSpan-artiges Mining von Ketten A -> B -> C (-> D) ueber den Event-Stream.
+        - A (Trigger) darf alles sein, alle Folge-Schritte muessen erlaubte Aktoren sein
+        - jeder Schritt: DEBOUNCE_MS <= dt <= WINDOW_MS und innerhalb von LOOKAHEAD Events
+        - ganze Kette innerhalb max_span_ms
+        - jeder Schritt braucht Support >= min_support und Konfidenz > min_confidence
+        Tiefensuche ueber projizierte Datenbanken (nur Vorkommens-Indizes des aktuellen Praefix),
+        Speicher bleibt damit O(Events) auch bei einem Jahr Historie.
+        """
+        n_devices = len(names)
+        results = []
 
-                    if delta_ab > 45: break # Zeitfenster 45s
-                    if delta_ab < 1.0 or name_a == name_b: continue # Entprellen
+        # Level 1: Vorkommen je Trigger-Geraet
+        order = np.argsort(codes, kind='stable')
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        stack = []
+        for grp in np.split(order, bounds):
+            if len(grp) >= min_support:
+                stack.append(([int(codes[grp[0]])], grp.reshape(-1, 1)))
 
-                    # --- SEMANTISCHER FILTER (FIX) ---
-                    # Wir prüfen die technische ID in der Map
-                    if not self._is_valid_action(id_b_tech, device_map):
-                        # Optional: Zählen wie oft wir filtern (für Debug)
-                        # ignored_count += 1
-                        continue
-                    # ---------------------------------
+        while stack:
+            prefix, positions = stack.pop()
+            support_prefix = len(positions)
+            for code, ext in self._extend(codes, ts, valid, positions, n_devices, max_span_ms).items():
+                support = len(ext)
+                if support < min_support: continue   # anti-monoton: keine laengere Kette moeglich
+                conf = support / support_prefix
+                # Jeder Schritt muss fuer sich eine Regel sein (Konfidenz-Pruning), sonst
+                # explodiert die Suche ueber zufaellige Nachbar-Paare grosser Installationen.
+                if conf <= min_confidence: continue
+                chain = prefix + [code]
+                if len(chain) >= 3:
+                    gaps = np.diff(ts[ext], axis=1).mean(axis=0) / 1000.0
+                    results.append({
+                        'rule': " -> ".join(names[c] for c in chain),
+                        'chain': [names[c] for c in chain],
+                        'support': int(support),
+                        'confidence': round(float(conf), 3),
+                        'timeInfo': ", ".join(f"+{g:.1f}s" for g in gaps),
+                        'gaps': [round(float(g), 1) for g in gaps]
+                    })
+                if len(chain) < max_len:
+                    stack.append((chain, ext))
 
-                    pair = f"{name_a} -> {name_b}"
-                    if pair not in patterns_2: patterns_2[pair] = []
-                    patterns_2[pair].append(delta_ab)
+        results.sort(key=lambda x: (x['confidence'], x['support']), reverse=True)
+        return results[:SEQ_MAX_RESULTS]
 
-            # Auswertung
-            results = []
-            for rule, delays in patterns_2.items():
-                count = len(delays)
-                if count < 3: continue # Mindestens 3x aufgetreten
+    # ------------------------------------------------------------------
+    # Streaming: Zaehler bei jedem Event aktualisieren statt Historie neu zu minen
+    # ------------------------------------------------------------------
+    def set_decay(self, half_life_days):
+        """Optionaler Zeit-Verfall der Zaehler (Halbwertszeit in Tagen, None/0 = aus)."""
+        self._renormalize(self.decay_ref)
+        self.half_life_ms = float(half_life_days) * 86400000.0 if half_life_days else None
 
-                source = rule.split(" -> ")[0]
-                conf = count / event_counts.get(source, 1)
+    def _weight(self, ts):
+        """
+        Verfall ohne alle Zaehler anzufassen: neue Events bekommen Gewicht 2^((ts-ref)/T),
+        beim Auslesen wird mit 2^(-(now-ref)/T) zurueckskaliert. O(1) pro Event.
+        """
+        if not self.half_life_ms: return 1.0
+        exponent = (ts - self.decay_ref) / self.half_life_ms
+        if exponent > RENORM_EXPONENT:
+            self._renormalize(ts)
+            exponent = 0.0
+        return 2.0 ** exponent
 
-                # Konfidenz > 40%
-                if conf > 0.4:
-                    avg = float(np.mean(delays))
-                    results.append({
-                        'rule': rule,
-                        'confidence': conf,
-                        'count': count,
-                        'timeInfo': f"Ø +{avg:.1f}s"
-                    })
+    def _renormalize(self, new_ref):
+        """Bezugszeit verschieben (selten, nur gegen Ueberlauf)."""
+        if self.half_life_ms and self.decay_ref:
+            factor = 2.0 ** (-(new_ref - self.decay_ref) / self.half_life_ms)
+            for k in self.event_counts: self.event_counts[k] *= factor
+            for v in self.pair_stats.values():
+                v[0] *= factor; v[1] *= factor
+        self.decay_ref = new_ref
 
-            results.sort(key=lambda x: x['confidence'], reverse=True)
+    def add_event(self, event):
+        """
+        Ein Live-Event (COMFORT_EVENT): {id, name, timestamp(ms), type (optional)}.
+        Gleiche Regeln wie das Batch-Mining: Fenster LOOKAHEAD Events / WINDOW_MS, Entprellen, Aktor-Filter.
+        """
+        ts = event.get('timestamp') or time.time() * 1000.0
+        tech_id = event.get('id')
+        name = event.get('name') or tech_id or 'unknown'
+        if event.get('type') and tech_id: self.device_map[tech_id] = event.get('type')
+        if not self.decay_ref: self.decay_ref = ts
+
+        w = self._weight(ts)
+        self.event_counts[name] = self.event_counts.get(name, 0.0) + w
+
+        if self._is_valid_action(tech_id, self.device_map):
+            for ts_a, name_a in self.recent:
+                delta = ts - ts_a
+                if delta > WINDOW_MS or delta < DEBOUNCE_MS or name_a == name: continue
+                stat = self.pair_stats.get((name_a, name))
+                if stat is None: stat = self.pair_stats[(name_a, name)] = [0.0, 0.0]
+                stat[0] += w
+                stat[1] += w * delta
+
+        self.recent.append((ts, name))
+        self.index_dirty = True
+        if time.time() - self.last_save > SAVE_INTERVAL_S:
+            self.save_brain()
+
+    def _active_rules(self, now_ms=None):
+        """(A, B, anzahl, konfidenz, delay_ms) aller Paare ueber den Schwellen."""
+        if now_ms is None: now_ms = time.time() * 1000.0
+        scale = 2.0 ** (-(now_ms - self.decay_ref) / self.half_life_ms) if self.half_life_ms else 1.0
+        for (a, b), (weight, delay_sum) in self.pair_stats.items():
+            count = weight * scale
+            if count < MIN_COUNT: continue
+            conf = weight / max(self.event_counts.get(a, 0.0), 1e-9)
+            if conf <= MIN_CONFIDENCE: continue
+            yield a, b, count, conf, delay_sum / weight
+
+    def top_rules(self, now_ms=None, limit=5):
+        """Aktuelle Regeln aus den Streaming-Zaehlern (gleiche Schwellen wie train())."""
+        results = [{
+            'rule': f"{a} -> {b}",
+            'confidence': conf,
+            'count': int(round(count)),
+            'timeInfo': f"Ø +{delay / 1000.0:.1f}s"
+        } for a, b, count, conf, delay in self._active_rules(now_ms)]
+        results.sort(key=lambda x: x['confidence'], reverse=True)
+        return results[:limit] if limit else results
+
+    # ------------------------------------------------------------------
+    # Live-Auswertung: Event -> erwartete Folge-Aktionen
+    # ------------------------------------------------------------------
+    def rebuild_index(self, now_ms=None):
+        """
+        Hash-Index Trigger -> Folge-Aktionen. Wird nur neu gebaut wenn sich die Zaehler
+        geaendert haben (max. 1x pro INDEX_REFRESH_S), die Abfrage selbst ist ein dict-Lookup.
+        """
+        index = {}
+        for a, b, count, conf, delay in self._active_rules(now_ms):
+            index.setdefault(a, []).append((b, delay, conf, int(round(count))))
+        for actions in index.values():
+            actions.sort(key=lambda x: x[2], reverse=True)
+
+        # Ketten: Praefix (die letzten 2-3 Events) -> naechster Schritt
+        chains = {}
+        for seq in self.sequences:
+            chain, gaps = seq.get('chain', []), seq.get('gaps')
+            if len(chain) < 3 or not gaps: continue
+            chains.setdefault(tuple(chain[:-1]), []).append(
+                (chain[-1], gaps[-1] * 1000.0, seq['confidence'], seq['support']))
+        for actions in chains.values():
+            actions.sort(key=lambda x: x[2], reverse=True)
+
+        self.rule_index, self.chain_index = index, chains
+        self.index_dirty = False
+        self.index_built = time.time()
+
+    def predict_actions(self, name, ts=None, limit=PREDICT_MAX_ACTIONS):
+        """
+        Erwartete Aktionen nach Event `name`. Ketten-Treffer (Kontext der letzten Events)
+        haben Vorrang vor einfachen Paar-Regeln fuer dasselbe Geraet.
+        Return: [{device, delay_s, eta, confidence, count, source}]
+        """
+        if ts is None: ts = time.time() * 1000.0
+        if self.index_dirty and time.time() - self.index_built > INDEX_REFRESH_S:
+            self.rebuild_index(ts)
+
+        best = {}
+        # Kontext aus dem Ring-Puffer (enthaelt das aktuelle Event als letztes, falls add_event vorher lief)
+        recent = [r for r in self.recent if ts - r[0] <= SEQ_MAX_SPAN_MS]
+        if not recent or recent[-1][1] != name: recent.append((ts, name))
+        for k in (3, 2):
+            if len(recent) < k: continue
+            for action, delay, conf, support in self.chain_index.get(tuple(r[1] for r in recent[-k:]), ()):
+                if action not in best:
+                    best[action] = (delay, conf, support, 'chain')
+
+        for action, delay, conf, count in self.rule_index.get(name, ()):
+            if action != name and (action not in best or best[action][1] < conf):
+                best[action] = (delay, conf, count, 'rule')
+
+        results = [{
+            'device': action,
+            'delay_s': round(delay / 1000.0, 1),
+            'eta': int(ts + delay),
+            'confidence': round(float(conf), 3),
+            'count': int(count),
+            'source': source
+        } for action, (delay, conf, count, source) in best.items()]
+        results.sort(key=lambda x: x['confidence'], reverse=True)
+        return results[:limit]
+
+    def _seed_stream(self, counts, delay_sums, event_counts, names, ts):
+        """Batch-Ergebnis als Startwert fuer die Streaming-Zaehler uebernehmen."""
+        coo = counts.tocoo()
+        sums = delay_sums.tocsr()
+        self.pair_stats = {
+            (names[a], names[b]): [float(c), float(sums[a, b])]
+            for a, b, c in zip(coo.row.tolist(), coo.col.tolist(), coo.data.tolist())
+        }
+        self.event_counts = {names[i]: float(c) for i, c in enumerate(event_counts.tolist()) if c > 0}
+        self.decay_ref = float(ts[-1]) if len(ts) else 0
+        self.recent.clear()
+
+    def train(self, events, device_map=None):
+        try:
+            if not events:
+                log("Keine Events zum Trainieren erhalten.")
+                return False, []
+
+            if device_map is None: device_map = {}
+
+            log(f"Starte Training mit {len(events)} Events und {len(device_map)} bekannten Geräten.")
+
+            codes, names, ts, valid, _ = self._encode_events(events, device_map)
+
+            # Zähle Vorkommen für Konfidenz (A = Trigger darf alles sein)
+            event_counts = np.bincount(codes, minlength=len(names))
+            counts, delay_sums = self._mine_pairs(codes, ts, valid, len(names))
+
+            # Auswertung
+            results = self._rules_from_counts(counts, delay_sums, event_counts, names)
             log(f"Training beendet. {len(results)} gültige Muster gefunden (nach Filterung).")
 
+            # Streaming-Zaehler auf den Stand der Historie setzen
+            self.device_map.update(device_map)
+            self._seed_stream(counts, delay_sums, event_counts, names, ts)
+
+            # Ketten mit 3-4 Schritten (gleiche Kodierung, kein zweites Parsen)
+            try:
+                self.sequences = self.mine_sequences(codes, names, ts, valid)
+                log(f"Sequenz-Mining: {len(self.sequences)} Ketten gefunden.")
+            except Exception as e:
+                log(f"Sequenz-Mining fehlgeschlagen: {e}")
+                self.sequences = []
+            self.rebuild_index(float(ts[-1]) if len(ts) else None)
+            self.save_brain()
+
             return True, results[:5]
 
         except Exception as e:
             log(f"CRITICAL ERROR in train(): {e}")
-            return False, []
\ No newline at end of file
+            return False, []
@@ -1,5 +1,4 @@
 import os
-import pickle
 import pandas as pd
 import numpy as np
 import json
@@ -7,48 +6,86 @@ import math
 import time
 from datetime import datetime
 
-# Dr.-Ing. Update: PERSISTENTE SPEICHERUNG & SANITY CHECKS (v0.18.27)
-ADAPTER_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(ADAPTER_DIR)), 'iobroker-data', 'cogni-living')
-
-if not os.path.exists(DATA_DIR):
-    try:
-        os.makedirs(DATA_DIR, exist_ok=True)
-    except:
-        DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+from brains import model_store
+from brains.model_store import DATA_DIR
 
+# Dr.-Ing. Update: PERSISTENTE SPEICHERUNG & SANITY CHECKS (v0.18.27)
+# Modell liegt im ModelStore ('energy'), das Pickle wird nur noch zur Migration gelesen
 ENERGY_MODEL_PATH = os.path.join(DATA_DIR, "energy_model.pkl")
 
+# Lueftungs-Erkennung: Ringpuffer (ts, temp) pro Raum + gleitende lineare Regression
+VENT_BUFFER_SIZE = 32        # Samples pro Raum
+VENT_WINDOW_S = 900          # Regressionsfenster (15 min)
+VENT_MIN_SAMPLES = 3
+VENT_MIN_SPAN_H = 0.08       # mind. ~5 min Zeitspanne im Fenster (wie bisher)
+VENT_GRADIENT_LIMIT = -5.0   # °C/h
+
+class TempRingBuffer:
+    """Feste Groesse, kompakte NumPy-Arrays. Aeltester Eintrag wird ueberschrieben."""
+    __slots__ = ('ts', 'temp', 'pos', 'count')
+
+    def __init__(self, size=VENT_BUFFER_SIZE):
+        self.ts = np.zeros(size, dtype=np.float64)
+        self.temp = np.zeros(size, dtype=np.float32)
+        self.pos = 0
+        self.count = 0
+
+    def push(self, ts, temp):
+        self.ts[self.pos] = ts
+        self.temp[self.pos] = temp
+        self.pos = (self.pos + 1) % len(self.ts)
+        self.count = min(self.count + 1, len(self.ts))
+
+    def window(self, since_ts):
+        """Samples mit ts >= since_ts (Reihenfolge egal fuer die Regression)."""
+        ts = self.ts[:self.count]
+        mask = ts >= since_ts
+        return ts[mask], self.temp[:self.count][mask]
+
+    def last(self):
+        if self.count == 0: return None, None
+        i = (self.pos - 1) % len(self.ts)
+        return self.ts[i], float(self.temp[i])
+
+    def previous(self):
+        """Vorletzter Eintrag (fuer den Zwei-Punkt-Fallback)."""
+        if self.count < 2: return None, None
+        i = (self.pos - 2) % len(self.ts)
+        return self.ts[i], float(self.temp[i])
+
 class EnergyBrain:
     def __init__(self):
         self.scores = {}
         self.heating = {}
         self.is_ready = False
-        self.last_state = {}
+        self.last_state = {}   # { room: TempRingBuffer }
+        self.vent_alert_rooms = set()
         # RL: Feedback Loops - Stores { "Room_Hour": penalty_score }
         self.penalties = {}
 
     def load_brain(self):
         try:
-            if os.path.exists(ENERGY_MODEL_PATH):
-                with open(ENERGY_MODEL_PATH, 'rb') as f:
-                    data = pickle.load(f)
-                    self.scores = data.get('scores', {})
-                    self.heating = data.get('heating', {})
-                    self.penalties = data.get('penalties', {})
+            stored = model_store.load('energy')
+            data = stored['values'] if stored else model_store.load_legacy_pickle(ENERGY_MODEL_PATH)
+            if data is not None:
+                self.scores = data.get('scores', {})
+                self.heating = data.get('heating', {})
+                self.penalties = data.get('penalties', {})
                 self.is_ready = True
+                if stored is None: self.save_brain()  # Migration ins neue Format
             return True
         except:
             return False
 
     def save_brain(self):
         try:
-            with open(ENERGY_MODEL_PATH, 'wb') as f:
-                pickle.dump({
-                    'scores': self.scores,
-                    'heating': self.heating,
-                    'penalties': self.penalties
-                }, f)
+            values = {
+                'scores': self.scores,
+                'heating': self.heating,
+                'penalties': self.penalties
+            }
+            model_store.save('energy', values=values,
+                             fingerprint=model_store.fingerprint(self.scores, self.heating))
         except Exception as e: print(f"[ERROR] Save Brain: {e}")
 
     # --- RL-FEEDBACK MECHANISM ---
@@ -135,34 +172,71 @@ class EnergyBrain:
         if t_forecast is None: return t_out
         return (t_out + t_forecast) / 2
 
-    def check_ventilation(self, current_temps):
+    def add_temp_sample(self, room, temp, ts=None):
+        """Fuettert den Ringpuffer eines Raums (TEMP_SAMPLE / PREDICT_ENERGY)."""
+        if temp is None: return
+        if ts is None: ts = time.time()
+        buf = self.last_state.get(room)
+        if buf is None:
+            buf = self.last_state[room] = TempRingBuffer()
+        buf.push(ts, temp)
+
+    def _ventilation_gradient(self, room, now):
+        """
+        Steigung (°C/h) per linearer Regression ueber das Zeitfenster des Ringpuffers.
+        Zu duenn besetztes Fenster (z.B. PREDICT_ENERGY nur stuendlich): wie bisher aus den
+        letzten beiden Samples, sofern sie mind. VENT_MIN_SPAN_H auseinander liegen.
+        Return: (gradient, drop) oder (None, None) wenn zu wenig Daten.
+        """
+        buf = self.last_state.get(room)
+        if buf is None: return None, None
+        ts, temps = buf.window(now - VENT_WINDOW_S)
+        if len(ts) < VENT_MIN_SAMPLES:
+            ts_last, t_last = buf.last()
+            ts_prev, t_prev = buf.previous()
+            if ts_prev is None: return None, None
+            dt_h = (ts_last - ts_prev) / 3600.0
+            if dt_h < VENT_MIN_SPAN_H: return None, None
+            drop = t_last - t_prev
+            return drop / dt_h, drop
+        t_h = (ts - ts.min()) / 3600.0
+        if t_h.max() < VENT_MIN_SPAN_H: return None, None
+        t_mean = t_h.mean()
+        dev = t_h - t_mean
+        gradient = float(np.dot(dev, temps - temps.mean()) / np.dot(dev, dev))
+        drop = gradient * float(t_h.max())
+        return gradient, drop
+
+    def check_ventilation(self, current_temps, ts=None):
+        """
+        current_temps: { room: temp }. Neue Werte gehen in den Ringpuffer, danach wird pro Raum
+        die Steigung ueber das Fenster bestimmt (nicht mehr nur der letzte Wert).
+        """
         alerts = []
-        now = time.time()
+        now = time.time() if ts is None else ts
         for room, t_now in current_temps.items():
-            if room in self.last_state:
-                last_entry = self.last_state[room]
-                t_last = last_entry['val']
-                ts_last = last_entry['ts']
-                dt_hours = (now - ts_last) / 3600.0
-                if dt_hours > 0.08:
-                    d_temp = t_now - t_last
-                    gradient = d_temp / dt_hours
-                    # Hinweis: Der Ventilation Check sieht weiterhin die "echten" extremen Werte,
-                    # um Alarm zu schlagen. Das Training sieht sie nicht mehr.
-                    if gradient < -5.0:
-                        alerts.append({
-                            'room': room,
-                            'gradient': round(gradient, 2),
-                            'drop': round(d_temp, 1),
-                            'msg': f"Starker Temperatursturz ({round(gradient,1)}°C/h). Fenster offen?"
-                        })
-            self.last_state[room] = {'ts': now, 'val': t_now}
+            self.add_temp_sample(room, t_now, now)
+            gradient, d_temp = self._ventilation_gradient(room, now)
+            # Hinweis: Der Ventilation Check sieht weiterhin die "echten" extremen Werte,
+            # um Alarm zu schlagen. Das Training sieht sie nicht mehr.
+            if gradient is not None and gradient < VENT_GRADIENT_LIMIT:
+                alerts.append({
+                    'room': room,
+                    'gradient': round(gradient, 2),
+                    'drop': round(d_temp, 1),
+                    'msg': f"Starker Temperatursturz ({round(gradient,1)}°C/h). Fenster offen?"
+                })
+                self.vent_alert_rooms.add(room)
+            else:
+                self.vent_alert_rooms.discard(room)
         return alerts
 
     # --- HYBRID INTELLIGENCE UPDATE ---
-    def calculate_warmup_times(self, current_temps, targets_config=None, pinn_brain=None, t_out=10.0, is_sunny=False, solar_flags=None):
+    def calculate_warmup_times(self, current_temps, targets_config=None, pinn_brain=None, t_out=10.0, is_sunny=False, solar_flags=None, pinn_rates=None):
         """
         Berechnet Zeit bis Zieltemperatur.
+        pinn_rates: optional vorberechnete Raten aus LightweightPINN.predict_rooms()
+                    (spart den Forward-Pass pro Raum).
         Return: (final_times, sources, details_dict)
         """
         if targets_config is None: targets_config = {}
@@ -197,8 +271,11 @@ class EnergyBrain:
 
             # --- B. PINN CALCULATION (AI) ---
             if pinn_brain and pinn_brain.is_ready:
-                solar_active = is_sunny and solar_flags.get(room, False)
-                predicted_rate = pinn_brain.predict(t_in, t_out, valve=100.0, solar=solar_active)
+                if pinn_rates is not None and room in pinn_rates:
+                    predicted_rate = pinn_rates[room]['heating']
+                else:
+                    solar_active = is_sunny and solar_flags.get(room, False)
+                    predicted_rate = pinn_brain.predict(t_in, t_out, valve=100.0, solar=solar_active, room=room)
 
                 if predicted_rate > 0.2 and predicted_rate < 10.0:
                     minutes_ai = int((diff / predicted_rate) * 60)
@@ -1,12 +1,14 @@
 import os
-import pickle
 import numpy as np
+from brains import model_store
+from brains.model_store import LEGACY_BASE_DIR
 
 # Dr.-Ing. Update: Gait Speed mit Debug-Proof (Transparenz)
 # Version: 0.28.0 (Math Proof)
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-HEALTH_MODEL_PATH = os.path.join(BASE_DIR, "health_if_model.pkl")
+# Modell im ModelStore ('health_if'); Alt-Pickle lag im Adapter-Ordner (nur Migration)
+HEALTH_MODEL_PATH = os.path.join(LEGACY_BASE_DIR, "health_if_model.pkl")
+HEALTH_FEATURE_LAYOUT = ['activityVector:96']   # 96 x 15-min-Slots pro Tag
 
 class HealthBrain:
     def __init__(self):
@@ -15,12 +17,21 @@ class HealthBrain:
 
     def load_brain(self):
         try:
-            if os.path.exists(HEALTH_MODEL_PATH):
-                with open(HEALTH_MODEL_PATH, 'rb') as f: self.model = pickle.load(f)
-                self.is_ready = True
+            stored = model_store.load('health_if', feature_layout=HEALTH_FEATURE_LAYOUT)
+            if stored is not None:
+                self.model = stored['objects']['model']; self.is_ready = True
+            else:
+                model = model_store.load_legacy_pickle(HEALTH_MODEL_PATH)
+                if model is not None:
+                    self.model = model; self.is_ready = True
+                    self._save_model(model)  # Migration ins neue Format
             return True
         except: return False
 
+    def _save_model(self, clf, X=None):
+        model_store.save('health_if', objects={'model': clf}, feature_layout=HEALTH_FEATURE_LAYOUT,
+                         fingerprint=model_store.fingerprint(X) if X is not None else None)
+
     def _prepare_features(self, digests):
         data = []
         for d in digests:
@@ -39,7 +50,7 @@ class HealthBrain:
             if len(X) < 2: return False, "Need > 2 days data"
             clf = IsolationForest(random_state=42, contamination=0.1)
             clf.fit(X)
-            with open(HEALTH_MODEL_PATH, 'wb') as f: pickle.dump(clf, f)
+            self._save_model(clf, X)
             self.model = clf; self.is_ready = True
             return True, "Isolation Forest Trained"
         except Exception as e: return False, str(e)
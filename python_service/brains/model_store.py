@@ -0,0 +1,205 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+
+"""
+ModelStore — einheitliche, versionierte Ablage fuer alle Brain-Modelle.
+
+Ein Modell = ein Verzeichnis  DATA_DIR/models/<name>/
+    manifest.json   schema_version, name, fingerprint, created, feature_layout,
+                    values (kleine JSON-Daten), arrays/objects (Dateiliste)
+    <key>.npy       numerische Arrays (Matrizen, Partikel, Gewichte) → np.load(mmap_mode='r')
+    <key>.joblib    sonstige Objekte (sklearn-Modelle), joblib mappt enthaltene Arrays ebenfalls
+
+- Schreiben ist atomar: Modell in ein Temp-Verzeichnis schreiben, dann per rename tauschen.
+- Veraltete/inkompatible Modelle (schema_version, feature_layout) werden allein ueber das
+  Manifest erkannt, ohne etwas zu unpicklen.
+"""
+
+# Einheitliches Daten-Verzeichnis (vorher: security/health in python_service/, Rest in iobroker-data)
+# COGNI_DATA_DIR ueberschreibt den Pfad (Benchmarks / Offline-Betrieb ohne ioBroker)
+ADAPTER_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.environ.get('COGNI_DATA_DIR') or \
+    os.path.join(os.path.dirname(os.path.dirname(ADAPTER_DIR)), 'iobroker-data', 'cogni-living')
+
+if not os.path.exists(DATA_DIR):
+    try:
+        os.makedirs(DATA_DIR, exist_ok=True)
+    except:
+        DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Legacy-Ablage von security.py / health.py (nur noch fuer die Migration gelesen)
+LEGACY_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCHEMA_VERSION = 1
+MANIFEST = "manifest.json"
+
+
+def log(msg):
+    print(f"[LOG] [ModelStore] {msg}")
+    sys.stdout.flush()
+
+
+def _models_dir():
+    return os.path.join(DATA_DIR, 'models')
+
+
+def _model_dir(name):
+    safe = ''.join(c if c.isalnum() or c in '_-' else '_' for c in str(name))
+    return os.path.join(_models_dir(), safe)
+
+
+def _resolve_dir(name):
+    """Aktuelles Modell-Verzeichnis; nach Absturz mitten im Tausch das vorherige (.old)."""
+    final = _model_dir(name)
+    for d in (final, final + '.old'):
+        if os.path.exists(os.path.join(d, MANIFEST)):
+            return d
+    return None
+
+
+def fingerprint(*parts):
+    """SHA1 ueber Arrays (Bytes + Shape/Dtype) und JSON-faehige Daten."""
+    h = hashlib.sha1()
+    for p in parts:
+        if isinstance(p, np.ndarray):
+            a = np.ascontiguousarray(p)
+            h.update(f"{a.dtype}{a.shape}".encode('utf-8'))
+            h.update(a.tobytes())
+        else:
+            h.update(json.dumps(p, sort_keys=True, separators=(',', ':'), default=_json_default).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _json_default(o):
+    """numpy-Skalare/Arrays in Manifest-Werten zulassen."""
+    if isinstance(o, np.ndarray): return o.tolist()
+    if isinstance(o, np.generic): return o.item()
+    raise TypeError(f"{type(o).__name__} nicht JSON-serialisierbar")
+
+
+def _dump_object(obj, path):
+    try:
+        import joblib
+        joblib.dump(obj, path)
+    except ImportError:
+        import pickle
+        with open(path, 'wb') as f: pickle.dump(obj, f)
+
+
+def _load_object(path, mmap):
+    try:
+        import joblib
+        return joblib.load(path, mmap_mode='r' if mmap else None)
+    except ImportError:
+        import pickle
+        with open(path, 'rb') as f: return pickle.load(f)
+
+
+def save(name, arrays=None, objects=None, values=None, fingerprint=None, feature_layout=None,
+         schema_version=SCHEMA_VERSION):
+    """Speichert ein Modell atomar. Gibt True zurueck wenn erfolgreich."""
+    final = _model_dir(name)
+    tmp = f"{final}.tmp{os.getpid()}"
+    old = final + '.old'
+    try:
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        manifest = {
+            'schema_version': schema_version,
+            'name': name,
+            'fingerprint': fingerprint,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'feature_layout': list(feature_layout) if feature_layout is not None else None,
+            'values': values or {},
+            'arrays': {},
+            'objects': {},
+        }
+        for key, arr in (arrays or {}).items():
+            arr = np.asarray(arr)
+            if arr.dtype == object: arr = arr.astype(str)
+            fn = f"{key}.npy"
+            np.save(os.path.join(tmp, fn), np.ascontiguousarray(arr), allow_pickle=False)
+            manifest['arrays'][key] = {'file': fn, 'dtype': str(arr.dtype), 'shape': list(arr.shape)}
+        for key, obj in (objects or {}).items():
+            fn = f"{key}.joblib"
+            _dump_object(obj, os.path.join(tmp, fn))
+            manifest['objects'][key] = fn
+        # Manifest zuletzt: ein Verzeichnis ohne Manifest gilt nicht als Modell
+        with open(os.path.join(tmp, MANIFEST), 'w') as f:
+            json.dump(manifest, f, default=_json_default)
+
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(final): os.replace(final, old)
+        os.replace(tmp, final)
+        shutil.rmtree(old, ignore_errors=True)
+        return True
+    except Exception as e:
+        log(f"Save Error ({name}): {e}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        return False
+
+
+def manifest(name):
+    """Nur das Manifest lesen (billig, kein Laden der Daten). None wenn nicht vorhanden."""
+    d = _resolve_dir(name)
+    if d is None: return None
+    try:
+        with open(os.path.join(d, MANIFEST), 'r') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def load(name, feature_layout=None, schema_version=SCHEMA_VERSION, mmap=True, load_objects=True):
+    """
+    Laedt ein Modell: {'manifest', 'values', 'arrays', 'objects', 'fingerprint'} oder None
+    (nicht vorhanden / inkompatibel). Arrays sind bei mmap=True read-only Memory-Maps —
+    Brains, die ihren Zustand in-place aendern, muessen kopieren (np.array(...)).
+    """
+    d = _resolve_dir(name)
+    if d is None: return None
+    m = manifest(name)
+    if m is None: return None
+    if m.get('schema_version') != schema_version:
+        log(f"{name}: Schema {m.get('schema_version')} != {schema_version} — Modell ignoriert")
+        return None
+    if feature_layout is not None and m.get('feature_layout') != list(feature_layout):
+        log(f"{name}: Feature-Layout geaendert — Modell ignoriert (Neutraining noetig)")
+        return None
+    try:
+        arrays = {k: np.load(os.path.join(d, a['file']), mmap_mode='r' if mmap else None, allow_pickle=False)
+                  for k, a in m.get('arrays', {}).items()}
+        objects = {}
+        if load_objects:
+            objects = {k: _load_object(os.path.join(d, fn), mmap) for k, fn in m.get('objects', {}).items()}
+        return {'manifest': m, 'values': m.get('values', {}), 'arrays': arrays, 'objects': objects,
+                'fingerprint': m.get('fingerprint')}
+    except Exception as e:
+        log(f"Load Error ({name}): {e}")
+        return None
+
+
+def exists(name):
+    return _resolve_dir(name) is not None
+
+
+def remove(name):
+    for d in (_model_dir(name), _model_dir(name) + '.old'):
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def load_legacy_pickle(path):
+    """Alt-Pickle lesen (nur Migration). None wenn nicht vorhanden/defekt."""
+    if not os.path.exists(path): return None
+    try:
+        import pickle
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        log(f"Legacy-Datei {os.path.basename(path)} nicht lesbar: {e}")
+        return None
@@ -0,0 +1,212 @@
+import numpy as np
+import time
+from datetime import datetime
+
+# MPC-Heizplaner (Model Predictive Control) auf Basis des EnergyBrain.
+# Simuliert alle Raeume gleichzeitig ueber einen 24h-Horizont und optimiert den
+# Heiz-Fahrplan (an/aus pro Zeitschritt) per Dynamischer Programmierung ueber ein
+# Temperatur-Gitter. Das ist eine vollstaendige Gitter-Suche ueber alle Raeume und
+# Zeitschritte, aber vektorisiert: Aufwand = Schritte x Raeume x Gitterpunkte x 2.
+
+T_MIN = 10.0          # Temperatur-Gitter (°C)
+T_MAX = 28.0
+T_RES = 0.2
+PINN_GRID_STEP = 1.0  # grobes Gitter fuer die PINN-Auswertung
+DEFAULT_TARGET = 21.0
+DEFAULT_SETBACK = 17.0
+
+W_ENERGY = 1.0        # Kosten pro Heizstunde (Ventil offen)
+W_COMFORT = 4.0       # Kosten pro (K unter Soll)^2 * h
+W_OVERHEAT = 0.5      # Kosten pro K * h ueber Soll + OVERHEAT_BAND
+OVERHEAT_BAND = 1.5
+PENALTY_WEIGHT = 5.0  # RL: Nutzer hat hier schon mal uebersteuert -> Komfort zaehlt mehr
+SOLAR_BONUS = 0.5     # °C/h, wie in predict_cooling
+SOLAR_HOURS = range(10, 17)
+
+
+class HeatingPlanner:
+    def __init__(self, energy_brain, pinn_brain=None):
+        self.energy = energy_brain
+        self.pinn = pinn_brain
+        self.grid = np.arange(T_MIN, T_MAX + T_RES / 2, T_RES)
+
+    # ------------------------------------------------------------------
+    # Eingaben -> Arrays (Raeume x Stunden)
+    # ------------------------------------------------------------------
+    def _target_table(self, rooms, targets, comfort_hours, setback):
+        """Soll-Temperatur pro Raum und Stunde (R x 24)."""
+        default = targets.get('default', DEFAULT_TARGET)
+        table = np.empty((len(rooms), 24))
+        for i, room in enumerate(rooms):
+            t = targets.get(room, default)
+            if isinstance(t, (list, tuple)) and len(t) == 24:
+                table[i] = t
+            else:
+                table[i] = float(t)
+        if comfort_hours:
+            start, end = int(comfort_hours[0]) % 24, int(comfort_hours[1]) % 24
+            hours = np.arange(24)
+            inside = (hours >= start) & (hours < end) if start <= end else (hours >= start) | (hours < end)
+            table[:, ~inside] = np.minimum(table[:, ~inside], setback)
+        return table
+
+    def _penalty_table(self, rooms):
+        """Komfort-Gewicht pro Raum und Stunde (R x 24) aus der RL-Penalty-Tabelle."""
+        weights = np.full((len(rooms), 24), W_COMFORT)
+        penalties = self.energy.get_penalties() if self.energy else {}
+        for i, room in enumerate(rooms):
+            for hour in range(24):
+                if penalties.get(f"{room}_{hour}", 0) > 0.5:
+                    weights[i, hour] *= PENALTY_WEIGHT
+        return weights
+
+    def _outdoor_profile(self, t_out, t_forecast, t_out_hourly, n_hours):
+        """Aussentemperatur pro Horizont-Stunde. Ohne Stundenwerte: Rampe t_out -> t_forecast ueber 4h."""
+        if t_out_hourly:
+            prof = np.array(t_out_hourly, dtype=float)
+            if len(prof) < n_hours: prof = np.concatenate([prof, np.full(n_hours - len(prof), prof[-1])])
+            return prof[:n_hours]
+        if t_forecast is None: return np.full(n_hours, float(t_out))
+        ramp = np.minimum(1.0, np.arange(n_hours) / 4.0)
+        return t_out + (t_forecast - t_out) * ramp
+
+    # ------------------------------------------------------------------
+    # Raten-Tabellen: (Horizont-Stunde, Raum, Gitterpunkt, Aktion) -> °C/h
+    # ------------------------------------------------------------------
+    def _rates_physics(self, rooms, current, t_out_prof, solar):
+        scores = self.energy.scores if self.energy else {}
+        heating = self.energy.heating if self.energy else {}
+        k = np.array([scores.get(r, -0.2) for r in rooms], dtype=float)
+        k = np.where(k < 0, k, -0.2)
+        p = np.array([heating.get(r, 3.0) for r in rooms], dtype=float)
+        p = np.where(p > 0.1, p, 1.0)
+
+        # Newton-Abkuehlung: die gelernte Rate gilt beim aktuellen Temperatur-Abstand nach aussen
+        delta0 = np.maximum(1.0, current - t_out_prof[0])
+        lam = np.abs(k) / delta0
+
+        # (H, R, B)
+        cool = -lam[None, :, None] * (self.grid[None, None, :] - t_out_prof[:, None, None])
+        cool = cool + solar
+        rates = np.stack([cool, cool + p[None, :, None]], axis=-1)
+        return rates
+
+    def _rates_pinn(self, rooms, t_out_prof, solar_on):
+        # Das Netz ist glatt in t_in: auf einem groben Gitter auswerten (ein Forward-Pass)
+        # und linear auf das feine DP-Gitter interpolieren -> ~5x weniger Netz-Zeilen.
+        coarse = np.arange(T_MIN, T_MAX + PINN_GRID_STEP / 2, PINN_GRID_STEP)
+        H, R, Bc = len(t_out_prof), len(rooms), len(coarse)
+        X = np.empty((H, R, Bc, 2, 4), dtype=np.float32)
+        X[..., 0] = coarse[None, None, :, None]
+        X[..., 1] = t_out_prof[:, None, None, None]
+        X[..., 2] = np.array([0.0, 100.0])[None, None, None, :]
+        X[..., 3] = solar_on[:, :, None, None]
+        room_names = np.broadcast_to(np.array(rooms, dtype=object)[None, :, None, None], (H, R, Bc, 2)).reshape(-1)
+        rates_c = self.pinn.predict_batch(X.reshape(-1, 4), room_names).reshape(H, R, Bc, 2)
+
+        f = (self.grid - T_MIN) / PINN_GRID_STEP
+        i0 = np.minimum(f.astype(int), Bc - 2)
+        w = (f - i0)[None, None, :, None]
+        return rates_c[:, :, i0, :] * (1 - w) + rates_c[:, :, i0 + 1, :] * w
+
+    # ------------------------------------------------------------------
+    # Planung
+    # ------------------------------------------------------------------
+    def plan(self, current_temps, t_out, targets=None, t_forecast=None, is_sunny=False, solar_flags=None,
+             comfort_hours=None, setback=DEFAULT_SETBACK, t_out_hourly=None, horizon_h=24, step_min=15, now=None):
+        """
+        Optimaler Heiz-Fahrplan pro Raum.
+        Return: { room: { schedule: [0/1 je Schritt], temps: [...], heating_hours, comfort_deficit_kh,
+                          first_on_min, source } }
+        """
+        t0 = time.perf_counter()
+        if targets is None: targets = {}
+        if solar_flags is None: solar_flags = {}
+        rooms = [r for r, t in current_temps.items() if t is not None]
+        if not rooms: return {}, 0.0
+        if now is None: now = datetime.now()
+
+        dt = step_min / 60.0
+        n_steps = int(round(horizon_h / dt))
+        n_hours = int(np.ceil(horizon_h)) + 1
+        current = np.array([current_temps[r] for r in rooms], dtype=float)
+
+        # Horizont-Stunde je Schritt + Uhrzeit (0..23) je Horizont-Stunde
+        step_hour = ((now.minute / 60.0 + np.arange(n_steps) * dt)).astype(int)
+        clock = (now.hour + np.arange(n_hours)) % 24
+
+        t_out_prof = self._outdoor_profile(t_out, t_forecast, t_out_hourly, n_hours)
+        sun = np.array([bool(is_sunny and solar_flags.get(r, False)) for r in rooms])
+        solar_on = (sun[None, :] & np.isin(clock, list(SOLAR_HOURS))[:, None]).astype(float)
+
+        use_pinn = bool(self.pinn and self.pinn.is_ready)
+        if use_pinn:
+            rates = self._rates_pinn(rooms, t_out_prof, solar_on)
+        else:
+            rates = self._rates_physics(rooms, current, t_out_prof, (solar_on * SOLAR_BONUS)[:, :, None])
+
+        target = self._target_table(rooms, targets, comfort_hours, setback)[:, clock]   # (R, Hh)
+        w_comfort = self._penalty_table(rooms)[:, clock]                                 # (R, Hh)
+
+        R, B = len(rooms), len(self.grid)
+        rows = np.arange(R)[:, None]
+
+        def interp(V, T):
+            """V (R,B) linear am Gitter interpoliert bei Temperaturen T (R,B)."""
+            f = (np.clip(T, T_MIN, T_MAX) - T_MIN) / T_RES
+            i0 = np.minimum(f.astype(int), B - 2)
+            w = f - i0
+            return V[rows, i0] * (1 - w) + V[rows, i0 + 1] * w
+
+        def stage_cost(T_next, s, action):
+            h = step_hour[s]
+            under = np.maximum(0.0, target[:, h, None] - T_next)
+            over = np.maximum(0.0, T_next - target[:, h, None] - OVERHEAT_BAND)
+            return (W_ENERGY * action + w_comfort[:, h, None] * under ** 2 + W_OVERHEAT * over) * dt
+
+        # --- Rueckwaerts: Wertfunktion + Policy ueber das Gitter ---
+        V = np.zeros((R, B))
+        policy = np.zeros((n_steps, R, B), dtype=np.uint8)
+        for s in range(n_steps - 1, -1, -1):
+            r_h = rates[step_hour[s]]                          # (R, B, 2)
+            T0 = self.grid[None, :] + r_h[:, :, 0] * dt
+            T1 = self.grid[None, :] + r_h[:, :, 1] * dt
+            Q0 = stage_cost(T0, s, 0) + interp(V, T0)
+            Q1 = stage_cost(T1, s, 1) + interp(V, T1)
+            policy[s] = Q1 < Q0
+            V = np.minimum(Q0, Q1)
+
+        # --- Vorwaerts: Fahrplan ab aktueller Temperatur simulieren ---
+        T = current.copy()
+        schedule = np.zeros((R, n_steps), dtype=np.uint8)
+        temps = np.zeros((R, n_steps + 1))
+        temps[:, 0] = T
+        deficit = np.zeros(R)
+        f_idx = np.arange(R)
+        for s in range(n_steps):
+            r_h = rates[step_hour[s]]
+            f = (np.clip(T, T_MIN, T_MAX) - T_MIN) / T_RES
+            i0 = np.minimum(f.astype(int), B - 2)
+            w = f - i0
+            rate0 = r_h[f_idx, i0, 0] * (1 - w) + r_h[f_idx, i0 + 1, 0] * w
+            rate1 = r_h[f_idx, i0, 1] * (1 - w) + r_h[f_idx, i0 + 1, 1] * w
+            # Aktion direkt aus der Policy am naechsten Gitterpunkt (stabil, keine zweite Optimierung)
+            u = policy[s][f_idx, np.rint(f).astype(int).clip(0, B - 1)]
+            T = T + np.where(u == 1, rate1, rate0) * dt
+            schedule[:, s] = u
+            temps[:, s + 1] = T
+            deficit += np.maximum(0.0, target[:, step_hour[s]] - T) * dt
+
+        result = {}
+        for i, room in enumerate(rooms):
+            on = np.flatnonzero(schedule[i])
+            result[room] = {
+                'schedule': schedule[i].tolist(),
+                'temps': np.round(temps[i], 1).tolist(),
+                'heating_hours': round(float(schedule[i].sum() * dt), 2),
+                'comfort_deficit_kh': round(float(deficit[i]), 2),
+                'first_on_min': int(on[0] * step_min) if len(on) else None,
+                'source': 'AI (PINN)' if use_pinn else 'Physics'
+            }
+        compute_ms = (time.perf_counter() - t0) * 1000.0
+        return result, round(compute_ms, 1)
@@ -1,48 +1,81 @@
 import numpy as np
-import torch
-import torch.nn as nn
-import torch.optim as optim
 import os
-import pickle
+
+# torch wird NUR fuer das Training (TRAIN_ENERGY) geladen.
+# Die Inferenz laeuft als reine NumPy-Implementierung des 4->16->16->1 tanh-MLP,
+# das spart auf ARM-Boxen mehrere hundert MB RSS und Sekunden beim Start.
+
+from brains import model_store
+from brains.model_store import DATA_DIR
 
 # Dr.-Ing. Update: PERSISTENTE SPEICHERUNG
-# Wir speichern das Modell nicht mehr im Adapter-Ordner (der bei Updates gelöscht wird),
-# sondern im sicheren ioBroker-Data Verzeichnis.
+# Gewichte + Scaler liegen als .npy im ModelStore ('pinn', im ioBroker-Data Verzeichnis).
+# Die alten Dateien (.pth / .npz / Scaler-Pickle) werden nur noch zur Migration gelesen.
+MODEL_PATH = os.path.join(DATA_DIR, "pinn_model.pth")
+WEIGHTS_PATH = os.path.join(DATA_DIR, "pinn_model.npz")
+SCALER_PATH = os.path.join(DATA_DIR, "pinn_scaler.pkl")
 
-# Pfad zum Adapter-Root
-ADAPTER_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Eingangs-Layout des Netzes (Manifest: Modell mit anderem Layout wird nicht geladen)
+FEATURE_LAYOUT = ['t_in', 't_out', 'valve', 'solar']
 
-# Pfad zum sicheren Daten-Verzeichnis (/opt/iobroker/iobroker-data/cogni-living)
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(ADAPTER_DIR)), 'iobroker-data', 'cogni-living')
+# Reihenfolge der Gewichte im Export (identisch zu den state_dict-Keys)
+WEIGHT_KEYS = ['fc1.weight', 'fc1.bias', 'fc2.weight', 'fc2.bias', 'fc3.weight', 'fc3.bias']
+# Pro-Raum-Koepfe (optional): Residuum auf fc3, Zeile i gehoert zu self.rooms[i]
+ROOM_KEYS = ['room_w.weight', 'room_b.weight']
 
-# Falls der Ordner nicht existiert, erstellen wir ihn
-if not os.path.exists(DATA_DIR):
-    try:
-        os.makedirs(DATA_DIR, exist_ok=True)
-    except:
-        # Fallback, falls Berechtigungen fehlen: Zurück ins Temp-Verzeichnis
-        DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Training: Mini-Batches + Validierungs-Split + Early Stopping
+MAX_EPOCHS = 200
+BATCH_SIZE = 64
+VAL_SPLIT = 0.2
+MIN_VAL_SAMPLES = 10
+PATIENCE = 15
+ROOM_HEAD_L2 = 1e-3   # haelt die Raum-Koepfe klein -> globaler Kopf bleibt sinnvoller Fallback
 
-MODEL_PATH = os.path.join(DATA_DIR, "pinn_model.pth")
-SCALER_PATH = os.path.join(DATA_DIR, "pinn_scaler.pkl")
+_TORCH_PINN = None
 
-class PINN(nn.Module):
-    def __init__(self):
-        super(PINN, self).__init__()
-        self.fc1 = nn.Linear(4, 16)
-        self.fc2 = nn.Linear(16, 16)
-        self.fc3 = nn.Linear(16, 1)
-        self.act = nn.Tanh()
+def _torch_pinn_class():
+    """Baut die torch-Modellklasse erst bei Bedarf (lazy import)."""
+    global _TORCH_PINN
+    if _TORCH_PINN is None:
+        import torch.nn as nn
+
+        class PINN(nn.Module):
+            def __init__(self, n_rooms=0):
+                super(PINN, self).__init__()
+                self.fc1 = nn.Linear(4, 16)
+                self.fc2 = nn.Linear(16, 16)
+                self.fc3 = nn.Linear(16, 1)
+                self.act = nn.Tanh()
+                self.n_rooms = n_rooms
+                if n_rooms > 0:
+                    # Kleiner linearer Kopf pro Raum, startet bei 0 (= globales Modell)
+                    self.room_w = nn.Embedding(n_rooms, 16)
+                    self.room_b = nn.Embedding(n_rooms, 1)
+                    nn.init.zeros_(self.room_w.weight)
+                    nn.init.zeros_(self.room_b.weight)
 
-    def forward(self, x):
-        x = self.act(self.fc1(x))
-        x = self.act(self.fc2(x))
-        return self.fc3(x)
+            def forward(self, x, room_idx=None):
+                x = self.act(self.fc1(x))
+                x = self.act(self.fc2(x))
+                out = self.fc3(x)
+                if self.n_rooms > 0 and room_idx is not None:
+                    known = (room_idx >= 0).float().unsqueeze(1)
+                    idx = room_idx.clamp(min=0)
+                    delta = (x * self.room_w(idx)).sum(dim=1, keepdim=True) + self.room_b(idx)
+                    out = out + delta * known
+                return out
+
+        _TORCH_PINN = PINN
+    return _TORCH_PINN
+
+def _state_dict_to_numpy(state_dict):
+    return {k: v.detach().cpu().numpy().astype(np.float32) for k, v in state_dict.items()
+            if k in WEIGHT_KEYS or k in ROOM_KEYS}
 
 class LightweightPINN:
     def __init__(self):
-        self.model = PINN()
-        self.optimizer = optim.Adam(self.model.parameters(), lr=0.005)
+        self.weights = None   # {state_dict-Key: np.ndarray float32} fuer die NumPy-Inferenz
+        self.rooms = []       # Raum-Reihenfolge der Pro-Raum-Koepfe
         self.is_ready = False
 
         self.scalers = {
@@ -52,26 +85,81 @@ class LightweightPINN:
 
     def load_brain(self):
         try:
-            if os.path.exists(MODEL_PATH):
-                self.model.load_state_dict(torch.load(MODEL_PATH))
-                self.model.eval()
+            stored = model_store.load('pinn', feature_layout=FEATURE_LAYOUT)
+            if stored is not None:
+                arrays = stored['arrays']
+                self.weights = {k: arrays[k] for k in WEIGHT_KEYS + ROOM_KEYS if k in arrays}
+                self.rooms = list(stored['values'].get('rooms', []))
+                if 'scaler_mean' in arrays:
+                    self.scalers = {'mean': np.array(arrays['scaler_mean']), 'std': np.array(arrays['scaler_std'])}
+                self.is_ready = True
+                return True
+
+            # Migration: Alt-Formate einlesen und einmalig in den ModelStore schreiben
+            if os.path.exists(WEIGHTS_PATH):
+                with np.load(WEIGHTS_PATH) as npz:
+                    self.weights = {k: npz[k].astype(np.float32) for k in WEIGHT_KEYS + ROOM_KEYS if k in npz}
+                    self.rooms = [str(r) for r in npz['rooms']] if 'rooms' in npz else []
                 self.is_ready = True
-            if os.path.exists(SCALER_PATH):
-                with open(SCALER_PATH, 'rb') as f:
-                    self.scalers = pickle.load(f)
+            elif os.path.exists(MODEL_PATH):
+                # altes .pth einmalig mit torch lesen
+                import torch
+                self.weights = _state_dict_to_numpy(torch.load(MODEL_PATH, map_location='cpu'))
+                self.is_ready = True
+            scalers = model_store.load_legacy_pickle(SCALER_PATH)
+            if scalers is not None: self.scalers = scalers
+            if self.is_ready: self._export_weights()
             return True
         except:
             return False
 
-    def _normalize(self, X):
-        safe_std = np.maximum(self.scalers['std'], 1.0)
-        return (X - self.scalers['mean']) / safe_std
+    def _export_weights(self):
+        try:
+            arrays = dict(self.weights)
+            arrays['scaler_mean'] = np.asarray(self.scalers['mean'], dtype=np.float64)
+            arrays['scaler_std'] = np.asarray(self.scalers['std'], dtype=np.float64)
+            model_store.save('pinn', arrays=arrays, values={'rooms': list(self.rooms)},
+                             fingerprint=model_store.fingerprint(*[arrays[k] for k in sorted(arrays)]),
+                             feature_layout=FEATURE_LAYOUT)
+        except Exception as e:
+            print(f"[ERROR] PINN Weights Export: {e}")
+
+    def _room_indices(self, rooms, n):
+        """Raumnamen -> Kopf-Index (-1 = unbekannt/kein Raum -> nur globaler Kopf)."""
+        if rooms is None or not self.rooms: return np.full(n, -1, dtype=np.int64)
+        lookup = {r: i for i, r in enumerate(self.rooms)}
+        return np.array([lookup.get(r, -1) for r in rooms], dtype=np.int64)
+
+    def _forward(self, X_norm, room_idx=None):
+        """NumPy-Forward-Pass, identisch zu PINN.forward (tanh, tanh, linear + Raum-Residuum)."""
+        w = self.weights
+        h = np.tanh(X_norm @ w['fc1.weight'].T + w['fc1.bias'])
+        h = np.tanh(h @ w['fc2.weight'].T + w['fc2.bias'])
+        out = h @ w['fc3.weight'].T + w['fc3.bias']
+        if room_idx is not None and 'room_w.weight' in w:
+            known = room_idx >= 0
+            if known.any():
+                idx = room_idx[known]
+                delta = np.einsum('ij,ij->i', h[known], w['room_w.weight'][idx]) + w['room_b.weight'][idx, 0]
+                out[known, 0] += delta
+        return out
+
+    def _normalize(self, X, scalers=None):
+        scalers = scalers if scalers is not None else self.scalers
+        safe_std = np.maximum(scalers['std'], 1.0)
+        return (X - scalers['mean']) / safe_std
 
     def train(self, data_points):
+        """
+        Training mit Pro-Raum-Koepfen (Residuum auf den globalen Kopf), Mini-Batches,
+        Validierungs-Split mit Early Stopping und Warm-Start aus den bisherigen Gewichten.
+        data_points: [{t_in, t_out, valve, solar, delta_t, room (optional)}]
+        """
         if not data_points: return False, "No Data"
 
         X_list = []
         y_list = []
+        room_list = []
 
         for d in data_points:
             if np.isnan(d['t_in']) or np.isnan(d['delta_t']): continue
@@ -85,57 +173,153 @@ class LightweightPINN:
 
             X_list.append([val, out, vlv, sol])
             y_list.append([target])
+            room_list.append(d.get('room'))
 
         if len(X_list) < 10: return False, "Not enough clean data"
 
         X = np.array(X_list, dtype=np.float32)
         y = np.array(y_list, dtype=np.float32)
 
-        self.scalers['mean'] = X.mean(axis=0)
-        self.scalers['std'] = X.std(axis=0)
+        # Neuer Scaler gilt erst mit den neuen Gewichten (Uebernahme + _export_weights am Ende)
+        scalers = {'mean': X.mean(axis=0), 'std': X.std(axis=0)}
 
         try:
-            with open(SCALER_PATH, 'wb') as f:
-                pickle.dump(self.scalers, f)
-        except Exception as e:
-            return False, f"Save Error (Perms?): {str(e)}"
+            import torch
+            import torch.nn as nn
+            import torch.optim as optim
+        except ImportError:
+            return False, "torch nicht installiert (nur fuer Training noetig)"
+
+        # Bekannte Raeume behalten ihren Index (Warm-Start), neue werden angehaengt
+        rooms = list(self.rooms)
+        for r in room_list:
+            if r is not None and r not in rooms: rooms.append(r)
+        lookup = {r: i for i, r in enumerate(rooms)}
+        room_idx = np.array([lookup.get(r, -1) for r in room_list], dtype=np.int64)
 
-        X_norm = self._normalize(X)
-        inputs = torch.tensor(X_norm)
-        targets = torch.tensor(y)
+        model = _torch_pinn_class()(len(rooms))
+        if self.weights is not None:
+            # Warm-Start: globale Gewichte + Koepfe der bereits bekannten Raeume uebernehmen
+            state = model.state_dict()
+            for k in WEIGHT_KEYS:
+                state[k] = torch.tensor(np.asarray(self.weights[k]))
+            if len(rooms) > 0 and 'room_w.weight' in self.weights:
+                n_old = len(self.rooms)
+                state['room_w.weight'][:n_old] = torch.tensor(np.asarray(self.weights['room_w.weight']))
+                state['room_b.weight'][:n_old] = torch.tensor(np.asarray(self.weights['room_b.weight']))
+            model.load_state_dict(state)
+        optimizer = optim.Adam(model.parameters(), lr=0.005)
+        scheduler = optim.lr_scheduler.ReduceLROnPlateau(optimizer, factor=0.5, patience=5)
+
+        X_norm = self._normalize(X, scalers).astype(np.float32)
+        inputs = torch.from_numpy(X_norm)
+        targets = torch.from_numpy(y)
+        idx_t = torch.from_numpy(room_idx)
+
+        # Validierungs-Split (deterministisch), bei sehr wenig Daten wird auf dem Train-Set gestoppt
+        n = len(X_norm)
+        perm = torch.randperm(n, generator=torch.Generator().manual_seed(42))
+        n_val = int(n * VAL_SPLIT) if n * VAL_SPLIT >= MIN_VAL_SAMPLES else 0
+        val_ids, train_ids = perm[:n_val], perm[n_val:]
+        if n_val == 0: val_ids = train_ids
 
-        self.model.train()
         criterion = nn.MSELoss()
+        best_loss = float('inf')
+        best_state = None
+        bad_epochs = 0
+        epochs_run = 0
 
-        final_loss = 999.0
+        for epoch in range(MAX_EPOCHS):
+            model.train()
+            shuffled = train_ids[torch.randperm(len(train_ids))]
+            for start in range(0, len(shuffled), BATCH_SIZE):
+                batch = shuffled[start:start + BATCH_SIZE]
+                optimizer.zero_grad()
+                outputs = model(inputs[batch], idx_t[batch])
+                loss = criterion(outputs, targets[batch])
+                if model.n_rooms > 0:
+                    loss = loss + ROOM_HEAD_L2 * (model.room_w.weight.pow(2).sum() + model.room_b.weight.pow(2).sum())
 
-        for epoch in range(200):
-            self.optimizer.zero_grad()
-            outputs = self.model(inputs)
-            loss = criterion(outputs, targets)
+                if torch.isnan(loss):
+                    return False, "Loss is NaN"
 
-            if torch.isnan(loss):
-                return False, "Loss is NaN"
+                loss.backward()
+                torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
+                optimizer.step()
+
+            model.eval()
+            with torch.no_grad():
+                val_loss = criterion(model(inputs[val_ids], idx_t[val_ids]), targets[val_ids]).item()
+            scheduler.step(val_loss)
+            epochs_run = epoch + 1
 
-            loss.backward()
-            torch.nn.utils.clip_grad_norm_(self.model.parameters(), max_norm=1.0)
-            self.optimizer.step()
-            final_loss = loss.item()
+            if val_loss < best_loss - 1e-5:
+                best_loss = val_loss
+                best_state = {k: v.clone() for k, v in model.state_dict().items()}
+                bad_epochs = 0
+            else:
+                bad_epochs += 1
+                if bad_epochs >= PATIENCE: break
 
-        torch.save(self.model.state_dict(), MODEL_PATH)
+        if best_state is not None: model.load_state_dict(best_state)
+        model.eval()
+        self.weights = _state_dict_to_numpy(model.state_dict())
+        self.scalers = scalers
+        self.rooms = rooms
+        self._export_weights()
         self.is_ready = True
-        return True, f"Training success. Final Loss: {final_loss:.4f}"
+        loss_name = "Val Loss" if n_val > 0 else "Final Loss"
+        return True, f"Training success. {loss_name}: {best_loss:.4f} ({epochs_run} Epochen, {len(rooms)} Raeume)"
 
-    def predict(self, t_in, t_out, valve=0.0, solar=False):
-        if not self.is_ready: return 0.0
+    def predict_batch(self, X, rooms=None):
+        """
+        Vektorisierte Variante von predict(): ein Forward-Pass fuer alle Zeilen.
+        X: N x 4 [t_in, t_out, valve, solar], rooms: optional N Raumnamen (Pro-Raum-Kopf).
+        Return: np.array (N,) in °C/h, geclippt auf +-5.
+        """
+        X = np.asarray(X, dtype=np.float32).reshape(-1, 4)
+        if not self.is_ready or self.weights is None or len(X) == 0: return np.zeros(len(X))
         try:
-            X = np.array([[t_in, t_out, valve, 1.0 if solar else 0.0]], dtype=np.float32)
-            X_norm = self._normalize(X)
-            with torch.no_grad():
-                pred = self.model(torch.tensor(X_norm))
-            val = float(pred.item())
-            if val < -5.0: val = -5.0
-            if val > 5.0: val = 5.0
-            return val
+            X_norm = self._normalize(X).astype(np.float32)
+            pred = self._forward(X_norm, self._room_indices(rooms, len(X)))
+            return np.clip(pred.reshape(-1).astype(float), -5.0, 5.0)
         except:
-            return 0.0
\ No newline at end of file
+            return np.zeros(len(X))
+
+    def predict_rooms(self, current_temps, t_out, is_sunny=False, solar_flags=None):
+        """
+        Alle Raeume x Szenarien (Ventil 0/100, Solar aus/an) in EINEM Forward-Pass.
+        Return: { room: { 'idle': rate, 'heating': rate, 'grid': [[v0_s0, v0_s1], [v100_s0, v100_s1]] } }
+        'idle'/'heating' sind bereits fuer den aktuellen Solar-Zustand des Raums ausgewaehlt.
+        """
+        if solar_flags is None: solar_flags = {}
+        rooms = list(current_temps.keys())
+        if not rooms: return {}
+
+        t_in = np.array([current_temps[r] for r in rooms], dtype=np.float32)
+        # Szenario-Gitter: (Raum, Ventil, Solar) -> Zeile
+        valves = np.array([0.0, 100.0], dtype=np.float32)
+        solars = np.array([0.0, 1.0], dtype=np.float32)
+        n = len(rooms)
+        X = np.empty((n, 2, 2, 4), dtype=np.float32)
+        X[..., 0] = t_in[:, None, None]
+        X[..., 1] = t_out
+        X[..., 2] = valves[None, :, None]
+        X[..., 3] = solars[None, None, :]
+
+        rates = self.predict_batch(X.reshape(-1, 4), np.repeat(rooms, 4)).reshape(n, 2, 2)
+
+        results = {}
+        for i, room in enumerate(rooms):
+            s = 1 if (is_sunny and solar_flags.get(room, False)) else 0
+            results[room] = {
+                'idle': float(rates[i, 0, s]),
+                'heating': float(rates[i, 1, s]),
+                'grid': rates[i].tolist()
+            }
+        return results
+
+    def predict(self, t_in, t_out, valve=0.0, solar=False, room=None):
+        if not self.is_ready: return 0.0
+        rooms = [room] if room is not None else None
+        return float(self.predict_batch([[t_in, t_out, valve, 1.0 if solar else 0.0]], rooms)[0])
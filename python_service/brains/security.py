@@ -3,17 +3,64 @@ import pickle
 import numpy as np
 import json
 import time
+from brains import model_store
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MODEL_PATH = os.path.join(BASE_DIR, "security_model.keras")
 SCALER_PATH = os.path.join(BASE_DIR, "security_scaler.pkl")
 VOCAB_PATH = os.path.join(BASE_DIR, "security_vocab.pkl")
-GRAPH_MODEL_PATH = os.path.join(BASE_DIR, "graph_behavior.pkl")
+GRAPH_MODEL_PATH = os.path.join(BASE_DIR, "graph_behavior.pkl")   # Legacy (Migration) -> ModelStore 'graph_behavior'
 CONFIG_PATH = os.path.join(BASE_DIR, "security_config.json")
 # IsolationForest-Modell fÃ¼r Sequenz-Anomalie (trainiert aus dailyDigests)
-IF_MODEL_PATH = os.path.join(BASE_DIR, "security_if_model.pkl")
+IF_MODEL_PATH = os.path.join(BASE_DIR, "security_if_model.pkl")   # Legacy (Migration) -> ModelStore 'security_if'
+IF_FEATURE_LAYOUT = ['activityVector:96']
 DEFAULT_THRESHOLD = 0.05
 
+# Markov-Scorer ueber die gelernte Uebergangs-Matrix (graph_behavior)
+MARKOV_SMOOTHING = 0.05          # Anteil Topologie-Prior fuer nie gesehene (aber moegliche) Uebergaenge
+MARKOV_EPS = 1e-4                # Restwahrscheinlichkeit, auch fuer nicht benachbarte Raeume
+MARKOV_ALERT_P = 0.01            # p < 1% UND nicht benachbart (Topologie) = "unmoeglicher Weg"
+MARKOV_SURPRISE_SCALE = -np.log(1e-3)   # Surprise (nats) bei der der Score 1.0 erreicht
+
+# Tageszeit-abhaengige Uebergaenge (Stunde x Raum x Raum)
+HOUR_BUCKETS = 24
+HOUR_KERNEL = (0.25, 0.5, 0.25)  # Glaettung ueber Nachbarstunden (zyklisch: 23h <-> 0h)
+HOUR_PRIOR_STRENGTH = 5.0        # Pseudo-Uebergaenge aus der Gesamtmatrix je Zeile und Stunde
+
+# Signal-Ausbreitung (SIMULATE_SIGNAL) ueber die Topologie
+DIFFUSION_MODES = ('heat', 'ppr', 'neighbors')
+DIFFUSION_TIME = 1.0             # Heat-Kernel exp(-t L): groesser = weiter ueber mehrere Raeume
+PPR_ALPHA = 0.15                 # Personalized PageRank: Ruecksprung-Wahrscheinlichkeit
+SIGNAL_MIN_SCORE = 0.05
+DIFFUSION_CACHE_MAX = 8          # gecachte Kernel-Matrizen (mode, Parameter) pro Topologie
+
+_UMLAUTS = {'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'}
+
+def normalize_room(name):
+    """Raum-ID wie in der Bridge: klein, Umlaute ersetzt, Leerzeichen -> _, nur [a-z0-9_]."""
+    s = str(name or '').strip().lower()
+    for k, v in _UMLAUTS.items(): s = s.replace(k, v)
+    s = '_'.join(s.split())
+    return ''.join(c for c in s if c.isalnum() and c.isascii() or c == '_')
+
+def sequence_rooms(sequence):
+    """Raumliste aus allen Sequenz-Formaten: ['kueche', ...], [{loc, t_delta}, ...] oder {steps: [...]}."""
+    if isinstance(sequence, dict): sequence = sequence.get('steps', [])
+    rooms = []
+    for step in (sequence or []):
+        room = step if isinstance(step, str) else (step.get('loc') if isinstance(step, dict) else None)
+        if room: rooms.append(str(room))
+    return rooms
+
+def sequence_hour(sequence):
+    """Stunde eines Sequenz-Pakets (daytime oder timestamp), sonst None."""
+    if not isinstance(sequence, dict): return None
+    try:
+        if sequence.get('daytime') is not None: return int(sequence['daytime']) % HOUR_BUCKETS
+        if sequence.get('timestamp'): return time.localtime(sequence['timestamp'] / 1000.0).tm_hour
+    except Exception: pass
+    return None
+
 class SecurityBrain:
     def __init__(self):
         self.model = None; self.scaler = None; self.vocab_encoder = None
@@ -35,9 +82,13 @@ class SecurityBrain:
     def _load_if_model(self):
         """LÃ¤dt den IsolationForest sofern bereits trainiert."""
         try:
-            if os.path.exists(IF_MODEL_PATH):
-                with open(IF_MODEL_PATH, 'rb') as f:
-                    self.if_model = pickle.load(f)
+            stored = model_store.load('security_if', feature_layout=IF_FEATURE_LAYOUT)
+            if stored is not None:
+                self.if_model = stored['objects']['model']
+            else:
+                self.if_model = model_store.load_legacy_pickle(IF_MODEL_PATH)
+                if self.if_model is not None:
+                    model_store.save('security_if', objects={'model': self.if_model}, feature_layout=IF_FEATURE_LAYOUT)
         except Exception:
             self.if_model = None
 
@@ -73,8 +124,8 @@ class SecurityBrain:
             X = np.array(vectors)
             clf = IsolationForest(random_state=42, contamination=0.1)
             clf.fit(X)
-            with open(IF_MODEL_PATH, 'wb') as f:
-                pickle.dump(clf, f)
+            model_store.save('security_if', objects={'model': clf}, feature_layout=IF_FEATURE_LAYOUT,
+                             fingerprint=model_store.fingerprint(X))
             self.if_model = clf
             return True
         except Exception:
@@ -89,8 +140,8 @@ class SecurityBrain:
             return None
         try:
             vec = [0] * 96
-            for step in (sequence or []):
-                room = str(step).lower() if isinstance(step, str) else str(step.get('loc', '')).lower()
+            for step in sequence_rooms(sequence):
+                room = step.lower()
                 h = hash(room) % 96
                 if vec[h] < 5: vec[h] += 1
             X = np.array([vec])
@@ -100,8 +151,14 @@ class SecurityBrain:
             return None
 
     def load_brain(self):
+        # Graph-Verhalten (Markov-Scorer) und IsolationForest brauchen kein TensorFlow
+        self.graph.load_behavior()
+        self._load_if_model()
         try:
             import tensorflow as tf
+        except ImportError:
+            return True
+        try:
             if os.path.exists(MODEL_PATH) and os.path.exists(SCALER_PATH) and os.path.exists(VOCAB_PATH):
                 self.model = tf.keras.models.load_model(MODEL_PATH)
                 with open(SCALER_PATH, 'rb') as f: self.scaler = pickle.load(f)
@@ -112,8 +169,6 @@ class SecurityBrain:
                         self.max_seq_len = conf.get('max_seq_len', 20)
                         self.dynamic_threshold = conf.get('threshold', DEFAULT_THRESHOLD)
                 self.is_ready = True
-            self.graph.load_behavior()
-            self._load_if_model()
             return True
         except Exception as e: return False
 
@@ -190,21 +245,45 @@ class SecurityBrain:
             return False, str(e), DEFAULT_THRESHOLD
 
     def predict(self, sequence):
+        """Return: (anomaly_score, is_anomaly, explanation, markov-Details oder None)."""
         self.check_learning_status()
+        markov = None
 
         try:
+            rooms = sequence_rooms(sequence)
             # IsolationForest-Score (personalisiert, trainiert auf eigenen Daten)
-            if_score = self._if_score(sequence)
+            if_score = self._if_score(rooms)
+            # Markov-Surprise der Raum-Uebergaenge (gelernte graph_behavior-Matrix)
+            markov = self.graph.score_sequence(rooms, sequence_hour(sequence))
+            has_markov = bool(markov and markov['n_transitions'] > 0)
 
-            if if_score is not None:
-                anomaly_score = if_score
-            else:
+            if if_score is None and not has_markov:
                 # Kein trainiertes Modell: KEIN Alarm ausloesen
                 # Erst nach erfolgreichem Training sinnvoll
                 anomaly_score = 0.1
-                return anomaly_score, False, "Kein Modell trainiert - bitte Training starten"
-            is_anomaly = anomaly_score > self.dynamic_threshold
-            explanation = f"IF Score: {anomaly_score:.3f}" if if_score is not None else "Fallback score"
+                return anomaly_score, False, "Kein Modell trainiert - bitte Training starten", markov
+
+            parts = []
+            is_anomaly = False
+            anomaly_score = 0.0
+            if if_score is not None:
+                anomaly_score = if_score
+                is_anomaly = anomaly_score > self.dynamic_threshold
+                parts.append(f"IF Score: {anomaly_score:.3f}")
+            if has_markov:
+                # Seltene Wege zwischen Nachbarraeumen sind normal; Alarm nur bei Spruengen ohne Verbindung
+                impossible = [t for t in markov['transitions'] if not t['adjacent'] and t['p'] < MARKOV_ALERT_P]
+                if impossible:
+                    is_anomaly = True
+                    anomaly_score = max(anomaly_score, markov['score'])
+                    worst = max(impossible, key=lambda t: t['surprise'])
+                    parts.append(f"Unwahrscheinlicher Weg {worst['from']}->{worst['to']} (p={worst['p']:.4f})")
+                else:
+                    parts.append(f"Markov: {markov['mean_surprise']:.2f} nats/Schritt")
+            explanation = " | ".join(parts)
+            anomaly_score = float(anomaly_score)
+            is_anomaly = bool(is_anomaly)
+            sequence = rooms
 
             # Overlay: Lernmodus vetoed Anomalien
             if is_anomaly and self.learning_mode_active:
@@ -218,14 +297,24 @@ class SecurityBrain:
                     anomaly_score = 0.0
                     explanation = f"Learned new pattern ({self.learning_label})"
 
-            return anomaly_score, is_anomaly, explanation
+            return anomaly_score, is_anomaly, explanation, markov
 
         except Exception as e:
-            return 0.1, False, str(e)
+            return 0.1, False, str(e), markov
 
 class GraphEngine:
     def __init__(self):
         self.rooms = []; self.adj_matrix = None; self.behavior_matrix = None; self.norm_laplacian = None; self.ready = False
+        self.topology_version = 0   # +1 bei jedem SET_TOPOLOGY (invalidiert Diffusions-Caches)
+        self._eig = None            # (Eigenwerte, Eigenvektoren) der normierten Adjazenz
+        self._diffusion_cache = {}
+        self.behavior_rooms = []    # Raum-Reihenfolge der behavior_matrix (aus TRAIN_TOPOLOGY)
+        self.behavior_hourly = None # Uebergangs-Zaehler (24, n, n) je Stunde, Memory-Map
+        self.log_probs = None       # geglaettete log P(naechster Raum | Raum), fuer score_sequence
+        self.log_probs_hourly = None
+        self._markov_key = None
+        self._markov_index = {}
+        self._markov_adjacent = None
 
     def update_topology(self, payload):
         try:
@@ -238,26 +327,213 @@ class GraphEngine:
             with np.errstate(divide='ignore'): D_inv_sqrt = np.power(D, -0.5)
             D_inv_sqrt[np.isinf(D_inv_sqrt)] = 0.
             self.norm_laplacian = D_inv_sqrt.dot(self.adj_matrix).dot(D_inv_sqrt)
+            self.topology_version += 1
+            self._eig = None
+            self._diffusion_cache = {}
+            self._room_index = {}
+            for i, r in enumerate(self.rooms):
+                self._room_index[r] = i
+                self._room_index.setdefault(normalize_room(r), i)
             self.ready = True
         except: pass
 
     def load_behavior(self):
-        if os.path.exists(GRAPH_MODEL_PATH):
-            try:
-                with open(GRAPH_MODEL_PATH, 'rb') as f: self.behavior_matrix = pickle.load(f)
-            except: pass
-
-    def propagate_signal(self, start_room):
-        if not self.ready or start_room not in self.rooms: return {}
-        # Simple propagation simulation
+        try:
+            stored = model_store.load('graph_behavior')
+            if stored is not None:
+                self.behavior_matrix = stored['arrays']['matrix']   # read-only Memory-Map
+                self.behavior_rooms = list(stored['values'].get('rooms', []))
+                self.behavior_hourly = stored['arrays'].get('hourly')      # fehlt bei Alt-Modellen
+            else:
+                mat = model_store.load_legacy_pickle(GRAPH_MODEL_PATH)
+                if mat is not None: self.save_behavior(mat, self.rooms)
+        except: pass
+
+    def save_behavior(self, mat, rooms, hourly=None):
+        """Uebergangs-Matrix (Zeilen-normiert, Reihenfolge = rooms) + optional Stunden-Zaehler speichern."""
+        self.behavior_matrix = np.asarray(mat, dtype=float)
+        self.behavior_rooms = list(rooms)
+        self.behavior_hourly = np.asarray(hourly, dtype=np.float32) if hourly is not None else None
+        arrays = {'matrix': self.behavior_matrix}
+        if self.behavior_hourly is not None: arrays['hourly'] = self.behavior_hourly
+        return model_store.save('graph_behavior', arrays=arrays, values={'rooms': list(rooms)},
+                                fingerprint=model_store.fingerprint(*arrays.values(), list(rooms)))
+
+    def count_transitions(self, sequences, hours=None):
+        """
+        Raum-Uebergaenge zaehlen (ohne Selbst-Uebergaenge), ein bincount-Durchlauf fuer alle Stunden.
+        sequences: Raumlisten oder Pakete {steps, daytime/timestamp}; hours: optional parallel zu sequences.
+        Return: (counts (n,n), hourly (24,n,n) oder None wenn keine Stunde bekannt, Anzahl, verworfene Sequenzen)
+        """
         n = len(self.rooms)
-        x = np.zeros(n)
-        if start_room in self.rooms:
-            idx = self.rooms.index(start_room)
-            x[idx] = 1.0
-            scores = self.norm_laplacian.dot(x)
-            result = {}
-            for i, val in enumerate(scores):
-                if self.rooms[i] != start_room and val > 0.05: result[self.rooms[i]] = float(round(val, 3))
-            return dict(sorted(result.items(), key=lambda item: item[1], reverse=True))
-        return {}
+        room_map = {normalize_room(r): i for i, r in enumerate(self.rooms)}
+        src, dst, hrs = [], [], []
+        dropped = 0
+        for k, seq in enumerate(sequences or []):
+            idx = np.array([room_map.get(normalize_room(r), -1) for r in sequence_rooms(seq)], dtype=np.int64)
+            idx = idx[idx >= 0]
+            if len(idx) < 2:
+                dropped += 1
+                continue
+            hour = sequence_hour(seq)
+            if hours is not None and k < len(hours) and hours[k] is not None:
+                hour = int(hours[k]) % HOUR_BUCKETS
+            move = idx[:-1] != idx[1:]
+            src.append(idx[:-1][move]); dst.append(idx[1:][move])
+            hrs.append(np.full(int(move.sum()), -1 if hour is None else hour, dtype=np.int64))
+        if not src:
+            return np.zeros((n, n)), None, 0, dropped
+
+        flat = np.concatenate(src) * n + np.concatenate(dst)
+        hrs = np.concatenate(hrs)
+        counts = np.bincount(flat, minlength=n * n).reshape(n, n).astype(float)
+        timed = hrs >= 0
+        hourly = None
+        if timed.any():
+            hourly = np.bincount(hrs[timed] * n * n + flat[timed], minlength=HOUR_BUCKETS * n * n)
+            hourly = hourly.reshape(HOUR_BUCKETS, n, n).astype(np.float32)
+        return counts, hourly, len(flat), dropped
+
+    def diffusion_matrix(self, mode='heat', t=DIFFUSION_TIME, alpha=PPR_ALPHA):
+        """
+        Ausbreitungs-Matrix K (n x n, symmetrisch), Spalte j = Signal aus Raum j.
+        Eine Eigenzerlegung A_norm = U diag(lam) U^T pro Topologie-Version, daraus:
+          heat:      exp(-t L) = U diag(exp(-t (1 - lam))) U^T           (L = I - A_norm)
+          ppr:       alpha (I - (1-alpha) A_norm)^-1 = U diag(alpha / (1 - (1-alpha) lam)) U^T
+          neighbors: A_norm (nur direkte Nachbarn, bisheriges Verhalten)
+        Ergebnisse werden je (mode, Parameter) gecacht.
+        """
+        if not self.ready or self.norm_laplacian is None: return None
+        if mode == 'neighbors': return self.norm_laplacian
+        if mode not in DIFFUSION_MODES: raise ValueError(f"Unbekannter Diffusions-Modus: {mode}")
+        param = round(float(t if mode == 'heat' else alpha), 6)
+        key = (mode, param)
+        K = self._diffusion_cache.get(key)
+        if K is not None: return K
+
+        if self._eig is None:
+            self._eig = np.linalg.eigh(self.norm_laplacian)
+        lam, U = self._eig
+        if mode == 'heat':
+            g = np.exp(-param * (1.0 - lam))
+        else:
+            if not 0.0 < param <= 1.0: raise ValueError("alpha muss in (0, 1] liegen")
+            g = param / (1.0 - (1.0 - param) * lam)
+        K = (U * g).dot(U.T)
+        K[np.abs(K) < 1e-12] = 0.0
+
+        if len(self._diffusion_cache) >= DIFFUSION_CACHE_MAX:
+            self._diffusion_cache.pop(next(iter(self._diffusion_cache)))
+        self._diffusion_cache[key] = K
+        return K
+
+    def _signal_scores(self, K, idx, min_score):
+        result = {}
+        for i, val in enumerate(K[:, idx]):
+            if i != idx and val > min_score: result[self.rooms[i]] = float(round(val, 3))
+        return dict(sorted(result.items(), key=lambda item: item[1], reverse=True))
+
+    def propagate_signal(self, start_room, mode='neighbors', t=DIFFUSION_TIME, alpha=PPR_ALPHA, min_score=SIGNAL_MIN_SCORE):
+        """Signal-Staerke in den anderen Raeumen bei Start in start_room (mehrere Hops bei heat/ppr)."""
+        if not self.ready or start_room is None: return {}
+        idx = self._room_index.get(start_room, self._room_index.get(normalize_room(start_room)))
+        if idx is None: return {}
+        K = self.diffusion_matrix(mode, t, alpha)
+        return self._signal_scores(K, idx, min_score)
+
+    def propagation_table(self, mode='neighbors', t=DIFFUSION_TIME, alpha=PPR_ALPHA, min_score=SIGNAL_MIN_SCORE):
+        """Ausbreitung von allen Raeumen aus: { start_room: { room: score } } aus derselben Kernel-Matrix."""
+        if not self.ready: return {}
+        K = self.diffusion_matrix(mode, t, alpha)
+        return {room: self._signal_scores(K, j, min_score) for j, room in enumerate(self.rooms)}
+
+    # ------------------------------------------------------------------
+    # Markov-Scorer: log-Likelihood einer Raum-Sequenz unter behavior_matrix
+    # ------------------------------------------------------------------
+    def _prepare_markov(self):
+        """
+        Geglaettete log-Wahrscheinlichkeiten einmal pro Matrix/Topologie vorberechnen:
+        P_s = (1-a) * P + a * Topologie-Prior (Nachbarn gleichverteilt) + EPS, zeilen-normiert.
+        Zeilen ohne Trainingsdaten nutzen nur den Prior.
+        """
+        key = (id(self.behavior_matrix), id(self.behavior_hourly), tuple(self.behavior_rooms),
+               id(self.adj_matrix), tuple(self.rooms))
+        if key == self._markov_key: return self.log_probs is not None
+        self._markov_key = key
+        self.log_probs = None
+        self.log_probs_hourly = None
+        if self.behavior_matrix is None: return False
+        P = np.asarray(self.behavior_matrix, dtype=float)
+        n = P.shape[0]
+        rooms = self.behavior_rooms if len(self.behavior_rooms) == n else (self.rooms if len(self.rooms) == n else None)
+        if rooms is None or n < 2: return False
+
+        # Topologie-Prior in Reihenfolge der Matrix-Raeume
+        prior = np.ones((n, n))
+        if self.adj_matrix is not None and len(self.rooms) == len(self.adj_matrix):
+            topo = {normalize_room(r): i for i, r in enumerate(self.rooms)}
+            ti = np.array([topo.get(normalize_room(r), -1) for r in rooms])
+            known = ti >= 0
+            sub = (np.asarray(self.adj_matrix)[np.ix_(ti[known], ti[known])] > 0).astype(float)
+            prior[np.ix_(known, known)] = sub
+        np.fill_diagonal(prior, 0.0)   # Selbst-Uebergaenge werden nicht bewertet
+        self._markov_adjacent = prior > 0   # ohne Topologie gilt alles als benachbart
+        prior_sum = prior.sum(axis=1, keepdims=True)
+        prior = np.where(prior_sum > 0, prior / np.maximum(prior_sum, 1e-12), 1.0 / n)
+
+        has_data = P.sum(axis=1, keepdims=True) > 0
+        S = np.where(has_data, (1 - MARKOV_SMOOTHING) * P + MARKOV_SMOOTHING * prior, prior) + MARKOV_EPS
+        S /= S.sum(axis=1, keepdims=True)
+        self.log_probs = np.log(S)
+        self._markov_index = {normalize_room(r): i for i, r in enumerate(rooms)}
+        self._markov_rooms = list(rooms)
+
+        # Stunden-Tensor: Zaehler ueber Nachbarstunden glaetten, dann je Zeile zur Gesamtmatrix schrumpfen
+        # P_h = (C_h + K * S) / (sum C_h + K) -> wenig Daten in einer Stunde = fast S, viele = eigenes Muster
+        H = self.behavior_hourly
+        if H is not None and H.shape == (HOUR_BUCKETS, n, n):
+            H = np.asarray(H, dtype=float)
+            Hs = sum(w * np.roll(H, shift, axis=0) for shift, w in zip((1, 0, -1), HOUR_KERNEL))
+            Ph = (Hs + HOUR_PRIOR_STRENGTH * S[None]) / (Hs.sum(axis=2, keepdims=True) + HOUR_PRIOR_STRENGTH)
+            self.log_probs_hourly = np.log(Ph)
+        return True
+
+    def _log_probs_for(self, hour=None):
+        """log P fuer eine Stunde (O(1) Slice); ohne Stunde/Stunden-Modell die Matrix ueber alle Stunden."""
+        if hour is not None and self.log_probs_hourly is not None:
+            return self.log_probs_hourly[int(hour) % HOUR_BUCKETS]
+        return self.log_probs
+
+    def score_sequence(self, rooms, hour=None):
+        """
+        Surprise (-log p, nats) je Uebergang einer Raumliste, O(len) per Lookup.
+        Unbekannte Raeume und Wiederholungen desselben Raums werden uebersprungen.
+        Return: None (kein Modell) oder {log_likelihood, mean_surprise, max_surprise, min_p, score,
+                n_transitions, unknown_rooms, transitions: [{from, to, p, surprise, adjacent}]}
+        """
+        if not self._prepare_markov(): return None
+        idx = np.array([self._markov_index.get(normalize_room(r), -1) for r in rooms], dtype=np.int64)
+        unknown = int((idx < 0).sum())
+        idx = idx[idx >= 0]
+        if len(idx): idx = idx[np.concatenate([[True], idx[1:] != idx[:-1]])]
+        hour = hour if self.log_probs_hourly is not None else None
+        result = {'n_transitions': max(0, len(idx) - 1), 'unknown_rooms': unknown, 'hour': hour}
+        if len(idx) < 2:
+            result.update({'log_likelihood': 0.0, 'mean_surprise': 0.0, 'max_surprise': 0.0,
+                           'min_p': 1.0, 'score': 0.0, 'transitions': []})
+            return result
+        lp = self._log_probs_for(hour)[idx[:-1], idx[1:]]
+        surprise = -lp
+        result.update({
+            'log_likelihood': round(float(lp.sum()), 4),
+            'mean_surprise': round(float(surprise.mean()), 4),
+            'max_surprise': round(float(surprise.max()), 4),
+            'min_p': float(np.exp(lp.min())),
+            'score': round(float(min(1.0, surprise.max() / MARKOV_SURPRISE_SCALE)), 4),
+            'transitions': [
+                {'from': self._markov_rooms[a], 'to': self._markov_rooms[b], 'p': round(float(np.exp(l)), 5),
+                 'surprise': round(float(-l), 4), 'adjacent': bool(self._markov_adjacent[a, b])}
+                for a, b, l in zip(idx[:-1].tolist(), idx[1:].tolist(), lp.tolist())
+            ],
+        })
+        return result
@@ -1,26 +1,28 @@
 import os
 import pickle
+import hashlib
+import json
+from collections import OrderedDict
+from brains import model_store
+from brains.model_store import DATA_DIR as _DATA_DIR
 
-# Persistenz-Pfad (identisches Muster wie energy.py, health.py, etc.)
-_ADAPTER_DIR   = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-_DATA_DIR      = os.path.join(os.path.dirname(os.path.dirname(_ADAPTER_DIR)), 'iobroker-data', 'cogni-living')
-if not os.path.exists(_DATA_DIR):
-    try:
-        os.makedirs(_DATA_DIR, exist_ok=True)
-    except Exception:
-        _DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Persistenz: ModelStore-Eintrag je Gruppe, die Pickles werden nur noch zur Migration gelesen
 SEX_MODEL_PATH = os.path.join(_DATA_DIR, 'sex_model.pkl')  # Legacy / default
 
-def _sex_model_path(group_id=None):
-    """Gibt den Modell-Pfad für eine Gruppe zurück.
-    Gruppen-ID 'default' oder None → legacy sex_model.pkl (backward compat).
-    Alle anderen IDs → sex_model_<group_id>.pkl
+def _sex_model_name(group_id=None):
+    """Gibt den Modell-Namen für eine Gruppe zurück.
+    Gruppen-ID 'default' oder None → sex_model (backward compat).
+    Alle anderen IDs → sex_model_<group_id>
     """
     if not group_id or group_id == 'default':
-        return SEX_MODEL_PATH
+        return 'sex_model'
     # Sicherheitsbereinigung: nur alphanumerisch + Unterstrich erlaubt
     safe_id = ''.join(c if c.isalnum() or c == '_' else '_' for c in str(group_id))
-    return os.path.join(_DATA_DIR, f'sex_model_{safe_id}.pkl')
+    return f'sex_model_{safe_id}'
+
+def _sex_model_path(group_id=None):
+    """Legacy-Pickle einer Gruppe (sex_model.pkl / sex_model_<group_id>.pkl)."""
+    return os.path.join(_DATA_DIR, _sex_model_name(group_id) + '.pkl')
 
 """
 SexBrain — KI-Klassifikation von Intimacy-Sessions (Stufe 3)
@@ -45,6 +47,37 @@ Aktivierungsbedingung (Stufe 3):
 MIN_SEX_SAMPLES = 2   # Mindest-Samples der Klasse 'sex' fuer Training
 MIN_TOTAL       = 4   # Mindest-Samples gesamt
 
+# Kreuzvalidierung
+CV_MIN_SAMPLES  = 5   # darunter keine CV
+LOO_MAX_SAMPLES = 60  # bis hier Leave-One-Out, darueber stratifiziertes k-Fold
+CV_FOLDS        = 10
+CV_N_JOBS       = -1  # Folds parallel (Threads: sklearn-Baeume geben beim Fit die GIL frei)
+
+PREDICT_CHUNK   = 4096  # Zeilen pro predict_proba-Aufruf (Backfill ueber Monate: Speicher begrenzen)
+
+# Registry fuer Gruppen-Modelle (Mehrparteien-Installationen)
+REGISTRY_MAX_MODELS = 8                  # max. gleichzeitig geladene Gruppen-Modelle
+REGISTRY_MAX_BYTES  = 32 * 1024 * 1024   # Speicher-Budget (geschaetzt ueber Pickle-Groesse)
+
+
+def _rf():
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(
+        n_estimators=20, max_depth=5,
+        random_state=42, class_weight='balanced'
+    )
+
+
+def _fit_fold(X, y, train_idx, test_idx):
+    """Ein CV-Fold: [(test_index, vorhersage)] oder [] wenn der Fold nur eine Klasse hat."""
+    y_train = [y[i] for i in train_idx]
+    if len(set(y_train)) < 2:
+        return []  # Fold ohne mindestens 2 Klassen überspringen
+    clf = _rf()
+    clf.fit([X[i] for i in train_idx], y_train)
+    preds = clf.predict([X[i] for i in test_idx])
+    return list(zip([int(i) for i in test_idx], preds))
+
 
 class SexBrain:
     """Binäre Klassifikation von Intimacy-Sessions: sex / nullnummer."""
@@ -70,7 +103,8 @@ class SexBrain:
 
     def __init__(self, group_id=None):
         self.group_id           = group_id  # None / 'default' → legacy sex_model.pkl
-        self.model_path         = _sex_model_path(group_id)
+        self.model_name         = _sex_model_name(group_id)
+        self.model_path         = _sex_model_path(group_id)   # Legacy (Migration)
         self.clf                = None
         self.is_trained         = False
         self.class_counts       = {}
@@ -81,6 +115,13 @@ class SexBrain:
         self.confusion_matrix   = None  # {'tp': int, 'fp': int, 'tn': int, 'fn': int}
         self.loo_details        = []    # [{date, actual, predicted, correct, cell}]
         self.model_date         = None  # Datum des letzten gespeicherten Modells
+        self.train_fingerprint  = None  # Hash der gelabelten Feature-Zeilen des aktuellen Modells
+        self.cv_fingerprint     = None  # Hash des Trainings-Sets der letzten CV (Cache)
+        self.cv_mode            = None  # 'loo' / 'kfold'
+        self._classes_clf       = None  # clf, fuer das _classes_out gilt
+        self._classes_out       = None  # Ausgabe-Labels je Klassen-Index (Legacy → 'sex')
+        self._size_key          = None  # train_fingerprint, fuer das _size_bytes gilt
+        self._size_bytes        = 0
 
     # ------------------------------------------------------------------
     # Persistenz (identisches Muster wie EnergyBrain, HealthBrain, etc.)
@@ -88,21 +129,32 @@ class SexBrain:
     def load_brain(self):
         """Laedt trainiertes Modell von Disk. Gibt True zurueck wenn erfolgreich."""
         try:
-            if os.path.exists(self.model_path):
-                with open(self.model_path, 'rb') as f:
-                    data = pickle.load(f)
-                self.clf               = data.get('clf')
-                self.is_trained        = data.get('is_trained', False)
-                self.class_counts      = data.get('class_counts', {})
-                self.n_samples         = data.get('n_samples', 0)
-                self.status_msg        = data.get('status_msg', 'Modell von Disk geladen')
-                self.feature_importances = data.get('feature_importances', [])
-                self.loo_accuracy      = data.get('loo_accuracy')
-                self.confusion_matrix  = data.get('confusion_matrix')
-                self.loo_details       = data.get('loo_details', [])
-                self.model_date        = data.get('model_date')
-                if self.is_trained:
-                    print(f'[SexBrain] Modell geladen ({self.model_date}) — {self.n_samples} Samples, trained={self.is_trained}')
+            stored = model_store.load(self.model_name, feature_layout=self.FEATURE_NAMES)
+            if stored is not None:
+                data = dict(stored['values'])
+                data['clf'] = stored['objects'].get('clf')
+            elif not model_store.exists(self.model_name):
+                # Migration: Alt-Pickle einmalig lesen (nicht bei inkompatiblem Store-Modell)
+                data = model_store.load_legacy_pickle(self.model_path)
+                if data is None: return False
+            else:
+                return False
+            self.clf               = data.get('clf')
+            self.is_trained        = data.get('is_trained', False)
+            self.class_counts      = data.get('class_counts', {})
+            self.n_samples         = data.get('n_samples', 0)
+            self.status_msg        = data.get('status_msg', 'Modell von Disk geladen')
+            self.feature_importances = data.get('feature_importances', [])
+            self.loo_accuracy      = data.get('loo_accuracy')
+            self.confusion_matrix  = data.get('confusion_matrix')
+            self.loo_details       = data.get('loo_details', [])
+            self.model_date        = data.get('model_date')
+            self.train_fingerprint = data.get('train_fingerprint')
+            self.cv_fingerprint    = data.get('cv_fingerprint')
+            self.cv_mode           = data.get('cv_mode')
+            if stored is None: self._store()  # Migration ins neue Format
+            if self.is_trained:
+                print(f'[SexBrain] Modell geladen ({self.model_date}) — {self.n_samples} Samples, trained={self.is_trained}')
             return self.is_trained
         except Exception as e:
             print(f'[SexBrain] load_brain Fehler: {e}')
@@ -113,23 +165,39 @@ class SexBrain:
         try:
             from datetime import datetime
             self.model_date = datetime.now().strftime('%Y-%m-%d %H:%M')
-            with open(self.model_path, 'wb') as f:
-                pickle.dump({
-                    'clf':                self.clf,
-                    'is_trained':         self.is_trained,
-                    'class_counts':       self.class_counts,
-                    'n_samples':          self.n_samples,
-                    'status_msg':         self.status_msg,
-                    'feature_importances': self.feature_importances,
-                    'loo_accuracy':       self.loo_accuracy,
-                    'confusion_matrix':   self.confusion_matrix,
-                    'loo_details':        self.loo_details,
-                    'model_date':         self.model_date,
-                }, f)
-            print(f'[SexBrain] Modell gespeichert ({self.model_date})')
+            if self._store():
+                print(f'[SexBrain] Modell gespeichert ({self.model_date})')
         except Exception as e:
             print(f'[SexBrain] save_brain Fehler: {e}')
 
+    def _store(self):
+        return model_store.save(self.model_name, objects={'clf': self.clf}, values={
+            'is_trained':         self.is_trained,
+            'class_counts':       self.class_counts,
+            'n_samples':          self.n_samples,
+            'status_msg':         self.status_msg,
+            'feature_importances': self.feature_importances,
+            'loo_accuracy':       self.loo_accuracy,
+            'confusion_matrix':   self.confusion_matrix,
+            'loo_details':        self.loo_details,
+            'model_date':         self.model_date,
+            'train_fingerprint':  self.train_fingerprint,
+            'cv_fingerprint':     self.cv_fingerprint,
+            'cv_mode':            self.cv_mode,
+        }, fingerprint=self.train_fingerprint, feature_layout=self.FEATURE_NAMES)
+
+    def memory_bytes(self):
+        """Geschaetzter Speicherbedarf (Pickle-Groesse von Modell + CV-Details), pro Modell gecacht."""
+        key = (self.train_fingerprint, self.cv_fingerprint, self.clf is not None)
+        if key != self._size_key:
+            try:
+                self._size_bytes = len(pickle.dumps(
+                    (self.clf, self.loo_details, self.feature_importances), protocol=pickle.HIGHEST_PROTOCOL))
+            except Exception:
+                self._size_bytes = 0
+            self._size_key = key
+        return self._size_bytes
+
     # ------------------------------------------------------------------
     # Feature-Extraktion (Sentinel -1 fuer fehlende Kontext-Sensoren)
     # ------------------------------------------------------------------
@@ -158,6 +226,20 @@ class SexBrain:
             _v('nearbyRoomMotion', 1.0),  # 0=ruhig, 1=Bewegung in Nachbarraum, -1=keine Topologie
         ]
 
+    def _labelled(self, samples):
+        """Gelabelte Samples → (X, y, dates). Legacy-Labels vaginal/oral_hand → sex."""
+        X, y, dates = [], [], []
+        for s in samples:
+            lbl = (s.get('label') or '').strip().lower()
+            if lbl in ('vaginal', 'oral_hand'):
+                lbl = 'sex'
+            if lbl not in ('sex', 'nullnummer'):
+                continue
+            X.append(self._feat(s))
+            y.append(lbl)
+            dates.append(s.get('date', ''))
+        return X, y, dates
+
     # ------------------------------------------------------------------
     # Training
     # ------------------------------------------------------------------
@@ -173,22 +255,13 @@ class SexBrain:
         """
         from collections import Counter
         try:
-            from sklearn.ensemble import RandomForestClassifier
+            import sklearn  # noqa: F401
         except ImportError:
             self.is_trained = False
             self.status_msg = 'sklearn nicht installiert'
             return False, {}, self.status_msg
 
-        X, y = [], []
-        for s in samples:
-            lbl = (s.get('label') or '').strip().lower()
-            # Legacy-Normalisierung: vaginal/oral_hand → sex
-            if lbl in ('vaginal', 'oral_hand'):
-                lbl = 'sex'
-            if lbl not in ('sex', 'nullnummer'):
-                continue
-            X.append(self._feat(s))
-            y.append(lbl)
+        X, y, dates = self._labelled(samples)
 
         counts = dict(Counter(y))
         self.class_counts = counts
@@ -213,12 +286,10 @@ class SexBrain:
             self.status_msg = f'Mind. 1x "nullnummer"-Label benoetigt'
             return False, counts, self.status_msg
 
-        self.clf = RandomForestClassifier(
-            n_estimators=20, max_depth=5,
-            random_state=42, class_weight='balanced'
-        )
+        self.clf = _rf()
         self.clf.fit(X, y)
         self.is_trained = True
+        self.train_fingerprint = self._fingerprint(X, y)
 
         # Feature-Importance berechnen + speichern
         imp_pairs = sorted(zip(self.FEATURE_NAMES, self.clf.feature_importances_),
@@ -228,58 +299,8 @@ class SexBrain:
         ]
         top3 = ', '.join(f'{n}={v:.2f}' for n, v in imp_pairs[:3])
 
-        # Leave-One-Out Genauigkeit + 2x2 Confusion Matrix (Sex vs. No-Sex)
-        self.loo_accuracy = None
-        self.confusion_matrix = None
-        self.loo_details = []  # [{date, actual, predicted, correct}]
-        dates = [s.get('date', '') for s in samples if (s.get('label') or '').strip().lower() in ('vaginal', 'oral_hand', 'nullnummer')]
-        if len(X) >= 5:
-            try:
-                from sklearn.model_selection import LeaveOneOut
-                loo = LeaveOneOut()
-                n_correct = 0
-                cm = {'tp': 0, 'fp': 0, 'tn': 0, 'fn': 0}
-                loo_total = 0
-                loo_details = []
-                for train_idx, test_idx in loo.split(X):
-                    clf_loo = RandomForestClassifier(
-                        n_estimators=20, max_depth=5,
-                        random_state=42, class_weight='balanced'
-                    )
-                    X_train = [X[i] for i in train_idx]
-                    y_train = [y[i] for i in train_idx]
-                    if len(set(y_train)) < 2:
-                        continue  # LOO-Fold ohne mindestens 2 Klassen überspringen
-                    clf_loo.fit(X_train, y_train)
-                    test_i   = test_idx[0]
-                    pred_loo = clf_loo.predict([X[test_i]])[0]
-                    actual   = y[test_i]
-                    loo_total += 1
-                    correct = (pred_loo == actual)
-                    if correct:
-                        n_correct += 1
-                    # 2x2-Matrix: Sex vs. No-Sex (nullnummer)
-                    is_sex_actual = actual == 'sex'
-                    is_sex_pred   = pred_loo == 'sex'
-                    if   is_sex_actual and is_sex_pred:      cm['tp'] += 1; cell = 'tp'
-                    elif is_sex_actual and not is_sex_pred:  cm['fn'] += 1; cell = 'fn'
-                    elif not is_sex_actual and is_sex_pred:  cm['fp'] += 1; cell = 'fp'
-                    else:                                     cm['tn'] += 1; cell = 'tn'
-                    loo_details.append({
-                        'date':      dates[test_i] if test_i < len(dates) else '',
-                        'actual':    actual,
-                        'predicted': pred_loo,
-                        'correct':   correct,
-                        'cell':      cell,
-                    })
-                if loo_total > 0:
-                    self.loo_accuracy    = round(n_correct / loo_total, 3)
-                    self.confusion_matrix = cm
-                    self.loo_details     = sorted(loo_details, key=lambda d: d.get('date',''))
-            except Exception:
-                self.loo_accuracy = None
-                self.confusion_matrix = None
-                self.loo_details = []
+        # Kreuzvalidierung + 2x2 Confusion Matrix (nur wenn sich das Label-Set geaendert hat)
+        self._cross_validate(X, y, dates)
 
         nn = counts.get('nullnummer', 0)
         sx = counts.get('sex', 0)
@@ -287,6 +308,82 @@ class SexBrain:
         self.save_brain()  # Modell persistent auf Disk speichern
         return True, counts, self.status_msg
 
+    # ------------------------------------------------------------------
+    # Kreuzvalidierung (Leave-One-Out / k-Fold, parallel, gecacht)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _fingerprint(X, y, dates=None):
+        """Hash des gelabelten Trainings-Sets (Features + Labels [+ Datum fuer die CV-Details])."""
+        raw = json.dumps([X, y, dates], separators=(',', ':'))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _cross_validate(self, X, y, dates):
+        """
+        Setzt loo_accuracy, confusion_matrix, loo_details.
+        - unveraendertes Label-Set (gleicher Fingerprint) → Ergebnis der letzten CV wiederverwenden
+        - bis LOO_MAX_SAMPLES Leave-One-Out, darueber stratifiziertes k-Fold (CV_FOLDS)
+        - Folds laufen parallel ueber joblib
+        """
+        fp = self._fingerprint(X, y, dates)
+        if fp == self.cv_fingerprint and self.loo_accuracy is not None:
+            return
+
+        self.loo_accuracy = None
+        self.confusion_matrix = None
+        self.loo_details = []  # [{date, actual, predicted, correct, cell}]
+        self.cv_fingerprint = None
+        self.cv_mode = None
+        if len(X) < CV_MIN_SAMPLES:
+            return
+        try:
+            from joblib import Parallel, delayed
+            from sklearn.model_selection import LeaveOneOut, StratifiedKFold, KFold
+
+            if len(X) <= LOO_MAX_SAMPLES:
+                splitter, mode = LeaveOneOut(), 'loo'
+            elif min(y.count(c) for c in set(y)) >= CV_FOLDS:
+                splitter, mode = StratifiedKFold(n_splits=CV_FOLDS, shuffle=True, random_state=42), 'kfold'
+            else:
+                splitter, mode = KFold(n_splits=CV_FOLDS, shuffle=True, random_state=42), 'kfold'
+
+            folds = Parallel(n_jobs=CV_N_JOBS, prefer='threads')(
+                delayed(_fit_fold)(X, y, train_idx, test_idx)
+                for train_idx, test_idx in splitter.split(X, y)
+            )
+
+            n_correct = 0
+            cm = {'tp': 0, 'fp': 0, 'tn': 0, 'fn': 0}
+            loo_details = []
+            for test_i, pred in (p for fold in folds for p in fold):
+                actual  = y[test_i]
+                correct = (pred == actual)
+                if correct:
+                    n_correct += 1
+                # 2x2-Matrix: Sex vs. No-Sex (nullnummer)
+                is_sex_actual = actual == 'sex'
+                is_sex_pred   = pred == 'sex'
+                if   is_sex_actual and is_sex_pred:      cm['tp'] += 1; cell = 'tp'
+                elif is_sex_actual and not is_sex_pred:  cm['fn'] += 1; cell = 'fn'
+                elif not is_sex_actual and is_sex_pred:  cm['fp'] += 1; cell = 'fp'
+                else:                                     cm['tn'] += 1; cell = 'tn'
+                loo_details.append({
+                    'date':      dates[test_i],
+                    'actual':    actual,
+                    'predicted': pred,
+                    'correct':   bool(correct),
+                    'cell':      cell,
+                })
+            if loo_details:
+                self.loo_accuracy     = round(n_correct / len(loo_details), 3)
+                self.confusion_matrix = cm
+                self.loo_details      = sorted(loo_details, key=lambda d: d.get('date', ''))
+                self.cv_fingerprint   = fp
+                self.cv_mode          = mode
+        except Exception:
+            self.loo_accuracy = None
+            self.confusion_matrix = None
+            self.loo_details = []
+
     # ------------------------------------------------------------------
     # Vorhersage
     # ------------------------------------------------------------------
@@ -295,20 +392,64 @@ class SexBrain:
         Gibt (type_str, confidence_float) zurueck.
         type_str = None wenn kein Modell vorhanden.
         """
+        return self.predict_batch([session])[0]
+
+    def _feat_matrix(self, sessions):
+        """
+        Feature-Matrix (n x 13, float32 wie intern im RF) fuer alle Sessions.
+        Return: (X, valid) — valid[i] False, wenn Session i keine gueltigen Features liefert.
+        """
+        import numpy as np
+        X = np.zeros((len(sessions), len(self.FEATURE_NAMES)), dtype=np.float32)
+        valid = np.zeros(len(sessions), dtype=bool)
+        for i, s in enumerate(sessions):
+            try:
+                X[i] = self._feat(s)
+                valid[i] = np.isfinite(X[i]).all()
+            except Exception:
+                pass
+        return X, valid
+
+    def _output_classes(self):
+        """Klassen-Labels des aktuellen Modells (einmal pro Modell berechnet)."""
+        import numpy as np
+        if self._classes_clf is not self.clf:
+            # Legacy-Ausgabe: 'sex' statt 'vaginal'/'oral_hand'
+            self._classes_out = np.array(['sex' if c in ('vaginal', 'oral_hand') else str(c)
+                                          for c in self.clf.classes_], dtype=object)
+            self._classes_clf = self.clf
+        return self._classes_out
+
+    def predict_batch(self, sessions):
+        """
+        Vektorisierte Vorhersage: Feature-Matrix einmal bauen, predict_proba je Chunk,
+        Label + Konfidenz per argmax. Gibt [(type_str, confidence), ...] zurueck.
+        Fehlerhafte Sessions bekommen einzeln (None, 0.0), die uebrigen werden normal bewertet.
+        """
         if not self.is_trained or self.clf is None:
-            return None, 0.0
+            return [(None, 0.0)] * len(sessions)
+        if not sessions:
+            return []
+        results = [(None, 0.0)] * len(sessions)
         try:
-            feat    = [self._feat(session)]
-            pred    = self.clf.predict(feat)[0]
-            proba   = self.clf.predict_proba(feat)[0]
-            classes = self.clf.classes_.tolist()
-            conf    = float(proba[classes.index(pred)])
-            # Legacy-Ausgabe: 'sex' statt 'vaginal'/'oral_hand'
-            if pred in ('vaginal', 'oral_hand'):
-                pred = 'sex'
-            return pred, round(conf, 3)
+            import numpy as np
+            X, valid = self._feat_matrix(sessions)
+            rows = np.flatnonzero(valid)
+            if len(rows) == 0:
+                return results
+            X = X[rows]
+            classes = self._output_classes()
+            labels, confs = [], []
+            for start in range(0, len(X), PREDICT_CHUNK):
+                proba = self.clf.predict_proba(X[start:start + PREDICT_CHUNK])
+                best  = proba.argmax(axis=1)
+                labels.extend(classes[best].tolist())
+                confs.extend(np.round(proba[np.arange(len(best)), best], 3).tolist())
+            for i, label, conf in zip(rows.tolist(), labels, confs):
+                results[i] = (label, conf)
+            return results
         except Exception:
-            return None, 0.0
+            return [(None, 0.0)] * len(sessions)
 
     # ------------------------------------------------------------------
     # Kombinierter Aufruf: Trainieren + Vorhersagen in einem Schritt
@@ -335,7 +476,12 @@ class SexBrain:
         _prev_counts      = self.class_counts
         _prev_date        = self.model_date
 
-        trained, counts, msg = self.train(train_samples)
+        # Unveraenderte Labels (gleicher Fingerprint) → kein Refit, keine CV, kein Pickle-Schreiben
+        X, y, _ = self._labelled(train_samples)
+        if self.is_trained and self.clf is not None and self.train_fingerprint == self._fingerprint(X, y):
+            trained, msg = True, self.status_msg
+        else:
+            trained, counts, msg = self.train(train_samples)
 
         # Wenn Neutraining scheitert, aber gespeichertes Modell vorhanden: weiter nutzen
         if not trained and _prev_trained and _prev_clf is not None:
@@ -347,10 +493,7 @@ class SexBrain:
             trained               = True
             msg = f'Gespeichertes Modell ({_prev_date}) — zu wenig neue Daten fuer Neutraining'
 
-        results = []
-        for s in predict_sessions:
-            typ, conf = self.predict(s)
-            results.append({'type': typ, 'confidence': conf})
+        results = [{'type': typ, 'confidence': conf} for typ, conf in self.predict_batch(predict_sessions)]
         return {
             'trained':              trained,
             'class_counts':         self.class_counts,
@@ -361,6 +504,72 @@ class SexBrain:
             'loo_accuracy':         getattr(self, 'loo_accuracy', None),
             'confusion_matrix':     getattr(self, 'confusion_matrix', None),
             'loo_details':          getattr(self, 'loo_details', []),
+            'cv_mode':              getattr(self, 'cv_mode', None),
             'model_date':           getattr(self, 'model_date', None),
             'results':              results,
         }
+
+
+class SexBrainRegistry:
+    """
+    LRU-Cache der SexBrain-Instanzen je Gruppe mit Speicher-Budget.
+    Modelle liegen ohnehin als Pickle auf Disk (save_brain nach jedem Training):
+    Verdraengen = Instanz verwerfen, beim naechsten Zugriff lazy neu laden.
+    """
+
+    def __init__(self, max_models=REGISTRY_MAX_MODELS, max_bytes=REGISTRY_MAX_BYTES):
+        self.max_models = max_models
+        self.max_bytes  = max_bytes
+        self.brains     = OrderedDict()   # group_id → SexBrain (aelteste zuerst)
+        self.hits       = 0
+        self.misses     = 0
+        self.evictions  = 0
+
+    @staticmethod
+    def _key(group_id):
+        return group_id if group_id and group_id != 'default' else 'default'
+
+    def get(self, group_id=None):
+        """Instanz fuer eine Gruppe (None/'default' → Legacy sex_model.pkl)."""
+        key = self._key(group_id)
+        brain = self.brains.get(key)
+        if brain is not None:
+            self.hits += 1
+            self.brains.move_to_end(key)
+            return brain
+        self.misses += 1
+        brain = SexBrain(group_id=None if key == 'default' else key)
+        brain.load_brain()
+        self.brains[key] = brain
+        self._evict()
+        return brain
+
+    def resident_bytes(self):
+        return sum(b.memory_bytes() for b in self.brains.values())
+
+    def _evict(self):
+        """Aelteste Modelle verwerfen bis Anzahl und Budget passen (das zuletzt genutzte bleibt)."""
+        while len(self.brains) > 1 and (len(self.brains) > self.max_models
+                                         or self.resident_bytes() > self.max_bytes):
+            key, _ = self.brains.popitem(last=False)
+            self.evictions += 1
+            print(f'[SexBrain] Registry: Modell {key} aus dem Speicher verdraengt')
+
+    def classify_sessions(self, group_id, train_samples, predict_sessions):
+        result = self.get(group_id).classify_sessions(train_samples, predict_sessions)
+        self._evict()  # Modell kann durch Neutraining gewachsen sein
+        return result
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'models':         len(self.brains),
+            'max_models':     self.max_models,
+            'resident_bytes': self.resident_bytes(),
+            'max_bytes':      self.max_bytes,
+            'hits':           self.hits,
+            'misses':         self.misses,
+            'hit_rate':       round(self.hits / total, 3) if total else None,
+            'evictions':      self.evictions,
+            'groups':         list(self.brains.keys()),
+        }
@@ -1,24 +1,41 @@
 import numpy as np
 import os
-import pickle
 import time
 import json
+from datetime import datetime
 
-# PFAD-LOGIK (Konsistent mit energy.py/security.py)
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(BASE_DIR)), 'iobroker-data', 'cogni-living')
-
-if not os.path.exists(DATA_DIR):
-    try:
-        os.makedirs(DATA_DIR, exist_ok=True)
-    except:
-        DATA_DIR = BASE_DIR
+from brains import model_store
+from brains.model_store import DATA_DIR
 
+# PFAD-LOGIK: Zustand im ModelStore ('tracker'), das Pickle wird nur noch zur Migration gelesen
 TRACKER_STATE_PATH = os.path.join(DATA_DIR, "tracker_state.pkl")
 
+# Tracker-Modi: 'particles' = Partikelfilter (bisher), 'exact' = diskreter Bayes-Filter (HMM forward)
+TRACKER_MODES = ('particles', 'exact')
+MOVE_PROB = 0.2           # Anteil, der pro virtuellem Schritt in einen Nachbarraum wechselt
+STEP_SECONDS = 2.0        # ein virtueller Diffusions-Schritt pro 2 s
+SILENT_FACTOR = 0.95      # negative Information: ueberwachter Raum ohne Event
+HIT_FACTOR = 50.0         # positive Information: Sensor im Raum hat gefeuert
+MISS_FACTOR = 0.02
+REPORT_MIN_PROB = 0.01
+MINUTES_PER_DAY = 1440
+
+# Gelerntes Semi-Markov-Modell (TRAIN_TRACKER): Verweildauer-Hazard je Raum + Erkennungsrate je Sensor
+DWELL_EDGES = np.array([0, 15, 60, 180, 600, 1800, 3600, 3 * 3600, 8 * 3600, np.inf])   # Sekunden
+DEFAULT_RATE = -np.log(1.0 - MOVE_PROB) / STEP_SECONDS   # 1/s, entspricht dem festen Modell
+PRIOR_EXPOSURE = 60.0     # Sekunden Pseudo-Beobachtung mit DEFAULT_RATE je Hazard-Bin
+DEST_PRIOR = 1.0          # Pseudo-Uebergaenge je Nachbar (Topologie) fuer die Ziel-Verteilung
+DETECT_MIN, DETECT_MAX = 0.01, 0.99
+MAX_HOPS = 32             # Raumwechsel je Partikel und Event (Obergrenze fuer lange Pausen)
+
 class ParticleFilter:
-    def __init__(self, num_particles=1000):
+    def __init__(self, num_particles=1000, mode='particles'):
         self.num_particles = num_particles
+        self.mode = mode if mode in TRACKER_MODES else 'particles'
+        self.belief = None        # exakter Modus: Wahrscheinlichkeit je Raum (Laenge = Anzahl Raeume)
+        self._trans_pows = []     # gecachte T^(2^j) fuer den exakten Modus
+        self.dwell = None         # Partikel: Sekunden im aktuellen Raum (Semi-Markov)
+        self.model = None         # gelerntes Modell (TRAIN_TRACKER), siehe train()
         self.rooms = []           # Liste der Raumnamen (Strings)
         self.adj_matrix = None    # Numpy Array (N x N)
         self.particles = None     # Array der Länge N (Raum-Indizes)
@@ -29,34 +46,48 @@ class ParticleFilter:
 
     def load_brain(self):
         try:
-            if os.path.exists(TRACKER_STATE_PATH):
-                with open(TRACKER_STATE_PATH, 'rb') as f:
-                    state = pickle.load(f)
-                    self.rooms = state.get('rooms', [])
-                    self.adj_matrix = state.get('matrix', None)
-                    self.particles = state.get('particles', None)
-                    self.weights = state.get('weights', None)
-                    self.monitored_mask = state.get('monitored_mask', None)
-
-                    if self.particles is not None and len(self.rooms) > 0:
-                        self.is_ready = True
-                        if len(self.particles) != self.num_particles:
-                             self._initialize_particles()
+            stored = model_store.load('tracker')
+            if stored is not None:
+                # Partikel/Gewichte werden in-place veraendert -> Kopie statt Memory-Map
+                state = {k: np.array(v) for k, v in stored['arrays'].items()}
+                state['rooms'] = stored['values'].get('rooms', [])
+            else:
+                state = model_store.load_legacy_pickle(TRACKER_STATE_PATH)
+                if state is None: return True
+            self.rooms = state.get('rooms', [])
+            self.adj_matrix = state.get('matrix', None)
+            self.particles = state.get('particles', None)
+            self.weights = state.get('weights', None)
+            self.monitored_mask = state.get('monitored_mask', None)
+            self.belief = state.get('belief', None)
+            self.mode = stored['values'].get('mode', 'particles') if stored is not None else 'particles'
+            self.dwell = state.get('dwell', None)
+            self._trans_pows = []
+            self._load_model()
+
+            if self.particles is not None and len(self.rooms) > 0:
+                self.is_ready = True
+                if len(self.particles) != self.num_particles:
+                     self._initialize_particles()
+            if self.belief is None or len(self.belief) != len(self.rooms):
+                self._initialize_belief()
+            if stored is None: self.save_brain()  # Migration ins neue Format
             return True
         except Exception as e:
             return False
 
     def save_brain(self):
         try:
-            state = {
-                'rooms': self.rooms,
+            arrays = {
                 'matrix': self.adj_matrix,
                 'particles': self.particles,
                 'weights': self.weights,
-                'monitored_mask': self.monitored_mask
+                'monitored_mask': self.monitored_mask,
+                'belief': self.belief,
+                'dwell': self.dwell
             }
-            with open(TRACKER_STATE_PATH, 'wb') as f:
-                pickle.dump(state, f)
+            model_store.save('tracker', arrays={k: v for k, v in arrays.items() if v is not None},
+                             values={'rooms': list(self.rooms), 'mode': self.mode})
         except:
             pass
 
@@ -66,8 +97,35 @@ class ParticleFilter:
         num_rooms = len(self.rooms)
         self.particles = np.random.choice(num_rooms, self.num_particles)
         self.weights = np.ones(self.num_particles) / self.num_particles
+        self.dwell = np.zeros(self.num_particles)
         self.is_ready = True
 
+    def _initialize_belief(self):
+        """Exakter Modus: aus den Partikeln uebernehmen, sonst gleichverteilt."""
+        n = len(self.rooms)
+        if n == 0:
+            self.belief = None
+            return
+        if self.particles is not None and len(self.particles) and self.particles.max() < n:
+            self.belief = np.bincount(self.particles, minlength=n) / float(len(self.particles))
+        else:
+            self.belief = np.full(n, 1.0 / n)
+
+    def set_mode(self, mode):
+        """Tracker-Modus umschalten (bleibt gespeichert). Zustand wird uebernommen."""
+        if mode not in TRACKER_MODES: raise ValueError(f"Unbekannter Tracker-Modus: {mode}")
+        if mode == self.mode: return self.mode
+        if mode == 'exact':
+            self._initialize_belief()
+        elif self.belief is not None and len(self.rooms):
+            p = self.belief / self.belief.sum()
+            self.particles = np.random.choice(len(self.rooms), self.num_particles, p=p)
+            self.weights = np.ones(self.num_particles) / self.num_particles
+            self.dwell = np.zeros(self.num_particles)
+        self.mode = mode
+        self.save_brain()
+        return self.mode
+
     def set_topology(self, rooms, matrix_raw, monitored_rooms=[]):
         self.rooms = rooms
         self.adj_matrix = np.array(matrix_raw, dtype=float)
@@ -81,6 +139,11 @@ class ParticleFilter:
 
         if self.particles is None or len(self.rooms) != len(rooms):
             self._initialize_particles()
+        if self.belief is None or len(self.belief) != len(rooms):
+            self._initialize_belief()
+        if self.model is not None and self.model['rooms'] != list(rooms):
+            self.model = None     # gelerntes Modell passt nicht mehr zur Topologie
+        self._trans_pows = []
 
         self.is_ready = True
         self.last_update = time.time()
@@ -98,22 +161,376 @@ class ParticleFilter:
             else:
                 j += 1
         self.particles = self.particles[indexes]
+        if self.dwell is not None and len(self.dwell) == len(indexes): self.dwell = self.dwell[indexes]
         self.weights.fill(1.0 / self.num_particles)
 
+    # ------------------------------------------------------------------
+    # Gelerntes Modell: Verweildauern + Erkennungsraten (TRAIN_TRACKER)
+    # ------------------------------------------------------------------
+    def _event_streams(self, streams):
+        """[{events: [{room, ts}]}] bzw. [[{room, ts}]] -> Liste (Raum-Indizes, Zeiten s), chronologisch."""
+        room_idx = {r: i for i, r in enumerate(self.rooms)}
+        out = []
+        for s in streams:
+            events = s.get('events', []) if isinstance(s, dict) else s
+            pairs = [(room_idx.get(e.get('room'), -1), e.get('ts', e.get('timestamp'))) for e in events]
+            pairs = [(r, t) for r, t in pairs if r >= 0 and t is not None]
+            if len(pairs) < 2: continue
+            r, t = np.array(pairs, dtype=float).T
+            order = np.argsort(t, kind='stable')
+            out.append((r[order].astype(np.int64), t[order] / 1000.0))
+        return out
+
+    def train(self, streams):
+        """
+        Semi-Markov-Modell aus historischen Event-Folgen lernen (alles per bincount/add.at gezaehlt):
+        - Aufenthalt = Folge von Events im selben Raum, Dauer bis zum ersten Event im naechsten Raum
+          (der letzte Aufenthalt je Folge ist zensiert und zaehlt nicht)
+        - Hazard je Raum und Dauer-Bin: Abgaenge / Exposition (s), geschrumpft zu DEFAULT_RATE
+        - Ziel-Verteilung je Raum: beobachtete Wechsel + Topologie-Prior
+        - Erkennungsrate je Raum: Anteil der Aufenthalts-Minuten mit mindestens einem Event
+        Return: (success, Details-Dict)
+        """
+        if not self.is_ready or self.adj_matrix is None: return False, {"details": "Keine Topologie"}
+        n = len(self.rooms)
+        nb = len(DWELL_EDGES) - 1
+        lo, width = DWELL_EDGES[:-1], np.diff(DWELL_EDGES)
+        ends = np.zeros((n, nb)); exposure = np.zeros((n, nb))
+        moves = np.zeros((n, n))
+        det_minutes = np.zeros(n); stay_minutes = np.zeros(n)
+        n_events = n_stays = 0
+
+        for r, t in self._event_streams(streams):
+            n_events += len(r)
+            change = np.flatnonzero(r[1:] != r[:-1]) + 1
+            if len(change) == 0: continue
+            starts = np.concatenate([[0], change])
+            run_room = r[starts]
+            dur = t[starts[1:]] - t[starts[:-1]]           # abgeschlossene Aufenthalte
+            room = run_room[:-1]
+            n_stays += len(dur)
+
+            b = np.minimum(np.searchsorted(DWELL_EDGES, dur, side='right') - 1, nb - 1)
+            np.add.at(ends, (room, b), 1.0)
+            np.add.at(exposure, room, np.clip(dur[:, None] - lo[None, :], 0.0, width[None, :]))
+            np.add.at(moves, (run_room[:-1], run_room[1:]), 1.0)
+
+            # Minuten mit Event je Aufenthalt (eindeutige (Aufenthalt, Minute)-Paare)
+            run_id = np.cumsum(np.concatenate([[0], (r[1:] != r[:-1]).astype(np.int64)]))
+            closed = run_id < len(dur)
+            minute = np.floor((t - t[starts][run_id]) / 60.0).astype(np.int64)
+            pairs = np.unique(run_id[closed] * (1 << 32) + minute[closed])
+            np.add.at(det_minutes, room[pairs >> 32], 1.0)
+            np.add.at(stay_minutes, room, np.maximum(1.0, np.ceil(dur / 60.0)))
+
+        if n_stays == 0: return False, {"details": "Keine Raumwechsel in den Daten"}
+
+        hazard = (ends + DEFAULT_RATE * PRIOR_EXPOSURE) / (exposure + PRIOR_EXPOSURE)
+        neighbors = (np.asarray(self.adj_matrix) > 0).astype(float)
+        np.fill_diagonal(neighbors, 0.0)
+        dest = moves + DEST_PRIOR * neighbors
+        np.fill_diagonal(dest, 0.0)
+        empty = dest.sum(axis=1) == 0
+        dest[empty] = 1.0
+        dest[empty, np.flatnonzero(empty)] = 0.0
+        dest /= dest.sum(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            detect = np.where(stay_minutes > 0, det_minutes / stay_minutes, np.nan)
+
+        self.model = {'rooms': list(self.rooms), 'hazard': hazard, 'dest': dest, 'detect': detect}
+        self._prepare_model()
+        self._trans_pows = []
+        model_store.save('tracker_model', arrays={'hazard': hazard, 'dest': dest, 'detect': detect,
+                                                  'edges': DWELL_EDGES},
+                         values={'rooms': list(self.rooms), 'events': n_events, 'stays': n_stays},
+                         fingerprint=model_store.fingerprint(hazard, dest, detect, list(self.rooms)))
+
+        mean_dwell = 1.0 / self.model['rate']
+        details = {'events': n_events, 'stays': n_stays, 'rooms': {
+            self.rooms[i]: {'mean_dwell_s': round(float(mean_dwell[i]), 1),
+                            'detect_per_min': None if np.isnan(detect[i]) else round(float(detect[i]), 3),
+                            'stays': int(ends[i].sum())}
+            for i in range(n)}}
+        return True, details
+
+    def _load_model(self):
+        self.model = None
+        stored = model_store.load('tracker_model', mmap=False)
+        if stored is None or stored['values'].get('rooms') != list(self.rooms): return
+        a = stored['arrays']
+        if len(a['edges']) != len(DWELL_EDGES) or not np.array_equal(a['edges'], DWELL_EDGES): return
+        self.model = {'rooms': list(self.rooms), 'hazard': a['hazard'], 'dest': a['dest'], 'detect': a['detect']}
+        self._prepare_model()
+
+    def _prepare_model(self):
+        """Abgeleitete Tabellen: kumulierter Hazard an den Bin-Grenzen, mittlere Rate, Ziel-CDF."""
+        m = self.model
+        h = m['hazard']
+        finite = np.diff(DWELL_EDGES)[:-1]
+        m['cum'] = np.concatenate([np.zeros((len(h), 1)), np.cumsum(h[:, :-1] * finite, axis=1)], axis=1)
+        # mittlere Verweildauer = Integral der Ueberlebensfunktion -> Rate fuer das Markov-Modell (exakter Modus)
+        lo = DWELL_EDGES[:-1]
+        surv_lo = np.exp(-m['cum'])
+        width = np.append(finite, np.inf)
+        part = surv_lo / h * (1.0 - np.exp(-h * width))
+        m['rate'] = 1.0 / part.sum(axis=1)
+        m['dest_cdf'] = np.cumsum(m['dest'], axis=1)
+        # Raeume ohne Aufenthalte in den Daten behalten das feste SILENT_FACTOR (je Minute)
+        det = np.clip(np.nan_to_num(m['detect'], nan=DETECT_MIN), DETECT_MIN, DETECT_MAX)
+        m['silent_log'] = np.where(np.isnan(m['detect']), np.log(SILENT_FACTOR), np.log(1.0 - det))
+
+    def _cum_hazard(self, room, tau):
+        m = self.model
+        b = np.minimum(np.searchsorted(DWELL_EDGES, tau, side='right') - 1, len(DWELL_EDGES) - 2)
+        return m['cum'][room, b] + m['hazard'][room, b] * (tau - DWELL_EDGES[b])
+
+    def _predict_semi_markov(self, delta_t):
+        """
+        Partikel ueber delta_t Sekunden bewegen: Abgangszeit je Partikel per inverser
+        kumulierter Hazard-Funktion ziehen (Verweildauer zaehlt mit), Ziel aus der gelernten
+        Verteilung. Vektorisiert, ein Durchlauf je Raumwechsel statt je 2-s-Schritt.
+        """
+        m = self.model
+        if self.dwell is None or len(self.dwell) != len(self.particles):
+            self.dwell = np.zeros(len(self.particles))
+        remaining = np.full(len(self.particles), float(delta_t))
+        for _ in range(MAX_HOPS):
+            idx = np.flatnonzero(remaining > 0)
+            if len(idx) == 0: break
+            room, tau = self.particles[idx], self.dwell[idx]
+            target = self._cum_hazard(room, tau) + np.random.exponential(1.0, len(idx))
+            b = (m['cum'][room] <= target[:, None]).sum(axis=1) - 1
+            leave_at = DWELL_EDGES[b] + (target - m['cum'][room, b]) / m['hazard'][room, b]
+            x = leave_at - tau
+            go = x < remaining[idx]
+
+            stay = idx[~go]
+            self.dwell[stay] += remaining[stay]
+            remaining[stay] = 0.0
+
+            moved = idx[go]
+            remaining[moved] -= x[go]
+            u = np.random.random(len(moved))
+            nxt = (m['dest_cdf'][room[go]] < u[:, None]).sum(axis=1)
+            self.particles[moved] = np.minimum(nxt, len(self.rooms) - 1)
+            self.dwell[moved] = 0.0
+        left = remaining > 0
+        self.dwell[left] += remaining[left]
+
+    def _silence_factors(self, delta_t, target_idx):
+        """Faktor je Raum fuer 'kein Event seit delta_t': gelernt (1-p_det)^(Minuten), sonst SILENT_FACTOR."""
+        n = len(self.rooms)
+        if self.monitored_mask is None: return np.ones(n)
+        silent = self.monitored_mask.copy()
+        if target_idx is not None: silent[target_idx] = False
+        if self.model is not None:
+            factor = np.exp(self.model['silent_log'] * (delta_t / 60.0))
+        else:
+            factor = np.full(n, SILENT_FACTOR)
+        return np.where(silent, factor, 1.0)
+
+    # ------------------------------------------------------------------
+    # Exakter Modus: HMM-Vorwaertsfilter ueber die Raeume
+    # ------------------------------------------------------------------
+    def _transition_power(self, steps, b=None):
+        """
+        b @ T^steps (b: belief-Vektor, Default self.belief, oder Matrix) mit
+        T = (1-MOVE_PROB) I + MOVE_PROB * zeilen-normierte Adjazenz (= Erwartungswert der
+        Partikel-Diffusion). T^(2^j) wird einmal pro Topologie berechnet,
+        danach kostet ein Event O(N^2 * log steps).
+        """
+        if not self._trans_pows:
+            if self.model is not None:
+                # gelernt: Raum halten mit exp(-Rate * Schritt), sonst Ziel-Verteilung
+                stay = np.exp(-self.model['rate'] * STEP_SECONDS)
+                self._trans_pows = [np.diag(stay) + (1.0 - stay)[:, None] * self.model['dest']]
+            else:
+                A = np.asarray(self.adj_matrix, dtype=float) > 0
+                A = A / np.maximum(A.sum(axis=1, keepdims=True), 1)
+                self._trans_pows = [(1.0 - MOVE_PROB) * np.eye(len(A)) + MOVE_PROB * A]
+        if b is None: b = self.belief
+        j = 0
+        while steps:
+            if j == len(self._trans_pows):
+                self._trans_pows.append(self._trans_pows[-1] @ self._trans_pows[-1])
+            if steps & 1: b = b @ self._trans_pows[j]
+            steps >>= 1
+            j += 1
+        return b
+
+    def _update_exact(self, event_room_name, delta_t):
+        if self.belief is None or len(self.belief) != len(self.rooms): self._initialize_belief()
+        target_idx = self.rooms.index(event_room_name) if event_room_name in self.rooms else None
+        b = np.asarray(self.belief, dtype=float)
+
+        if delta_t > 0:
+            self.belief = b
+            b = self._transition_power(max(1, int(delta_t / STEP_SECONDS)))
+            b = b * self._silence_factors(delta_t, target_idx)
+
+        if target_idx is not None:
+            like = np.full(len(b), MISS_FACTOR)
+            like[target_idx] = HIT_FACTOR
+            b = b * like
+
+        total = b.sum()
+        self.belief = b / total if total > 0 else np.full(len(b), 1.0 / len(b))
+        return self.belief
+
+    # ------------------------------------------------------------------
+    # Offline: Tagesrekonstruktion (Forward-Backward + Viterbi, Minuten-Raster)
+    # ------------------------------------------------------------------
+    def _minute_emissions(self, days, minutes):
+        """
+        log-Likelihood je (Tag, Minute, Raum) aus den Events, gleiche Faktoren wie update():
+        Event in Raum r -> HIT fuer r, MISS fuer die anderen; ueberwachter Raum ohne Event -> SILENT.
+        Return: (logE (D, M, N), verwendete Events je Tag, unbekannte Raeume je Tag, Tagesstarts ms)
+        """
+        n = len(self.rooms)
+        room_idx = {r: i for i, r in enumerate(self.rooms)}
+        D = len(days)
+        counts = np.zeros((D, minutes, n))
+        starts, used, unknown = [], [], []
+        for d, day in enumerate(days):
+            events = day.get('events', [])
+            times = [e.get('ts', e.get('timestamp')) for e in events]
+            if day.get('date'):
+                start = datetime.strptime(day['date'], '%Y-%m-%d').timestamp() * 1000
+            elif day.get('start') is not None:
+                start = float(day['start'])
+            else:
+                first = min((t for t in times if t is not None), default=time.time() * 1000)
+                start = datetime.fromtimestamp(first / 1000.0).replace(hour=0, minute=0, second=0, microsecond=0).timestamp() * 1000
+            starts.append(int(start))
+            rooms = np.array([room_idx.get(e.get('room'), -1) for e in events], dtype=np.int64)
+            mins = np.array([-1 if t is None else (t - start) // 60000 for t in times], dtype=np.int64)
+            ok = (rooms >= 0) & (mins >= 0) & (mins < minutes)
+            unknown.append(int((rooms < 0).sum()))
+            used.append(int(ok.sum()))
+            np.add.at(counts[d], (mins[ok], rooms[ok]), 1.0)
+
+        total = counts.sum(axis=2, keepdims=True)
+        logE = counts * np.log(HIT_FACTOR) + (total - counts) * np.log(MISS_FACTOR)
+        if self.monitored_mask is not None and len(self.monitored_mask) == n:
+            silent = self.monitored_mask[None, None, :] & (counts == 0)
+            silent_log = self.model['silent_log'] if self.model is not None else np.full(n, np.log(SILENT_FACTOR))
+            logE = logE + silent * silent_log[None, None, :]
+        return logE, used, unknown, starts
+
+    def reconstruct_days(self, days, minutes=MINUTES_PER_DAY):
+        """
+        Aufenthalts-Rekonstruktion fuer ganze Tage (alle Tage gleichzeitig, vektorisiert ueber Tage).
+        days: [{date: 'YYYY-MM-DD' | start: ms, events: [{room, ts}]}]
+        Minuten-Uebergang = T^(60 s / STEP_SECONDS) wie im exakten Modus, Start gleichverteilt.
+        Return: [{date, start, occupancy (M x N, geglaettet), path (Raum-Index je Minute, Viterbi),
+                  segments: [{room, from_min, to_min}], events, unknown_events}], Raeume
+        """
+        if not self.is_ready or self.adj_matrix is None or not days: return [], list(self.rooms)
+        n = len(self.rooms)
+        T = self._transition_power(max(1, int(60.0 / STEP_SECONDS)), np.eye(n))
+        with np.errstate(divide='ignore'):
+            logT = np.log(T)
+        logE, used, unknown, starts = self._minute_emissions(days, minutes)
+        E = np.exp(logE - logE.max(axis=2, keepdims=True))      # je Minute skaliert, (D, M, N)
+        D, M = E.shape[0], E.shape[1]
+
+        # Forward (skaliert) / Backward
+        alpha = np.empty((D, M, n))
+        a = np.full((D, n), 1.0 / n) * E[:, 0]
+        alpha[:, 0] = a / a.sum(axis=1, keepdims=True)
+        for m in range(1, M):
+            a = (alpha[:, m - 1] @ T) * E[:, m]
+            alpha[:, m] = a / a.sum(axis=1, keepdims=True)
+        beta = np.ones((D, n))
+        post = np.empty((D, M, n))
+        post[:, -1] = alpha[:, -1]
+        for m in range(M - 2, -1, -1):
+            beta = (E[:, m + 1] * beta) @ T.T
+            beta /= beta.sum(axis=1, keepdims=True)
+            p = alpha[:, m] * beta
+            post[:, m] = p / p.sum(axis=1, keepdims=True)
+
+        # Viterbi (log)
+        back = np.empty((M, D, n), dtype=np.int16)
+        delta = np.log(np.full((D, n), 1.0 / n)) + logE[:, 0]
+        for m in range(1, M):
+            scores = delta[:, :, None] + logT[None]           # (D, von, nach)
+            back[m] = scores.argmax(axis=1)
+            delta = scores.max(axis=1) + logE[:, m]
+        path = np.empty((D, M), dtype=np.int64)
+        path[:, -1] = delta.argmax(axis=1)
+        days_idx = np.arange(D)
+        for m in range(M - 1, 0, -1):
+            path[:, m - 1] = back[m, days_idx, path[:, m]]
+
+        results = []
+        for d in range(D):
+            p = path[d]
+            cut = np.flatnonzero(np.diff(p)) + 1
+            bounds = np.concatenate([[0], cut, [M]])
+            results.append({
+                'date': days[d].get('date') or datetime.fromtimestamp(starts[d] / 1000.0).strftime('%Y-%m-%d'),
+                'start': starts[d],
+                'occupancy': np.round(post[d], 3).tolist(),
+                'path': p.tolist(),
+                'segments': [{'room': self.rooms[p[s]], 'from_min': int(s), 'to_min': int(e)}
+                             for s, e in zip(bounds[:-1], bounds[1:])],
+                'events': used[d],
+                'unknown_events': unknown[d],
+            })
+        return results, list(self.rooms)
+
+    def state(self):
+        """Aktuelle Aufenthalts-Wahrscheinlichkeiten ohne Update (nur lesend)."""
+        if not self.is_ready or not self.rooms:
+            return {"ready": False, "mode": self.mode, "probabilities": {}}
+        n = len(self.rooms)
+        if self.mode == 'exact' and self.belief is not None and len(self.belief) == n:
+            probs = np.asarray(self.belief)
+        elif self.particles is not None and len(self.particles):
+            probs = np.bincount(self.particles, minlength=n)[:n] / float(len(self.particles))
+        else:
+            probs = np.full(n, 1.0 / n)
+        result = {self.rooms[i]: float(round(p, 3)) for i, p in enumerate(probs) if p > REPORT_MIN_PROB}
+        return {"ready": True, "mode": self.mode, "trained": self.model is not None,
+                "probabilities": dict(sorted(result.items(), key=lambda item: item[1], reverse=True))}
+
+    def _report(self, probabilities):
+        result = {}
+        for i, prob in enumerate(probabilities):
+            if prob > REPORT_MIN_PROB:
+                result[self.rooms[i]] = float(round(prob, 3))
+
+        sorted_result = dict(sorted(result.items(), key=lambda item: item[1], reverse=True))
+
+        if time.time() - self.last_update > 60:
+            self.save_brain()
+            self.last_update = time.time()
+
+        return sorted_result
+
     def update(self, event_room_name, delta_t=0.0):
         if not self.is_ready or self.adj_matrix is None:
             return {}
+        if self.mode == 'exact':
+            return self._report(self._update_exact(event_room_name, delta_t))
 
         num_rooms = len(self.rooms)
 
         # --- 1. PREDICTION (Diffusion) ---
-        if delta_t > 0:
+        if delta_t > 0 and self.model is not None:
+            # Gelerntes Semi-Markov-Modell (TRAIN_TRACKER), vektorisiert
+            self._predict_semi_markov(delta_t)
+            target_idx = self.rooms.index(event_room_name) if event_room_name in self.rooms else None
+            self.weights *= self._silence_factors(delta_t, target_idx)[self.particles]
+
+        elif delta_t > 0:
             # Virtuelle Schritte (Diffusions-Geschwindigkeit)
-            steps = max(1, int(delta_t / 2.0))
+            steps = max(1, int(delta_t / STEP_SECONDS))
 
             for _ in range(steps):
                 # 20% der Partikel bewegen sich pro Schritt
-                move_mask = np.random.random(self.num_particles) < 0.2
+                move_mask = np.random.random(self.num_particles) < MOVE_PROB
                 affected_indices = np.where(move_mask)[0]
 
                 for idx in affected_indices:
@@ -136,7 +553,7 @@ class ParticleFilter:
 
                 # FIX v0.18.6: Faktor entschärft! (0.05 -> 0.95)
                 # Das verhindert, dass die Wahrscheinlichkeit sofort auf 0 fällt.
-                self.weights[particles_in_silent_monitored_rooms] *= 0.95
+                self.weights[particles_in_silent_monitored_rooms] *= SILENT_FACTOR
 
         # --- 2. UPDATE (Correction) ---
         if event_room_name and event_room_name in self.rooms:
@@ -145,8 +562,8 @@ class ParticleFilter:
             is_target = (self.particles == target_idx)
 
             # Starker Bonus für den aktiven Raum
-            self.weights[is_target] *= 50.0
-            self.weights[~is_target] *= 0.02
+            self.weights[is_target] *= HIT_FACTOR
+            self.weights[~is_target] *= MISS_FACTOR
 
         else:
             pass
@@ -166,16 +583,4 @@ class ParticleFilter:
         # --- 4. STATE ESTIMATION ---
         room_counts = np.bincount(self.particles, minlength=num_rooms)
         probabilities = room_counts / self.num_particles
-
-        result = {}
-        for i, prob in enumerate(probabilities):
-            if prob > 0.01:
-                result[self.rooms[i]] = float(round(prob, 3))
-
-        sorted_result = dict(sorted(result.items(), key=lambda item: item[1], reverse=True))
-
-        if time.time() - self.last_update > 60:
-            self.save_brain()
-            self.last_update = time.time()
-
-        return sorted_result
\ No newline at end of file
+        return self._report(probabilities)
\ No newline at end of file
@@ -0,0 +1,133 @@
+import json
+import time
+import threading
+from collections import deque
+
+"""
+Eingangs-Queue fuer stdin (service.py): ein Lese-Thread liest voraus, die Hauptschleife
+arbeitet die Queue ab. Haengt der Service hinterher, werden ueberholte Nachrichten nicht
+mehr einzeln abgearbeitet:
+
+- PREDICT_ENERGY / ANALYZE_ROOM_SILENCE: nur die neueste wartende Nachricht zaehlt,
+  aeltere werden verworfen (die neue rueckt an das Ende der Queue). Ausnahme sind Messwerte,
+  die im Service Zustand fuettern (PREDICT_ENERGY: current_temps -> Lueftungs-Ringpuffer):
+  sie werden mit ihrer Empfangszeit als "_carried" an die neueste Nachricht gehaengt.
+  Jede dieser Nachrichten traegt ihre Empfangszeit als "_received" (Sekunden).
+- TRACK_EVENT: folgt ein weiteres Event direkt auf das wartende (nichts dazwischen in der
+  Queue), werden beide zu einem Update zusammengefasst (dt addiert, letzter Raum gewinnt).
+  Jedes andere Kommando dazwischen ist eine Grenze, so sieht kein Leser einen Tracker-Zustand,
+  den es in Eingangsreihenfolge nie gab.
+- PING / SERVICE_STATS werden vorgezogen (billig, Lebenszeichen fuer den Adapter).
+"""
+
+SUPERSEDED_COMMANDS = {"PREDICT_ENERGY", "ANALYZE_ROOM_SILENCE"}
+SUPERSEDED_CARRY = {"PREDICT_ENERGY": "current_temps"}   # Feld, das beim Verwerfen erhalten bleibt
+CARRY_MAX = 32                # mitgenommene Messungen je Nachricht (= Ringpuffer-Groesse)
+MERGED_COMMAND = "TRACK_EVENT"
+PRIORITY_COMMANDS = {"PING", "SERVICE_STATS"}
+INGEST_MAX_DEPTH = 10000      # voll -> Lese-Thread wartet (Rueckstau in die stdin-Pipe)
+
+
+class IngestQueue:
+    def __init__(self, max_depth=INGEST_MAX_DEPTH):
+        self.max_depth = max_depth
+        self._high = deque()
+        self._normal = deque()
+        self._cond = threading.Condition()
+        self._latest = {}           # cmd -> wartender Eintrag (SUPERSEDED_COMMANDS)
+        self._track = None          # wartendes TRACK_EVENT am Ende der Queue, in das gemischt werden darf
+        self._eof = False
+        self.depth = 0
+        self.max_seen = 0
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.merged = 0
+        self.parse_errors = 0
+
+    def start_reader(self, stream):
+        threading.Thread(target=self._read, args=(stream,), name="stdin-ingest", daemon=True).start()
+        return self
+
+    def _read(self, stream):
+        try:
+            for line in iter(stream.readline, ''):
+                line = line.strip()
+                if line: self.put(line)
+        except Exception:
+            pass
+        finally:
+            with self._cond:
+                self._eof = True
+                self._cond.notify_all()
+
+    def put(self, line):
+        """Nachricht (JSON-Zeile) einreihen; Ueberholtes verwerfen oder zusammenfassen."""
+        try:
+            data = json.loads(line)
+            cmd = data.get("command") if isinstance(data, dict) else None
+        except Exception:
+            data, cmd = line, None      # Fehler meldet handle_message wie bisher
+            self.parse_errors += 1
+
+        with self._cond:
+            while self.depth >= self.max_depth and not self._eof:
+                self._cond.wait()
+            self.received += 1
+
+            if cmd == MERGED_COMMAND and self._track is not None:
+                old = self._track[0]
+                old["dt"] = float(old.get("dt") or 0.0) + float(data.get("dt") or 0.0)
+                if data.get("room"): old["room"] = data["room"]
+                self.merged += 1
+                return
+
+            entry = [data, True]
+            if cmd in SUPERSEDED_COMMANDS:
+                data["_received"] = time.time()
+                prev = self._latest.get(cmd)
+                if prev is not None:
+                    prev[1] = False         # Grabstein, wird beim Entnehmen uebersprungen
+                    self.depth -= 1
+                    self.dropped += 1
+                    field = SUPERSEDED_CARRY.get(cmd)
+                    if field is not None:
+                        old = prev[0]
+                        carried = old.get("_carried", [])
+                        if old.get(field): carried.append([old["_received"], old[field]])
+                        data["_carried"] = carried[-CARRY_MAX:]
+                self._latest[cmd] = entry
+            if cmd in PRIORITY_COMMANDS:
+                self._high.append(entry)
+            else:
+                self._normal.append(entry)
+                # Nur ein direkt benachbartes TRACK_EVENT darf aufnehmen
+                self._track = entry if cmd == MERGED_COMMAND else None
+            self.depth += 1
+            self.max_seen = max(self.max_seen, self.depth)
+            self._cond.notify_all()
+
+    def get(self):
+        """Naechste Nachricht (dict oder Roh-String); None wenn stdin zu und Queue leer."""
+        with self._cond:
+            while True:
+                for q in (self._high, self._normal):
+                    while q:
+                        entry = q.popleft()
+                        if not entry[1]: continue
+                        data = entry[0]
+                        cmd = data.get("command") if isinstance(data, dict) else None
+                        if self._latest.get(cmd) is entry: del self._latest[cmd]
+                        if self._track is entry: self._track = None
+                        self.depth -= 1
+                        self.processed += 1
+                        self._cond.notify_all()
+                        return data
+                if self._eof: return None
+                self._cond.wait()
+
+    def stats(self):
+        with self._cond:
+            return {"depth": self.depth, "max_depth_seen": self.max_seen, "max_depth": self.max_depth,
+                    "received": self.received, "processed": self.processed,
+                    "dropped": self.dropped, "merged": self.merged, "parse_errors": self.parse_errors}
@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import threading
+import cProfile
+import pstats
+import tracemalloc
+from collections import Counter
+
+"""
+Profiling im laufenden Betrieb (Kommando PROFILE), ohne Neustart unter einem Profiler.
+
+    {"command": "PROFILE", "commands": 50}                       naechste 50 Kommandos
+    {"command": "PROFILE", "seconds": 120, "mode": "sampling"}   2 Minuten, Stichproben
+    {"command": "PROFILE", "stop": true}                         vorzeitig beenden
+
+- mode 'deterministic': cProfile je Kommando (exakt, etwas Overhead)
+- mode 'sampling': Stack-Stichproben alle SAMPLE_INTERVAL_S aus einem Hilfs-Thread (kaum Overhead)
+- memory: tracemalloc — Peak/Netto je Kommando und Top-Allokationsstellen am Ende
+
+Ergebnisse werden je Kommando-Typ aggregiert, als JSON (und .prof fuer pstats/snakeviz)
+unter DATA_DIR/profiles abgelegt und als PROFILE_RESULT (Top-N) gesendet.
+"""
+
+PROFILE_MODES = ('deterministic', 'sampling')
+PROFILE_DEFAULT_COMMANDS = 50
+PROFILE_MAX_SECONDS = 3600
+PROFILE_TOP_N = 15
+SAMPLE_INTERVAL_S = 0.005
+TRACEMALLOC_FRAMES = 1
+
+_OWN_FILE = os.path.abspath(__file__)
+
+
+def _where(filename, line, func):
+    return f"{os.path.basename(filename)}:{line}({func})"
+
+
+class _Sampler(threading.Thread):
+    """Nimmt periodisch den Stack des profilierten Threads auf (self = oberster Frame, cum = alle)."""
+    def __init__(self, stop_code):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.stop_code = stop_code
+        self.target = None           # (thread ident, Kommando) waehrend ein Kommando laeuft
+        self.self_counts = {}        # cmd -> Counter
+        self.cum_counts = {}
+        self.samples = Counter()
+        self._stop = threading.Event()
+
+    def run(self):
+        while not self._stop.wait(SAMPLE_INTERVAL_S):
+            target = self.target
+            if target is None: continue
+            ident, cmd = target
+            frame = sys._current_frames().get(ident)
+            seen = set()
+            top = None
+            while frame is not None and frame.f_code is not self.stop_code:
+                code = frame.f_code
+                key = (code.co_filename, code.co_firstlineno, code.co_name)
+                if top is None: top = key
+                seen.add(key)
+                frame = frame.f_back
+            if top is None: continue
+            self.samples[cmd] += 1
+            self.self_counts.setdefault(cmd, Counter())[top] += 1
+            self.cum_counts.setdefault(cmd, Counter()).update(seen)
+
+    def stop(self):
+        self._stop.set()
+
+
+class CommandProfiler:
+    def __init__(self, out_dir, on_finish=None):
+        self.out_dir = out_dir
+        self.on_finish = on_finish   # on_finish(payload, reply) wenn die Sitzung von selbst endet
+        self._lock = threading.Lock()
+        self.session = None
+
+    @property
+    def active(self):
+        return self.session is not None
+
+    def start(self, mode='deterministic', commands=None, seconds=None, top=PROFILE_TOP_N, memory=True, reply=None):
+        if mode not in PROFILE_MODES: raise ValueError(f"Unbekannter Profiling-Modus: {mode}")
+        with self._lock:
+            if self.session is not None: raise RuntimeError("Profiling laeuft bereits (stop: true zum Beenden)")
+            if commands is None and seconds is None: commands = PROFILE_DEFAULT_COMMANDS
+            seconds = min(float(seconds), PROFILE_MAX_SECONDS) if seconds is not None else None
+            s = {
+                'mode': mode, 'commands': int(commands) if commands is not None else None, 'seconds': seconds,
+                'top': int(top), 'memory': bool(memory), 'reply': reply, 'started': time.time(),
+                'count': 0, 'per_cmd': {}, 'stats': {}, 'sampler': None, 'timer': None,
+                'own_tracemalloc': False, 'running': False, 'expired': False,
+            }
+            if memory and not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                s['own_tracemalloc'] = True
+            if mode == 'sampling':
+                s['sampler'] = _Sampler(CommandProfiler.run.__code__)
+                s['sampler'].start()
+            if seconds is not None:
+                s['timer'] = threading.Timer(seconds, self._timeout)
+                s['timer'].daemon = True
+                s['timer'].start()
+            self.session = s
+        return {'mode': mode, 'commands': s['commands'], 'seconds': seconds, 'memory': s['memory']}
+
+    def run(self, cmd, fn, *args):
+        """Ein Kommando profiliert ausfuehren (Aufrufer sorgt fuer Exklusivitaet)."""
+        s = self.session
+        if s is None: return fn(*args)
+        s['running'] = True
+        mem = s['memory'] and tracemalloc.is_tracing()
+        if mem:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        prof = cProfile.Profile() if s['mode'] == 'deterministic' else None
+        if s['sampler'] is not None: s['sampler'].target = (threading.get_ident(), cmd)
+        t0 = time.perf_counter()
+        try:
+            if prof is not None:
+                prof.enable()
+                try:
+                    return fn(*args)
+                finally:
+                    prof.disable()
+            return fn(*args)
+        finally:
+            elapsed = (time.perf_counter() - t0) * 1000.0
+            if s['sampler'] is not None: s['sampler'].target = None
+            c = s['per_cmd'].setdefault(cmd, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'peak_kb': 0.0, 'net_kb': 0.0})
+            c['calls'] += 1
+            c['total_ms'] += elapsed
+            c['max_ms'] = max(c['max_ms'], elapsed)
+            if mem:
+                current, peak = tracemalloc.get_traced_memory()
+                c['peak_kb'] = max(c['peak_kb'], (peak - before) / 1024.0)
+                c['net_kb'] += (current - before) / 1024.0
+            if prof is not None:
+                st = s['stats'].get(cmd)
+                if st is None: s['stats'][cmd] = pstats.Stats(prof)
+                else: st.add(prof)
+            s['count'] += 1
+            with self._lock:
+                s['running'] = False
+                expired = s['expired']
+            if expired:
+                self._finish_async('timeout')
+            elif s['commands'] is not None and s['count'] >= s['commands']:
+                self._finish_async('commands')
+
+    def stop(self):
+        """Sitzung beenden und Ergebnis zurueckgeben (None wenn keine lief)."""
+        return self._finish('stop')
+
+    def _timeout(self):
+        # Zeitfenster abgelaufen: ein laufendes Kommando wird noch fertig gemessen
+        with self._lock:
+            s = self.session
+            if s is None: return
+            if s['running']:
+                s['expired'] = True
+                return
+        self._finish_async('timeout')
+
+    def _finish_async(self, reason):
+        s = self.session
+        if s is None: return
+        payload = self._finish(reason)
+        if payload is not None and self.on_finish is not None:
+            self.on_finish(payload, s['reply'])
+
+    def _finish(self, reason):
+        with self._lock:
+            s = self.session
+            if s is None: return None
+            self.session = None
+        if s['timer'] is not None: s['timer'].cancel()
+        if s['sampler'] is not None: s['sampler'].stop()
+
+        top = s['top']
+        commands = {}
+        for cmd, c in sorted(s['per_cmd'].items(), key=lambda kv: -kv[1]['total_ms']):
+            entry = {'calls': c['calls'], 'total_ms': round(c['total_ms'], 2),
+                     'mean_ms': round(c['total_ms'] / c['calls'], 3), 'max_ms': round(c['max_ms'], 2)}
+            if s['memory']:
+                entry['peak_kb'] = round(c['peak_kb'], 1)
+                entry['net_kb'] = round(c['net_kb'], 1)
+            if s['mode'] == 'deterministic' and cmd in s['stats']:
+                entry['top_functions'] = self._top_pstats(s['stats'][cmd], top)
+            elif s['sampler'] is not None:
+                entry['samples'] = s['sampler'].samples.get(cmd, 0)
+                entry['top_functions'] = self._top_samples(s['sampler'], cmd, top)
+            commands[cmd] = entry
+
+        allocations = []
+        if s['memory'] and tracemalloc.is_tracing():
+            # Profiler-eigene Stellen erst nach dem Gruppieren ausblenden (filter_traces ist teuer)
+            skip = {os.path.abspath(f) for f in (tracemalloc.__file__, _OWN_FILE, cProfile.__file__, pstats.__file__)}
+            for stat in tracemalloc.take_snapshot().statistics('lineno'):
+                frame = stat.traceback[0]
+                if os.path.abspath(frame.filename) in skip: continue
+                if len(allocations) >= top: break
+                allocations.append({'site': f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                                    'file': frame.filename, 'size_kb': round(stat.size / 1024.0, 1),
+                                    'count': stat.count})
+            if s['own_tracemalloc']: tracemalloc.stop()
+
+        payload = {
+            'mode': s['mode'], 'reason': reason,
+            'duration_s': round(time.time() - s['started'], 2),
+            'commands_profiled': s['count'],
+            'commands': commands,
+            'top_allocations': allocations,
+        }
+        payload.update(self._write(s, payload))
+        return payload
+
+    @staticmethod
+    def _top_pstats(st, top):
+        rows = []
+        for (filename, line, func), (cc, nc, tt, ct, _) in st.stats.items():
+            if os.path.abspath(filename) == _OWN_FILE: continue
+            rows.append((tt, ct, nc, filename, line, func))
+        rows.sort(key=lambda r: r[0], reverse=True)
+        return [{'function': _where(f, l, fn), 'calls': nc, 'tottime_ms': round(tt * 1000.0, 3),
+                 'cumtime_ms': round(ct * 1000.0, 3)} for tt, ct, nc, f, l, fn in rows[:top]]
+
+    @staticmethod
+    def _top_samples(sampler, cmd, top):
+        total = max(1, sampler.samples.get(cmd, 0))
+        self_c = sampler.self_counts.get(cmd, Counter())
+        cum_c = sampler.cum_counts.get(cmd, Counter())
+        return [{'function': _where(*key), 'self_pct': round(100.0 * n / total, 1),
+                 'cum_pct': round(100.0 * cum_c.get(key, 0) / total, 1)}
+                for key, n in self_c.most_common(top)]
+
+    def _write(self, s, payload):
+        """Statistik-Dateien unter out_dir; Fehler hier duerfen das Ergebnis nicht verhindern."""
+        files = {}
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            base = os.path.join(self.out_dir, f"profile_{time.strftime('%Y%m%d_%H%M%S')}_{s['mode']}")
+            if s['stats']:
+                # Top-N ist schon berechnet -> die Stats duerfen hier zusammengefuehrt werden
+                combined = None
+                for st in s['stats'].values():
+                    if combined is None: combined = st
+                    else: combined.add(st)
+                combined.dump_stats(base + '.prof')
+                files['prof_file'] = base + '.prof'
+            with open(base + '.json', 'w') as f:
+                json.dump(payload, f, indent=2)
+            files['file'] = base + '.json'
+        except Exception as e:
+            files['write_error'] = str(e)
+        return files
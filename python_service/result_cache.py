@@ -0,0 +1,77 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+"""
+Ergebnis-Cache fuer idempotente Analyse-Kommandos (service.process_message).
+
+Schluessel = Hash(Kommando + kanonisches Payload-JSON + Modell-Version). Gespeichert
+werden die gesendeten Ergebnisse (type, payload) des Kommandos; ein Treffer sendet sie
+erneut, ohne zu rechnen. LRU mit Obergrenze fuer Eintraege und Bytes (JSON-Groesse).
+TRAIN_*-Kommandos erhoehen die Modell-Version und leeren den Cache.
+"""
+
+CACHE_MAX_ENTRIES = 64
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+IGNORED_KEYS = ('command', 'id', 'noCache')   # aendern das Ergebnis nicht
+
+
+class ResultCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.model_version = 0
+        self._entries = OrderedDict()   # key -> (results, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, cmd, data):
+        payload = {k: v for k, v in data.items() if k not in IGNORED_KEYS}
+        canon = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{cmd}|{self.model_version}|".encode('utf-8'))
+        h.update(canon.encode('utf-8'))
+        return h.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, results):
+        size = len(json.dumps(results, default=str))
+        if size > self.max_bytes: return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None: self._bytes -= old[1]
+            self._entries[key] = (results, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, b) = self._entries.popitem(last=False)
+                self._bytes -= b
+                self.evictions += 1
+
+    def invalidate(self):
+        """Neues Modell trainiert: Version hoch, alle Eintraege verwerfen."""
+        with self._lock:
+            self.model_version += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                    "evictions": self.evictions, "model_version": self.model_version}
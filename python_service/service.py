@@ -2,31 +2,114 @@ import sys
 import json
 import time
 import os
+import threading
 import pandas as pd
-import pickle
 
 # LOGGING
 VERSION = "0.29.18 (Debug Probe)"
+
+# stdout wird von stdin-Loop und Socket-Clients (Threads) geteilt -> zeilenweise sperren
+_out_lock = threading.RLock()
+# Thread-lokale Ergebnis-Senke: Socket-Clients bekommen ihre Ergebnisse selbst, stdin -> stdout
+_local = threading.local()
+
+class _LineLockedStdout:
+    """
+    Ersatz fuer sys.stdout im Service-Betrieb: sammelt je Thread bis zum Zeilenende und
+    schreibt ganze Zeilen unter _out_lock. So koennen auch print()-Aufrufe in den Brains
+    nicht mitten in eine [RESULT]-Zeile eines anderen Threads geraten.
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self._pending = threading.local()
+
+    def write(self, text):
+        buf = getattr(self._pending, 'text', '') + text
+        head, sep, tail = buf.rpartition('\n')
+        self._pending.text = tail
+        if sep:
+            with _out_lock:
+                self._stream.write(head + sep)
+                self._stream.flush()
+        return len(text)
+
+    def flush(self):
+        buf = getattr(self._pending, 'text', '')
+        self._pending.text = ''
+        with _out_lock:
+            if buf: self._stream.write(buf)
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
 def log(msg):
-    print(f"[LOG] {msg}")
-    sys.stdout.flush()
+    with _out_lock:
+        print(f"[LOG] {msg}")
+        sys.stdout.flush()
 
 def send_result(type, payload):
+    capture = getattr(_local, 'capture', None)
+    if capture is not None:
+        # Ergebnis-Cache schneidet mit, gesendet wird am Ende von process_message
+        capture.append((type, payload))
+        return
+    sink = getattr(_local, 'sink', None)
+    if sink is not None:
+        sink(type, payload)
+        return
+    _print_result(type, payload)
+
+def _print_result(type, payload):
     msg = {"type": type, "payload": payload}
-    print(f"[RESULT] {json.dumps(msg)}")
-    sys.stdout.flush()
+    line = f"[RESULT] {json.dumps(msg)}"
+    with _out_lock:
+        print(line)
+        sys.stdout.flush()
 
 sys.path.append(os.path.dirname(__file__))
 
+from socket_server import SocketServer, RWLock
+from result_cache import ResultCache
+from ingest_queue import IngestQueue
+from profiler import CommandProfiler, PROFILE_TOP_N
+
+# Gemeinsame Brains: diese Kommandos lesen nur (laufen parallel), alle anderen exklusiv
+READ_COMMANDS = {
+    "PING", "SERVICE_STATS", "GET_TRACKER_STATE",
+    "ANALYZE_HEALTH", "ANALYZE_GAIT", "ANALYZE_TREND", "ANALYZE_HEATMAP", "ANALYZE_ROOM_SILENCE",
+    "ANALYZE_LONGTERM_TRENDS", "ANALYZE_DISEASE_SCORES", "ANALYZE_SCREENING", "ANALYZE_DRIFT",
+}
+brain_lock = RWLock()
+socket_server = None
+ingest_queue = None     # stdin-Vorauslesen mit Verwerfen/Zusammenfassen ueberholter Nachrichten
+
+# Idempotente Analysen (reine Funktion von Payload + Modell): Ergebnis-Cache, TRAIN_* invalidiert
+# ANALYZE_SCREENING nicht: das Ergebnis traegt das aktuelle screeningDate
+CACHED_COMMANDS = {"ANALYZE_DISEASE_SCORES", "ANALYZE_LONGTERM_TRENDS", "ANALYZE_DRIFT", "ANALYZE_HEATMAP"}
+result_cache = ResultCache()
+
+def _profile_done(payload, reply):
+    """PROFILE-Sitzung von selbst beendet (N Kommandos / Zeitfenster): an den Auftraggeber senden."""
+    if reply is not None: reply("PROFILE_RESULT", payload)
+    else: _print_result("PROFILE_RESULT", payload)
+
+try:
+    from brains.model_store import DATA_DIR
+except Exception:
+    DATA_DIR = os.environ.get('COGNI_DATA_DIR') or os.path.dirname(os.path.abspath(__file__))
+profiler = CommandProfiler(os.path.join(DATA_DIR, 'profiles'), _profile_done)
+
 LIBS_AVAILABLE = False
 try:
-    from brains.security import SecurityBrain
+    from brains.security import SecurityBrain, DIFFUSION_TIME, PPR_ALPHA, SIGNAL_MIN_SCORE
     from brains.health import HealthBrain
     from brains.energy import EnergyBrain
     from brains.comfort import ComfortBrain
     from brains.pinn import LightweightPINN
+    from brains.mpc import HeatingPlanner
     from brains.tracker import ParticleFilter
-    from brains.sex import SexBrain
+    from brains.sex import SexBrainRegistry
     import numpy as np
     LIBS_AVAILABLE = True
 except ImportError as e:
@@ -40,26 +123,105 @@ if LIBS_AVAILABLE:
     energy_brain = EnergyBrain()
     comfort_brain = ComfortBrain()
     pinn_brain = LightweightPINN()
+    heating_planner = HeatingPlanner(energy_brain, pinn_brain)
     tracker_brain = ParticleFilter()
-    sex_brain = SexBrain()  # Legacy-Instanz (group_id=None → sex_model.pkl)
-    sex_brains = {}         # Per-Gruppe: {groupId: SexBrain(group_id=groupId)}
+    # SexBrain je Gruppe (LRU + Speicher-Budget), 'default' = Legacy sex_model.pkl
+    sex_registry = SexBrainRegistry()
 else:
     security_brain = None
-    sex_brain = None
-    sex_brains = {}
+    sex_registry = None
+
+START_TIME = time.time()
+
+def service_stats():
+    """Laufzeit-Kennzahlen fuer SERVICE_STATS."""
+    stats = {"version": VERSION, "uptime_s": round(time.time() - START_TIME, 1), "pid": os.getpid()}
+    try:
+        import resource
+        # ru_maxrss: Linux in KB
+        stats["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        pass
+    if sex_registry is not None:
+        stats["sex_registry"] = sex_registry.stats()
+    if socket_server is not None:
+        stats["socket"] = socket_server.stats()
+    stats["result_cache"] = result_cache.stats()
+    if ingest_queue is not None:
+        stats["ingest"] = ingest_queue.stats()
+    return stats
+
+def handle_message(msg, sink=None):
+    """
+    Thread-sicherer Einstieg fuer stdin und Socket-Clients: Lesen parallel, sonst exklusiv.
+    msg: JSON-String oder bereits geparstes dict (IngestQueue).
+    sink(type, payload, req_id): Antwort-Funktion des Socket-Clients (None = stdout).
+    """
+    try:
+        data = json.loads(msg) if isinstance(msg, (str, bytes)) else msg
+    except Exception as e:
+        log(f"Err processing: {e}")
+        return
+    if not isinstance(data, dict):
+        log("Err processing: message is not an object")
+        return
+    cmd = data.get("command")
+    # Waehrend PROFILE laeuft alles exklusiv, damit Zeiten/Allokationen eindeutig einem Kommando gehoeren
+    profiling = profiler.active and cmd != "PROFILE"
+    guard = brain_lock.read() if cmd in READ_COMMANDS and not profiling else brain_lock.write()
+    req_id = data.get("id")
+    _local.sink = (lambda type, payload: sink(type, payload, req_id)) if sink is not None else None
+    try:
+        with guard:
+            if profiling: profiler.run(str(cmd), process_message, data)
+            else: process_message(data)
+    finally:
+        _local.sink = None
 
 def process_message(msg):
+    cache_key = None
     try:
-        data = json.loads(msg)
+        data = json.loads(msg) if isinstance(msg, (str, bytes)) else msg
         cmd = data.get("command")
 
         if cmd == "PING":
             send_result("PONG", {"timestamp": time.time()})
             return
 
+        if cmd == "SERVICE_STATS":
+            send_result("SERVICE_STATS_RESULT", service_stats())
+            return
+
+        if cmd == "PROFILE":
+            # Naechste N Kommandos bzw. Zeitfenster profilieren; stop: true beendet sofort
+            if data.get("stop"):
+                result = profiler.stop()
+                send_result("PROFILE_RESULT", result if result is not None else {"error": "Kein Profiling aktiv"})
+            else:
+                try:
+                    info = profiler.start(mode=data.get("mode", "deterministic"), commands=data.get("commands"),
+                                          seconds=data.get("seconds"), top=data.get("top", PROFILE_TOP_N),
+                                          memory=data.get("memory", True), reply=getattr(_local, 'sink', None))
+                    send_result("PROFILE_STARTED", info)
+                except (ValueError, RuntimeError) as e:
+                    send_result("PROFILE_RESULT", {"error": str(e)})
+            return
+
         if not LIBS_AVAILABLE:
             return
 
+        # Ergebnis-Cache: Treffer sofort senden, sonst Ergebnisse mitschneiden (Ablage im finally)
+        if cmd and cmd.startswith("TRAIN_"):
+            result_cache.invalidate()
+        elif cmd in CACHED_COMMANDS and not data.get("noCache"):
+            key = result_cache.key(cmd, data)
+            cached = result_cache.get(key)
+            if cached is not None:
+                for type, payload in cached: send_result(type, payload)
+                return
+            cache_key = key
+            _local.capture = []
+
         # 1. SECURITY
         if cmd == "TRAIN_SECURITY":
             # Primär: dailyDigests für IsolationForest (wenn vorhanden)
@@ -71,6 +233,7 @@ def process_message(msg):
 
         # --- GRAPH BRAIN TRAINING (DEBUG EDITION) ---
         elif cmd == "TRAIN_TOPOLOGY":
+            # sequences: Raumlisten oder Pakete {steps, daytime/timestamp}; hours optional parallel (Tageszeit)
             sequences = data.get("sequences", [])
             rooms = security_brain.graph.rooms
 
@@ -84,38 +247,23 @@ def process_message(msg):
                 log("⚠️ Cannot train topology: No rooms defined (Manual Map missing).")
                 send_result("TRAINING_COMPLETE", {"success": False, "details": "No rooms defined"})
             else:
-                room_map = {r: i for i, r in enumerate(rooms)}
-                n = len(rooms)
-                mat = np.zeros((n, n), dtype=float)
-                count = 0
-
-                for seq in sequences:
-                    # Filtere Räume, die wir kennen
-                    valid_seq = [r for r in seq if r in room_map]
-
-                    # DEBUGGING FIRST MATCH FAILURE
-                    if count == 0 and len(seq) > 1 and len(valid_seq) < 2:
-                         log(f"⚠️ DEBUG: Sequence dropped! '{seq[0]}' not found in room map?")
-
-                    for i in range(len(valid_seq) - 1):
-                        u, v = valid_seq[i], valid_seq[i+1]
-                        if u == v: continue
-                        mat[room_map[u], room_map[v]] += 1
-                        count += 1
+                # Ein Durchlauf: Gesamt-Zaehler + Stunde x Raum x Raum (unbekannte Raeume werden gefiltert)
+                mat, hourly, count, dropped = security_brain.graph.count_transitions(sequences, data.get("hours"))
+                if dropped:
+                    log(f"⚠️ DEBUG: {dropped} sequences dropped (<2 known rooms) - room names not in room map?")
 
                 row_sums = mat.sum(axis=1, keepdims=True)
                 with np.errstate(divide='ignore', invalid='ignore'):
                     mat_norm = mat / row_sums
                 mat_norm = np.nan_to_num(mat_norm)
 
-                security_brain.graph.behavior_matrix = mat_norm
                 try:
-                    p_path = os.path.join(os.path.dirname(__file__), "graph_behavior.pkl")
-                    with open(p_path, 'wb') as f:
-                        pickle.dump(mat_norm, f)
-                    log(f"✅ Graph Behavior trained on {count} transitions and saved to {p_path}")
+                    if not security_brain.graph.save_behavior(mat_norm, rooms, hourly):
+                        raise IOError("ModelStore write failed")
+                    log(f"✅ Graph Behavior trained on {count} transitions and saved (ModelStore: graph_behavior)")
 
-                    send_result("GRAPH_TRAINED", {"matrix": mat_norm.tolist(), "rooms": rooms})
+                    send_result("GRAPH_TRAINED", {"matrix": mat_norm.tolist(), "rooms": rooms,
+                                                  "hours_covered": int((hourly.sum(axis=(1, 2)) > 0).sum()) if hourly is not None else 0})
                     send_result("TRAINING_COMPLETE", {"success": True, "details": f"Graph trained ({count} steps)"})
                 except Exception as e:
                     log(f"❌ Error saving graph behavior: {e}")
@@ -123,8 +271,9 @@ def process_message(msg):
         # ---------------------------------------------------
 
         elif cmd == "ANALYZE_SEQUENCE":
-            score, is_anomaly, explanation = security_brain.predict(data.get("sequence", {}))
-            send_result("SECURITY_RESULT", {"anomaly_score": score, "is_anomaly": is_anomaly, "explanation": explanation})
+            score, is_anomaly, explanation, markov = security_brain.predict(data.get("sequence", {}))
+            send_result("SECURITY_RESULT", {"anomaly_score": score, "is_anomaly": is_anomaly, "explanation": explanation,
+                                            "markov": markov})
 
         elif cmd == "SET_TOPOLOGY":
             # DIAGNOSE
@@ -137,9 +286,18 @@ def process_message(msg):
             send_result("TOPOLOGY_ACK", {"success": True})
 
         elif cmd == "SIMULATE_SIGNAL":
+            # mode: neighbors (Default, nur direkte Nachbarn wie bisher), heat oder ppr (Mehrfach-Hops)
+            # allRooms=true -> Tabelle fuer alle Startraeume statt "propagation"
             room = data.get("room")
-            neighbors = security_brain.graph.propagate_signal(room)
-            send_result("SIGNAL_RESULT", {"room": room, "propagation": neighbors})
+            graph = security_brain.graph
+            opts = {"mode": data.get("mode", "neighbors"), "t": float(data.get("t", DIFFUSION_TIME)),
+                    "alpha": float(data.get("alpha", PPR_ALPHA)), "min_score": float(data.get("minScore", SIGNAL_MIN_SCORE))}
+            result = {"room": room, "mode": opts["mode"], "topology_version": graph.topology_version}
+            if data.get("allRooms"):
+                result["table"] = graph.propagation_table(**opts)
+            else:
+                result["propagation"] = graph.propagate_signal(room, **opts)
+            send_result("SIGNAL_RESULT", result)
 
         elif cmd == "SET_LEARNING_MODE":
             active = data.get("active", False)
@@ -154,6 +312,29 @@ def process_message(msg):
             probs = tracker_brain.update(room, dt)
             send_result("TRACKER_RESULT", {"probabilities": probs})
 
+        elif cmd == "GET_TRACKER_STATE":
+            # Aktueller Aufenthalt ohne neues Event (Dashboards, lesend)
+            send_result("TRACKER_STATE", tracker_brain.state())
+
+        elif cmd == "RECONSTRUCT_DAY":
+            # Ein Tag ({date, events}) oder mehrere (days: [{date, events: [{room, ts}]}]) auf einmal
+            days = data.get("days") or [{"date": data.get("date"), "start": data.get("start"), "events": data.get("events", [])}]
+            t0 = time.perf_counter()
+            result, rooms = tracker_brain.reconstruct_days(days, int(data.get("minutes", 1440)))
+            send_result("DAY_RECONSTRUCTION", {"rooms": rooms, "days": result,
+                                               "compute_ms": round((time.perf_counter() - t0) * 1000.0, 1)})
+
+        elif cmd == "TRAIN_TRACKER":
+            # Historische Events: days: [{events: [{room, ts}]}] oder events: [...] (eine Folge)
+            streams = data.get("days") or [data.get("events", [])]
+            success, details = tracker_brain.train(streams)
+            send_result("TRACKER_TRAINED", {"success": success, **details})
+
+        elif cmd == "SET_TRACKER_MODE":
+            # 'particles' (Partikelfilter) oder 'exact' (diskreter Bayes-Filter), wird mitgespeichert
+            mode = tracker_brain.set_mode(data.get("mode", "particles"))
+            send_result("TRACKER_MODE_ACK", {"mode": mode})
+
         # 2. HEALTH
         elif cmd == "TRAIN_HEALTH":
             digests = data.get("digests", [])
@@ -304,14 +485,13 @@ def process_message(msg):
                         group = group.sort_values('ts')
                         group['dt_h'] = group['ts'].diff().dt.total_seconds() / 3600.0
                         group['d_temp'] = group['t_in'].diff()
-                        valid = group[(group['dt_h'] > 0.1) & (group['dt_h'] < 2.0)].copy()
-                        for idx, row in valid.iterrows():
-                            t_in = row['t_in']
-                            t_out = 10.0
-                            valve = row.get('valve', 0)
-                            solar = False
-                            rate = row['d_temp'] / row['dt_h']
-                            pinn_data.append({ 't_in': t_in, 't_out': t_out, 'valve': valve, 'solar': solar, 'delta_t': rate })
+                        valid = group[(group['dt_h'] > 0.1) & (group['dt_h'] < 2.0)]
+                        if valid.empty: continue
+                        # Spaltenweise statt iterrows(); 'room' fuer die Pro-Raum-Koepfe
+                        valves = valid['valve'].fillna(0) if 'valve' in valid.columns else pd.Series(0, index=valid.index)
+                        rates = valid['d_temp'] / valid['dt_h']
+                        for t_in, valve, rate in zip(valid['t_in'].tolist(), valves.tolist(), rates.tolist()):
+                            pinn_data.append({ 't_in': t_in, 't_out': 10.0, 'valve': valve, 'solar': False, 'delta_t': rate, 'room': room })
                     p_success, p_msg = pinn_brain.train(pinn_data)
                     log(f"PINN Training: {p_msg}")
                 except Exception as e: log(f"PINN Train Error: {e}")
@@ -333,28 +513,46 @@ def process_message(msg):
             forecast = energy_brain.predict_cooling(current_temps, t_out, data.get("t_forecast", None), is_sunny, solar_flags)
             send_result("ENERGY_PREDICT_RESULT", {"forecast": forecast})
 
-            vent_alerts = energy_brain.check_ventilation(current_temps)
+            # Von der IngestQueue verworfene Vorgaenger: Temperaturen trotzdem in den Ringpuffer
+            for ts, temps in data.get("_carried", []):
+                for room, temp in temps.items(): energy_brain.add_temp_sample(room, temp, ts)
+            vent_alerts = energy_brain.check_ventilation(current_temps, data.get("_received"))
             send_result("VENTILATION_ALERT", {"alerts": vent_alerts})
 
+            # Ein Forward-Pass fuer alle Raeume + Szenarien, geteilt von Warmup und PINN-Forecast
+            pinn_rates = pinn_brain.predict_rooms(current_temps, t_out, is_sunny, solar_flags) if pinn_brain.is_ready else {}
+
             times, sources, details = energy_brain.calculate_warmup_times(
                 current_temps,
                 warmup_targets,
                 pinn_brain,
                 t_out,
                 is_sunny,
-                solar_flags
+                solar_flags,
+                pinn_rates
             )
             send_result("WARMUP_RESULT", {"times": times, "sources": sources, "details": details})
 
             pinn_results = {}
             for room, t_in in current_temps.items():
-                solar_active = is_sunny and solar_flags.get(room, False)
-                rate = pinn_brain.predict(t_in, t_out, 0.0, solar_active)
+                rate = pinn_rates[room]['idle'] if room in pinn_rates else 0.0
                 pinn_results[room] = { "rate_per_hour": round(rate, 2), "predicted_1h": round(t_in + rate, 1) }
             if pinn_results: send_result("PINN_PREDICT_RESULT", {"forecast": pinn_results})
 
             send_result("RL_PENALTY_UPDATE", {"penalties": energy_brain.get_penalties()})
 
+        elif cmd == "TEMP_SAMPLE":
+            # Leichtgewichtig: nur Ringpuffer + Lueftungs-Check, keine volle Prognose.
+            # Payload: {room, temp, ts?} oder {temps: {room: temp}, ts?}, ts in ms
+            temps = data.get("temps") or {}
+            if data.get("room") is not None: temps = {data.get("room"): data.get("temp")}
+            ts = data.get("ts")
+            had_alert = any(r in energy_brain.vent_alert_rooms for r in temps)
+            alerts = energy_brain.check_ventilation(temps, ts / 1000.0 if ts else None)
+            # Nur senden wenn Alarm oder ein vorheriger Alarm aufgeloest wurde
+            if alerts or had_alert:
+                send_result("VENTILATION_ALERT", {"alerts": alerts})
+
         elif cmd == "OPTIMIZE_ENERGY":
             proposals = energy_brain.get_optimization_advice(
                 data.get("current_temps", {}),
@@ -364,17 +562,65 @@ def process_message(msg):
             )
             send_result("ENERGY_OPTIMIZE_RESULT", {"proposals": proposals})
 
+        elif cmd == "PLAN_HEATING":
+            # MPC: 24h-Heizfahrplan pro Raum (Komfort-Ziele + RL-Penalties)
+            plan, compute_ms = heating_planner.plan(
+                data.get("current_temps", {}),
+                data.get("t_out", 0),
+                data.get("targets", {}),
+                data.get("t_forecast", None),
+                data.get("is_sunny", False),
+                data.get("solar_flags", {}),
+                comfort_hours=data.get("comfort_hours", None),
+                setback=data.get("setback", 17.0),
+                t_out_hourly=data.get("t_out_hourly", None),
+                horizon_h=data.get("horizon_h", 24),
+                step_min=data.get("step_min", 15)
+            )
+            log(f"MPC Plan: {len(plan)} rooms in {compute_ms} ms")
+            send_result("HEATING_PLAN_RESULT", {"plan": plan, "step_min": data.get("step_min", 15), "start": time.time(), "compute_ms": compute_ms})
+
         # 4. COMFORT
         elif cmd == "TRAIN_COMFORT":
             # UPDATE: ACCEPT DEVICE MAP
             events = data.get("events", [])
             device_map = data.get("deviceMap", {}) # Neue Map
-            success, top_rules = comfort_brain.train(events, device_map)
-            send_result("COMFORT_RESULT", {"patterns": top_rules if success else []})
+            if "halfLifeDays" in data: comfort_brain.set_decay(data.get("halfLifeDays"))
+            if events:
+                # Volles Mining der Historie (setzt auch die Streaming-Zaehler neu)
+                success, top_rules = comfort_brain.train(events, device_map)
+            else:
+                # Streaming-Modus: nur aktuelle Top-Regeln aus den Zaehlern auslesen
+                comfort_brain.device_map.update(device_map)
+                top_rules = comfort_brain.top_rules()
+                success = True
+            send_result("COMFORT_RESULT", {
+                "patterns": top_rules if success else [],
+                "sequences": comfort_brain.sequences if success else []
+            })
+
+        elif cmd == "COMFORT_EVENT":
+            # Live-Event fuer das inkrementelle Regel-Lernen: {id, name, timestamp, type?} oder {events: [...]}
+            if data.get("deviceMap"): comfort_brain.device_map.update(data.get("deviceMap"))
+            batch = data.get("events")
+            for evt in (batch or [data]):
+                comfort_brain.add_event(evt)
+            if not batch:
+                # Einzel-Event: gelernte Regeln sofort auswerten, damit der Adapter vorschalten kann
+                t_start = time.perf_counter()
+                name = data.get("name") or data.get("id")
+                actions = comfort_brain.predict_actions(name, data.get("timestamp"))
+                if actions:
+                    send_result("COMFORT_PREDICTION", {
+                        "trigger": name,
+                        "timestamp": data.get("timestamp"),
+                        "actions": actions,
+                        "compute_ms": round((time.perf_counter() - t_start) * 1000.0, 3)
+                    })
 
         # ── STUFE 3: Sex-Klassifikator ──────────────────────────────────────────
         elif cmd == "CLASSIFY_SEX_SESSIONS":
-            if sex_brain is None:
+            if sex_registry is None:
                 send_result("CLASSIFY_SEX_SESSIONS_RESULT", {
                     "trained": False, "class_counts": {}, "n_samples": 0,
                     "status_msg": "SexBrain nicht geladen", "results": []
@@ -383,32 +629,50 @@ def process_message(msg):
                 train_samples    = data.get("train", [])
                 predict_sessions = data.get("predict", [])
                 group_id         = data.get("groupId", None)
-                # Per-Gruppe: eigene Brain-Instanz mit eigenem Modell-File
-                if group_id and group_id != 'default':
-                    if group_id not in sex_brains:
-                        sex_brains[group_id] = SexBrain(group_id=group_id)
-                        sex_brains[group_id].load_brain()
-                    brain = sex_brains[group_id]
-                else:
-                    brain = sex_brain  # Legacy / default
-                result = brain.classify_sessions(train_samples, predict_sessions)
+                # Per-Gruppe: eigene Brain-Instanz mit eigenem Modell-File (lazy geladen, LRU)
+                result = sex_registry.classify_sessions(group_id, train_samples, predict_sessions)
                 send_result("CLASSIFY_SEX_SESSIONS_RESULT", result)
 
-    except Exception as e: log(f"Err processing: {e}")
+    except Exception as e:
+        log(f"Err processing: {e}")
+        cache_key = None    # Fehler: nichts cachen
+    finally:
+        captured = getattr(_local, 'capture', None)
+        if captured is not None:
+            _local.capture = None
+            if cache_key is not None and captured: result_cache.put(cache_key, captured)
+            for type, payload in captured: send_result(type, payload)
 
 if __name__ == "__main__":
+    sys.stdout = _LineLockedStdout(sys.stdout)
     log(f"Cogni-Living Engine started. {VERSION}")
     if LIBS_AVAILABLE:
         security_brain.load_brain()
         health_brain.load_brain()
         energy_brain.load_brain()
+        comfort_brain.load_brain()
         pinn_brain.load_brain()
         tracker_brain.load_brain()
-        sex_brain.load_brain()  # RF-Modell von Disk laden (sex_model.pkl)
+        sex_registry.get('default')  # RF-Modell von Disk laden (sex_model.pkl)
+
+    # Optional: Unix-Socket fuer weitere lokale Clients (--socket PFAD oder COGNI_SOCKET)
+    socket_path = os.environ.get('COGNI_SOCKET')
+    if '--socket' in sys.argv[1:-1]:
+        socket_path = sys.argv[sys.argv.index('--socket') + 1]
+    if socket_path:
+        try:
+            socket_server = SocketServer(socket_path, handle_message, log).start()
+        except Exception as e:
+            log(f"⚠️ Socket-Server nicht gestartet ({socket_path}): {e}")
 
+    ingest_queue = IngestQueue().start_reader(sys.stdin)
     while True:
         try:
-            line = sys.stdin.readline()
-            if not line: break
-            process_message(line.strip())
-        except: break
\ No newline at end of file
+            item = ingest_queue.get()
+            if item is None: break
+            handle_message(item)
+        except: break
+
+    # stdin zu (z.B. als Dienst ohne Adapter gestartet): Socket-Clients weiter bedienen
+    if socket_server is not None and '--socket' in sys.argv:
+        socket_server.wait()
\ No newline at end of file
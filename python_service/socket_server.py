@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import queue
+import socket
+import threading
+
+"""
+Unix-Socket-Server fuer python_service (zusaetzlich zu stdin/stdout).
+
+Mehrere lokale Clients (Admin-UI, PWA, Dashboards) koennen dieselben Kommandos
+direkt schicken, ohne den Umweg ueber den Node-Adapter:
+
+    python service.py --socket /tmp/cogni.sock        (oder COGNI_SOCKET=/tmp/cogni.sock)
+
+Protokoll pro Verbindung: eine JSON-Nachricht pro Zeile (\\n), Antworten ebenso
+als {"type", "payload", "id"} — "id" wird aus der Anfrage uebernommen.
+- Jede Verbindung hat einen Lese-Thread (Anfragen in Reihenfolge) und einen
+  Schreib-Thread mit begrenzter Queue; wer nicht mitliest, wird getrennt.
+- Die Brains sind gemeinsam: lesende Kommandos laufen parallel, alle anderen
+  exklusiv (RWLock, siehe service.handle_message).
+"""
+
+MAX_CLIENTS = 16
+CLIENT_QUEUE_MAX = 256        # ausstehende Antworten je Client
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+
+class RWLock:
+    """Mehrere Leser oder ein Schreiber; wartende Schreiber haben Vorrang (kein Verhungern)."""
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0: self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    class _Guard:
+        def __init__(self, acquire, release):
+            self._acquire, self._release = acquire, release
+        def __enter__(self):
+            self._acquire()
+        def __exit__(self, *exc):
+            self._release()
+
+    def read(self):
+        return self._Guard(self.acquire_read, self.release_read)
+
+    def write(self):
+        return self._Guard(self.acquire_write, self.release_write)
+
+
+class ClientConnection:
+    def __init__(self, server, conn, client_id):
+        self.server = server
+        self.conn = conn
+        self.client_id = client_id
+        self.out = queue.Queue(maxsize=CLIENT_QUEUE_MAX)
+        self.closed = threading.Event()
+        self.messages = 0
+
+    def start(self):
+        threading.Thread(target=self._reader, name=f"sock-r{self.client_id}", daemon=True).start()
+        threading.Thread(target=self._writer, name=f"sock-w{self.client_id}", daemon=True).start()
+
+    def send(self, type, payload, req_id=None):
+        """Antwort einreihen; volle Queue = Client liest nicht mit -> trennen."""
+        if self.closed.is_set(): return
+        msg = {"type": type, "payload": payload}
+        if req_id is not None: msg["id"] = req_id
+        try:
+            self.out.put_nowait(json.dumps(msg) + "\n")
+        except queue.Full:
+            self.server.log(f"Client {self.client_id}: Antwort-Queue voll - Verbindung getrennt")
+            self.server.dropped += 1
+            self.close()
+
+    def _reader(self):
+        buf = b""
+        try:
+            while not self.closed.is_set():
+                chunk = self.conn.recv(65536)
+                if not chunk: break
+                buf += chunk
+                if len(buf) > MAX_LINE_BYTES and b"\n" not in buf:
+                    self.server.log(f"Client {self.client_id}: Nachricht zu gross - Verbindung getrennt")
+                    break
+                while b"\n" in buf:
+                    line, buf = buf.split(b"\n", 1)
+                    line = line.strip()
+                    if not line: continue
+                    self.messages += 1
+                    self.server.handler(line.decode("utf-8", errors="replace"), self.send)
+        except OSError:
+            pass
+        finally:
+            self.close()
+
+    def _writer(self):
+        try:
+            while True:
+                try:
+                    item = self.out.get(timeout=0.5)
+                except queue.Empty:
+                    if self.closed.is_set(): break
+                    continue
+                if item is None: break
+                self.conn.sendall(item.encode("utf-8"))
+        except OSError:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        if self.closed.is_set(): return
+        self.closed.set()
+        try: self.out.put_nowait(None)
+        except queue.Full: pass
+        try: self.conn.shutdown(socket.SHUT_RDWR)
+        except OSError: pass
+        try: self.conn.close()
+        except OSError: pass
+        self.server._remove(self)
+
+
+class SocketServer:
+    """
+    handler(msg_str, send) verarbeitet eine Nachricht; send(type, payload, req_id) ist die
+    Antwort-Funktion der Verbindung (service.handle_message setzt sie als thread-lokale Senke).
+    """
+    def __init__(self, path, handler, log=print):
+        self.path = path
+        self.handler = handler
+        self.log = log
+        self.clients = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._sock = None
+        self._thread = None
+        self.connections_total = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.started = None
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)    # Rest eines abgestuerzten Laufs
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(self.path)
+        os.chmod(self.path, 0o660)
+        self._sock.listen(MAX_CLIENTS)
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._accept_loop, name="sock-accept", daemon=True)
+        self._thread.start()
+        self.log(f"Socket-Server aktiv: {self.path}")
+        return self
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break
+            with self._lock:
+                if len(self.clients) >= MAX_CLIENTS:
+                    self.rejected += 1
+                    conn.close()
+                    continue
+                self._next_id += 1
+                client = ClientConnection(self, conn, self._next_id)
+                self.clients[client.client_id] = client
+                self.connections_total += 1
+            conn.settimeout(None)
+            client.start()
+
+    def _remove(self, client):
+        with self._lock:
+            self.clients.pop(client.client_id, None)
+
+    def wait(self):
+        """Blockiert, bis der Server gestoppt wird (Betrieb ohne stdin)."""
+        if self._thread is not None: self._thread.join()
+
+    def stop(self):
+        try: self._sock.close()
+        except (OSError, AttributeError): pass
+        for client in list(self.clients.values()):
+            client.close()
+        try: os.unlink(self.path)
+        except OSError: pass
+
+    def stats(self):
+        with self._lock:
+            clients = list(self.clients.values())
+        return {
+            "path": self.path,
+            "clients": len(clients),
+            "connections_total": self.connections_total,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "messages": sum(c.messages for c in clients),
+            "queued": sum(c.out.qsize() for c in clients),
+        }
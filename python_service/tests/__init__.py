@@ -0,0 +1,17 @@
+import os
+import sys
+import tempfile
+
+"""
+Tests fuer python_service (stdlib unittest, keine Zusatz-Abhaengigkeiten).
+
+    cd python_service
+    python -m unittest discover -s tests -t .
+
+Modelle landen in einem temporaeren Daten-Verzeichnis (COGNI_DATA_DIR muss vor dem
+Import der Brains gesetzt sein, model_store liest es beim Import).
+"""
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVICE_DIR not in sys.path: sys.path.insert(0, SERVICE_DIR)
+os.environ.setdefault('COGNI_DATA_DIR', tempfile.mkdtemp(prefix='cogni-test-'))
@@ -0,0 +1,50 @@
+import unittest
+
+from brains.energy import EnergyBrain
+
+HOUR = 3600.0
+
+
+class VentilationTest(unittest.TestCase):
+    def setUp(self):
+        self.brain = EnergyBrain()
+
+    def feed(self, samples, room='bad'):
+        """samples: [(ts, temp)] in Reihenfolge; Return: Alarme des letzten Aufrufs."""
+        alerts = []
+        for ts, temp in samples:
+            alerts = self.brain.check_ventilation({room: temp}, ts)
+        return alerts
+
+    def test_hourly_cadence_alerts_on_strong_drop(self):
+        # PREDICT_ENERGY kommt nur stuendlich: Fenster leer -> Zwei-Punkt-Fallback
+        alerts = self.feed([(0.0, 21.0), (HOUR, 12.0)])
+        self.assertEqual(len(alerts), 1)
+        self.assertAlmostEqual(alerts[0]['gradient'], -9.0, places=2)
+        self.assertAlmostEqual(alerts[0]['drop'], -9.0, places=1)
+
+    def test_hourly_cadence_ignores_normal_cooling(self):
+        self.assertEqual(self.feed([(0.0, 21.0), (HOUR, 20.0), (2 * HOUR, 19.2)]), [])
+
+    def test_ten_minute_cadence_alerts(self):
+        alerts = self.feed([(0.0, 21.0), (600.0, 19.5), (1200.0, 18.0)])
+        self.assertEqual([a['room'] for a in alerts], ['bad'])
+
+    def test_dense_window_uses_regression(self):
+        samples = [(i * 60.0, 21.0 - 0.2 * i) for i in range(10)]    # -12 °C/h
+        alerts = self.feed(samples)
+        self.assertAlmostEqual(alerts[0]['gradient'], -12.0, places=1)
+
+    def test_short_span_does_not_alert(self):
+        # Drei verrauschte Samples innerhalb von 3 Minuten reichen nicht
+        self.assertEqual(self.feed([(0.0, 21.0), (90.0, 20.6), (180.0, 20.3)]), [])
+
+    def test_alert_clears(self):
+        self.feed([(0.0, 21.0), (HOUR, 12.0)])
+        self.assertIn('bad', self.brain.vent_alert_rooms)
+        self.feed([(2 * HOUR, 12.5)])
+        self.assertNotIn('bad', self.brain.vent_alert_rooms)
+
+
+if __name__ == '__main__':
+    unittest.main()
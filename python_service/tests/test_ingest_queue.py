@@ -0,0 +1,53 @@
+import json
+import unittest
+
+from ingest_queue import IngestQueue
+
+
+def drain(q):
+    q._eof = True
+    out = []
+    while True:
+        item = q.get()
+        if item is None: return out
+        out.append(item)
+
+
+class TrackEventMergeTest(unittest.TestCase):
+    def put(self, q, command, **payload):
+        payload['command'] = command
+        q.put(json.dumps(payload))
+
+    def test_adjacent_events_are_merged(self):
+        q = IngestQueue()
+        for room in ('flur', 'kueche', 'bad'):
+            self.put(q, 'TRACK_EVENT', room=room, dt=10)
+        items = drain(q)
+        self.assertEqual(len(items), 1)
+        self.assertEqual((items[0]['room'], items[0]['dt']), ('bad', 30.0))
+
+    def test_reader_in_between_keeps_arrival_order(self):
+        q = IngestQueue()
+        self.put(q, 'TRACK_EVENT', room='flur', dt=10)
+        self.put(q, 'ANALYZE_SEQUENCE', sequence=['flur'])
+        self.put(q, 'TRACK_EVENT', room='bad', dt=5)
+        self.put(q, 'GET_TRACKER_STATE')
+        self.put(q, 'TRACK_EVENT', room='kueche', dt=5)
+        items = drain(q)
+        self.assertEqual([i['command'] for i in items],
+                         ['TRACK_EVENT', 'ANALYZE_SEQUENCE', 'TRACK_EVENT', 'GET_TRACKER_STATE', 'TRACK_EVENT'])
+        self.assertEqual([i.get('room') for i in items if i['command'] == 'TRACK_EVENT'], ['flur', 'bad', 'kueche'])
+        self.assertEqual(q.stats()['merged'], 0)
+
+    def test_superseded_energy_keeps_temperatures(self):
+        q = IngestQueue()
+        for t in (21.0, 20.0, 19.0):
+            self.put(q, 'PREDICT_ENERGY', current_temps={'bad': t})
+        items = drain(q)
+        self.assertEqual(len(items), 1)
+        self.assertEqual([temps['bad'] for _, temps in items[0]['_carried']], [21.0, 20.0])
+        self.assertEqual(items[0]['current_temps'], {'bad': 19.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from brains.security import SecurityBrain, HOUR_BUCKETS
+
+# flur ist Drehscheibe; buero <-> kueche haben keine direkte Verbindung
+ROOMS = ['flur', 'kueche', 'buero', 'gast', 'bad']
+EDGES = [('flur', 'kueche'), ('flur', 'buero'), ('flur', 'gast'), ('flur', 'bad')]
+
+
+def topology():
+    idx = {r: i for i, r in enumerate(ROOMS)}
+    adj = np.zeros((len(ROOMS), len(ROOMS)))
+    for a, b in EDGES:
+        adj[idx[a], idx[b]] = adj[idx[b], idx[a]] = 1
+    return {'rooms': ROOMS, 'matrix': adj.tolist()}
+
+
+def train(brain, sequences, hours=None):
+    """Wie TRAIN_TOPOLOGY in service.py: zaehlen, zeilen-normieren, speichern."""
+    mat, hourly, _, _ = brain.graph.count_transitions(sequences, hours)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mat_norm = np.nan_to_num(mat / mat.sum(axis=1, keepdims=True))
+    assert brain.graph.save_behavior(mat_norm, ROOMS, hourly)
+    return mat_norm, hourly
+
+
+class BehaviorReloadTest(unittest.TestCase):
+    def test_matrix_and_hourly_tensor_survive_restart_without_tensorflow(self):
+        brain = SecurityBrain()
+        brain.graph.update_topology(topology())
+        seqs = [['flur', 'kueche', 'flur', 'bad']] * 30 + [['flur', 'gast']] * 5
+        hours = [7] * 30 + [22] * 5
+        mat, hourly = train(brain, seqs, hours)
+
+        # tensorflow gilt als nicht installiert (None in sys.modules -> ImportError)
+        with mock.patch.dict(sys.modules, {'tensorflow': None}):
+            restarted = SecurityBrain()
+            restarted.load_brain()
+        self.assertIsNotNone(restarted.graph.behavior_matrix)
+        np.testing.assert_allclose(restarted.graph.behavior_matrix, mat)
+        self.assertEqual(restarted.graph.behavior_rooms, ROOMS)
+        self.assertIsNotNone(restarted.graph.behavior_hourly)
+        self.assertEqual(restarted.graph.behavior_hourly.shape, (HOUR_BUCKETS, len(ROOMS), len(ROOMS)))
+        np.testing.assert_allclose(restarted.graph.behavior_hourly, hourly)
+
+        # Stunden-Modell wird nach dem Neustart auch genutzt
+        restarted.graph.update_topology(topology())
+        morning = restarted.graph.score_sequence(['flur', 'gast'], hour=7)
+        evening = restarted.graph.score_sequence(['flur', 'gast'], hour=22)
+        self.assertEqual(evening['hour'], 22)
+        self.assertGreater(evening['transitions'][0]['p'], morning['transitions'][0]['p'])
+
+
+class MarkovAlertTest(unittest.TestCase):
+    def setUp(self):
+        self.brain = SecurityBrain()
+        self.brain.if_model = None      # nur der Markov-Scorer
+        self.brain.graph.update_topology(topology())
+        train(self.brain, [['flur', 'kueche', 'flur', 'bad', 'flur', 'kueche']] * 40 + [['flur', 'gast']])
+
+    def test_rare_move_between_neighbours_is_not_an_alarm(self):
+        for seq in (['kueche', 'flur', 'buero'], ['kueche', 'flur', 'gast']):   # nie / einmal gesehen
+            score, is_anomaly, explanation, markov = self.brain.predict({'steps': [{'loc': r} for r in seq]})
+            self.assertFalse(is_anomaly, explanation)
+            self.assertLess(markov['min_p'], 0.05)
+
+    def test_move_without_connection_is_an_alarm(self):
+        score, is_anomaly, explanation, markov = self.brain.predict(['buero', 'kueche'])
+        self.assertTrue(is_anomaly)
+        self.assertIn('buero->kueche', explanation)
+        self.assertFalse(markov['transitions'][0]['adjacent'])
+        self.assertGreater(score, 0.5)
+
+    def test_predict_returns_markov_details(self):
+        _, _, _, markov = self.brain.predict(['flur', 'kueche'])
+        self.assertEqual(markov['n_transitions'], 1)
+        self.assertTrue(markov['transitions'][0]['adjacent'])
+
+
+if __name__ == '__main__':
+    unittest.main()